@@ -0,0 +1,88 @@
+"""基准测试用的合成数据（固定随机种子，每次生成相同内容）"""
+import random
+
+SHOWS = ["完美世界", "斗罗大陆", "One Piece", "Breaking Bad", "庆余年", "The Office", "凡人修仙传"]
+EXTENSIONS = [".mp4", ".mkv", ".avi", ".ts"]
+
+
+def episode_names(count, seed=0):
+    """混合多种命名方式的剧集文件名（SxxExx、第xx集、纯数字、无编号）"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        show = rng.choice(SHOWS)
+        ext = rng.choice(EXTENSIONS)
+        style = i % 4
+        if style == 0:
+            name = f"{show} - S{rng.randint(1, 9):02d}E{rng.randint(1, 300)} - 1080p{ext}"
+        elif style == 1:
+            name = f"{show} 第{rng.randint(1, 2000)}集{ext}"
+        elif style == 2:
+            name = f"{show} {rng.randint(2000, 2024)} {rng.randint(1, 500)} 2160p{ext}"
+        else:
+            name = f"{show} 特别篇 {chr(0x4e00 + rng.randint(0, 2000))}{ext}"
+        names.append(name)
+    return names
+
+
+def listing_items(count, dir_ratio=0.05, seed=0):
+    """与 WebDAVClient.list_files 字段一致的目录条目"""
+    rng = random.Random(seed)
+    items = []
+    for i, name in enumerate(episode_names(count, seed)):
+        if rng.random() < dir_ratio:
+            items.append({
+                "name": f"电视剧/目录{i:06d}",
+                "type": "directory",
+                "content_length": None,
+                "modified": "2024-01-01T00:00:00+00:00",
+            })
+        else:
+            items.append({
+                "name": f"电视剧/{name}",
+                "type": "file",
+                "content_length": rng.randint(10 ** 8, 4 * 10 ** 9),
+                "modified": "2024-01-01T00:00:00+00:00",
+            })
+    return items
+
+
+def search_page(size_bytes, seed=0):
+    """仿小雅搜索结果页：导航链接 + 大量结果链接（含高亮标签、实体与URL编码）"""
+    rng = random.Random(seed)
+    parts = [
+        "<html><head><meta charset='utf-8'><title>搜索</title></head><body>\n",
+        '<a href="/">返回首页</a> <a href="https://example.com/follow">关注公众号</a><br>\n',
+    ]
+    size = sum(len(p.encode("utf-8")) for p in parts)
+    i = 0
+    while size < size_bytes:
+        show = rng.choice(SHOWS)
+        path = f"电视剧/{show}/S{rng.randint(1, 9):02d}/{show} 第{i}集.mp4"
+        if i % 3 == 0:
+            text = path.replace(show, f"<b>{show}</b>", 1)
+        elif i % 3 == 1:
+            text = path.replace(" ", "%20")
+        else:
+            text = path.replace("/", "&#47;", 1) + " &amp; 花絮"
+        line = f'<a href="/dav/{path}" target="_blank">{text}</a><br>\n'
+        parts.append(line)
+        size += len(line.encode("utf-8"))
+        i += 1
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+def raw_paths(count, seed=0):
+    """各种形式的待清理路径：带 base_path 前缀、URL 编码、普通相对路径"""
+    rng = random.Random(seed)
+    paths = []
+    for i, name in enumerate(episode_names(count, seed)):
+        path = f"/电视剧/{rng.choice(SHOWS)}/{name}"
+        style = i % 3
+        if style == 0:
+            path = "/dav" + path
+        elif style == 1:
+            path = "/dav" + path.replace(" ", "%20")
+        paths.append(path)
+    return paths
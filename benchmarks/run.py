@@ -0,0 +1,346 @@
+"""核心热点路径的基准测试
+
+用法（在项目根目录执行）:
+    python -m benchmarks.run                      # 运行全部，结果写入 benchmarks/results/
+    python -m benchmarks.run --quick              # 缩小数据规模，快速检查
+    python -m benchmarks.run -k sort -k parse     # 只运行名称包含关键字的项目
+    python -m benchmarks.run --compare old.json   # 与之前的结果对比，变慢超过阈值时返回非零
+
+每一项记录多轮测量的最小值与中位数（秒/次），以及由最小值换算的吞吐量。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import fixtures  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+_BENCHMARKS = []
+
+
+def benchmark(name, unit="item"):
+    """注册一个基准项目
+
+    被装饰的函数接收 quick 参数，返回若干 (变体名, 单次调用函数, 每次处理的数量, 重复轮数)；
+    也可以返回 (cases, extras)，extras 是运行期间填入的附加指标（秒）。
+    """
+    def decorator(func):
+        _BENCHMARKS.append((name, unit, func))
+        return func
+    return decorator
+
+
+def measure(func, repeat):
+    """执行 repeat 轮，返回每轮耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# ---------- 基准项目 ----------
+
+@benchmark("sort_files", unit="name")
+def bench_sort_files(quick):
+    from core.sorter import SmartSorter
+
+    sizes = [1000, 10000] if quick else [1000, 10000, 100000]
+    cases = []
+    for size in sizes:
+        items = [{"name": n, "type": "file"} for n in fixtures.episode_names(size)]
+
+        def cold(items=items):
+            SmartSorter.clear_cache()
+            SmartSorter.sort_files(items)
+
+        def warm(items=items):
+            SmartSorter.sort_files(items)
+
+        repeat = 3 if size >= 100000 else 5
+        cases.append((f"{size}/cold", cold, size, repeat))
+        cases.append((f"{size}/warm", warm, size, repeat))
+    return cases
+
+
+@benchmark("parse_results", unit="byte")
+def bench_parse_results(quick):
+    from core.search_client import ResultParser, SearchClient
+
+    client = SearchClient("http://127.0.0.1:5678/dav")
+    sizes = [1 << 20] if quick else [1 << 20, 4 << 20, 10 << 20]
+    cases = []
+    for size in sizes:
+        html = fixtures.search_page(size)
+        length = len(html.encode("utf-8"))
+        cases.append((f"{size >> 20}MB", lambda html=html: client._parse_results(html), length, 3))
+
+        def stream(html=html, chunk=64 * 1024):
+            # 按网络块大小增量解析
+            parser = ResultParser()
+            for i in range(0, len(html), chunk):
+                parser.feed(html[i:i + chunk])
+            parser.close()
+
+        cases.append((f"{size >> 20}MB/stream", stream, length, 3))
+    return cases
+
+
+@benchmark("sanitize_path", unit="path")
+def bench_sanitize_path(quick):
+    from core.webdav_client import WebDAVClient
+
+    client = WebDAVClient("http://127.0.0.1:5678/dav", "guest", "guest")
+    paths = fixtures.raw_paths(10000 if quick else 100000)
+
+    def run():
+        for path in paths:
+            client._sanitize_path(path)
+
+    return [(str(len(paths)), run, len(paths), 5)]
+
+
+@benchmark("get_stream_url", unit="url")
+def bench_get_stream_url(quick):
+    from core.webdav_client import WebDAVClient
+
+    client = WebDAVClient("http://127.0.0.1:5678/dav", "guest", "guest_Api789")
+    paths = fixtures.raw_paths(10000 if quick else 50000)
+
+    def run():
+        for path in paths:
+            client.get_stream_url(path)
+
+    return [(str(len(paths)), run, len(paths), 5)]
+
+
+@benchmark("load_dir", unit="entry")
+def bench_load_dir(quick):
+    """目录树填充流程：DirLoader 后台流式列表 -> 分批排队 -> 每轮事件循环插入一批到 BrowserModel（离屏 QTreeView）
+
+    直接驱动 DirLoader 和 BrowserModel，按主窗口的方式逐批插入，不依赖 MainWindow 的其他状态。
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from collections import deque
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication, QTreeView
+    from gui.browser_model import BrowserModel
+    from gui.dir_loader import DirLoader
+    from gui.main_window import VIDEO_EXTENSIONS
+
+    app = QApplication.instance() or QApplication([])
+
+    class _Client:
+        """直接产出合成条目的 WebDAV 客户端"""
+        cache = None
+
+        def __init__(self, items):
+            self.items = items
+
+        def iter_files(self, path):
+            yield from self.items
+
+    model = BrowserModel(VIDEO_EXTENSIONS)
+    view = QTreeView()
+    view.setUniformRowHeights(True)
+    view.setModel(model)
+    view.resize(400, 800)
+    view.show()
+    loader = DirLoader()
+    queue = deque()
+    fill_timer = QTimer()
+    fill_timer.setInterval(0)
+    # 单次处理一批所用的最长时间，反映界面最长卡顿
+    state = {"max_block": 0.0, "loop": None}
+
+    def drain():
+        start = time.perf_counter()
+        if queue:
+            items, done = queue.popleft()
+            if done:
+                model.finish_loading(model.root)
+                state["loop"].quit()
+            else:
+                model.insert_entries(model.root, items)
+        if not queue:
+            fill_timer.stop()
+        state["max_block"] = max(state["max_block"], time.perf_counter() - start)
+
+    def enqueue(items, done):
+        queue.append((items, done))
+        if not fill_timer.isActive():
+            fill_timer.start()
+
+    fill_timer.timeout.connect(drain)
+    loader.batch.connect(lambda request_id, items: enqueue(items, False))
+    loader.loaded.connect(lambda request_id, path, items: enqueue(items, True))
+
+    sizes = [1000, 10000] if quick else [1000, 10000, 50000]
+    cases = []
+    extras = {}
+    for size in sizes:
+        client = _Client(fixtures.listing_items(size))
+
+        def run(client=client, size=size):
+            state["max_block"] = 0.0
+            state["loop"] = QEventLoop()
+            model.clear()
+            model.set_header("文件列表")
+            model.begin_loading(model.root)
+            loader.load(client, "/")
+            state["loop"].exec()
+            app.processEvents()
+            key = f"{size}/max_block"
+            extras[key] = max(extras.get(key, 0.0), state["max_block"])
+
+        cases.append((str(size), run, size, 3))
+    return cases, extras
+
+
+# ---------- 运行与输出 ----------
+
+def parse_scaling(results):
+    """解析耗时随页面大小的增长倍数与大小倍数之比（约为 1 表示线性）"""
+    sizes = sorted(
+        (r["count"], r["min"]) for k, r in results.items()
+        if k.startswith("parse_results[") and k.endswith("MB]") and "min" in r
+    )
+    if len(sizes) < 2:
+        return {}
+    (small, t_small), (large, t_large) = sizes[0], sizes[-1]
+    return {"parse_results[scaling]": {"value": (t_large / t_small) / (large / small), "unit": "ratio"}}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(keywords=(), quick=False):
+    results = {}
+    for name, unit, func in _BENCHMARKS:
+        if keywords and not any(k in name for k in keywords):
+            continue
+        try:
+            cases = func(quick)
+        except Exception as e:
+            print(f"{name}: 跳过（{e}）")
+            continue
+        cases, extras = cases if isinstance(cases, tuple) else (cases, {})
+        for variant, case, count, repeat in cases:
+            key = f"{name}[{variant}]"
+            # 单个项目出错时记录为失败，继续运行其余项目
+            try:
+                timings = measure(case, repeat)
+            except Exception as e:
+                results[key] = {"error": f"{type(e).__name__}: {e}", "count": count, "unit": unit}
+                print(f"{key:<32} 失败: {results[key]['error']}")
+                continue
+            best = min(timings)
+            results[key] = {
+                "min": best,
+                "median": statistics.median(timings),
+                "repeat": repeat,
+                "count": count,
+                "unit": unit,
+                "per_second": count / best if best > 0 else None,
+            }
+            print(f"{key:<32} min {best * 1000:10.2f} ms   median {results[key]['median'] * 1000:10.2f} ms"
+                  f"   {results[key]['per_second'] or 0:14,.0f} {unit}/s")
+        for variant, value in extras.items():
+            key = f"{name}[{variant}]"
+            results[key] = {"value": value, "unit": "s"}
+            print(f"{key:<32}     {value * 1000:10.2f} ms")
+        if name == "parse_results":
+            for key, result in parse_scaling(results).items():
+                results[key] = result
+                print(f"{key:<32}     {result['value']:10.2f} x")
+    return results
+
+
+def _format(value, result):
+    if result.get("unit") == "ratio":
+        return f"{value:10.2f} x "
+    return f"{value * 1000:10.2f} ms"
+
+
+def compare(results, baseline_file, threshold):
+    """与基线结果对比（比较最小耗时或附加指标），返回变慢超过阈值的项目"""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n对比基线 {baseline_file}（阈值 {threshold:.2f}x）")
+    for key, result in results.items():
+        if "error" in result:
+            continue
+        field = "min" if "min" in result else "value"
+        old = baseline.get(key)
+        if old is None or not old.get(field):
+            continue
+        ratio = result[field] / old[field]
+        mark = "  变慢" if ratio > threshold else ""
+        print(f"{key:<32} {_format(old[field], result)} -> {_format(result[field], result)}   {ratio:6.2f}x{mark}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="小雅播放器核心路径基准测试")
+    parser.add_argument("-k", dest="keywords", action="append", default=[],
+                        help="只运行名称包含该关键字的项目（可重复）")
+    parser.add_argument("--quick", action="store_true", help="缩小数据规模")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件路径（默认写入 benchmarks/results/）")
+    parser.add_argument("--compare", help="用于对比的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="最小耗时超过基线多少倍视为变慢（默认 1.25）")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.keywords, args.quick)
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"bench-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"\n结果已保存: {output}")
+
+    failed = [key for key, result in results.items() if "error" in result]
+    if failed:
+        print(f"{len(failed)} 项失败: {', '.join(failed)}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 项变慢: {', '.join(regressions)}")
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
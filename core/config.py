@@ -1,10 +1,33 @@
+import atexit
 import json
 import os
+import threading
+import time
 
 class Config:
-    """配置管理类"""
-    def __init__(self, config_file="config.json"):
+    """配置管理类
+
+    修改后的配置由后台线程延迟写入：write_delay 秒内的多次修改合并为一次写入，
+    写入时先写临时文件再原子替换，避免程序中途退出留下不完整的配置文件。
+    """
+    def __init__(self, config_file="config.json", write_delay=1.0, fsync=False):
+        """
+        Args:
+            config_file: 配置文件路径
+            write_delay: 修改后延迟写入的时间（秒）
+            fsync: 写入后是否调用 fsync 确保落盘
+        """
         self.config_file = config_file
+        self.write_delay = write_delay
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # 保证快照顺序与写入顺序一致
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # 第一次未保存修改的时间，None 表示没有待写入的修改
+        self._dirty_since = None
+        self._closed = False
+        self._writer = None
         self.data = {
             "webdav_url": "http://118.122.130.22:5678/dav",
             "username": "guest",
@@ -13,9 +36,51 @@ class Config:
             "skip_outro": 0,
             "volume": 100,
             "last_played_path": None,
-            "last_played_time": 0
+            "last_played_time": 0,
+            "dir_cache_ttl": 600,
+            "http_max_connections": 20,
+            "http_max_per_host": 6,
+            "http2": False,
+            "http_connect_timeout": 5,
+            "http_read_timeout": 30,
+            "dns_cache_ttl": 300,
+            "prefetch_enabled": False,
+            "prefetch_max_dirs": 5,
+            "prefetch_workers": 2,
+            "prefetch_max_entries": 2000,
+            "crawler_enabled": False,
+            "crawler_concurrency": 4,
+            "crawler_rate": 5,
+            "search_debounce_ms": 300,
+            "search_cache_size": 200,
+            "search_cache_ttl": 1800,
+            "search_cache_persist": True,
+            "search_page_size": 200,
+            "search_max_results": 5000,
+            "history_flush_interval": 5,
+            "skip_detect_enabled": False,
+            "skip_detect_workers": 2,
+            "skip_detect_seconds": 180,
+            "prebuffer_enabled": True,
+            "prebuffer_seconds": 30,
+            "resolve_direct_links": True,
+            "direct_link_ttl": 600,
+            "stream_proxy_enabled": True,
+            "stream_cache_dir": "stream_cache",
+            "stream_cache_mb": 2048,
+            "stream_chunk_kb": 1024,
+            "stream_connections": 4,
+            "stream_segment_min_kb": 512,
+            "stream_segment_max_kb": 8192,
+            "stream_readahead_mb": 64,
+            "download_dir": "downloads",
+            "download_workers": 2,
+            "download_rate_kb": 0,
+            "ui_update_ms": 250
         }
         self.load()
+        # 退出时写入尚未保存的修改
+        atexit.register(self.flush)
 
     def load(self):
         """从文件加载配置"""
@@ -28,15 +93,72 @@ class Config:
                 print(f"加载配置失败: {e}")
 
     def save(self):
-        """保存配置到文件"""
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"保存配置失败: {e}")
+        """请求保存配置（在后台合并写入，立即返回）"""
+        with self._lock:
+            self._mark_dirty()
+
+    def flush(self):
+        """立即写入尚未保存的修改（阻塞）"""
+        with self._write_lock:
+            with self._lock:
+                if self._dirty_since is None:
+                    return
+                self._dirty_since = None
+                payload = json.dumps(self.data, indent=4, ensure_ascii=False)
+            self._write(payload)
+
+    def close(self):
+        """写入尚未保存的修改并停止后台写入线程"""
+        with self._lock:
+            self._closed = True
+            self._cond.notify_all()
+        self.flush()
 
     def get(self, key, default=None):
         return self.data.get(key, default)
 
     def set(self, key, value):
-        self.data[key] = value
+        with self._lock:
+            if key in self.data and self.data[key] == value:
+                return
+            self.data[key] = value
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        """标记有待写入的修改并唤醒写入线程（调用方持有锁）"""
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        # 关闭后不再启动后台线程，由 close()/退出时的 flush 写入
+        if self._closed:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True, name="config-writer")
+            self._writer.start()
+        self._cond.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while self._dirty_since is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # 从第一次修改起等待 write_delay，期间的修改一并写入
+                remaining = self._dirty_since + self.write_delay - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            self.flush()
+
+    def _write(self, payload):
+        """原子写入：先写临时文件，再替换正式文件"""
+        tmp_file = self.config_file + ".tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
+        except Exception as e:
+            print(f"保存配置失败: {e}")
@@ -0,0 +1,349 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def _norm(path):
+    """统一为以 / 开头、不以 / 结尾的路径"""
+    return "/" + path.strip("/")
+
+
+def _parent(path):
+    return path.rsplit("/", 1)[0] or "/"
+
+
+class _RateLimiter:
+    """简单的令牌间隔限速：全局每秒最多 rate 个请求"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self.interval
+        if wait_time:
+            stop_event.wait(wait_time)
+
+
+class LibraryIndex:
+    """本地路径索引（SQLite）
+
+    dirs 表记录每个目录的 ETag/修改时间与抓取状态（pending/done/error），
+    entries 表记录每个条目，供本地浏览与搜索使用。
+    """
+    def __init__(self, db_file="library_index.db"):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS dirs (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    etag TEXT,
+                    modified TEXT,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    listed_at REAL,
+                    PRIMARY KEY (server, path)
+                );
+                CREATE INDEX IF NOT EXISTS dirs_state ON dirs (server, state);
+                CREATE TABLE IF NOT EXISTS entries (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    parent TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL,
+                    size INTEGER,
+                    modified TEXT,
+                    PRIMARY KEY (server, path)
+                );
+                CREATE INDEX IF NOT EXISTS entries_parent ON entries (server, parent);
+            """)
+            self._conn.commit()
+
+    def pending(self, server, limit, exclude=()):
+        """取出待抓取目录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM dirs WHERE server = ? AND state = 'pending' LIMIT ?",
+                (server, limit + len(exclude))
+            ).fetchall()
+        return [r[0] for r in rows if r[0] not in exclude][:limit]
+
+    def has_pending(self, server):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM dirs WHERE server = ? AND state = 'pending' LIMIT 1", (server,)
+            ).fetchone()
+        return row is not None
+
+    def begin_sync(self, server):
+        """开始新一轮同步：根目录总是重新列出"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO dirs (server, path, state) VALUES (?, '/', 'pending') "
+                "ON CONFLICT (server, path) DO UPDATE SET state = 'pending', attempts = 0",
+                (server,)
+            )
+            # 上一轮失败的目录也重新尝试
+            self._conn.execute(
+                "UPDATE dirs SET state = 'pending', attempts = 0 WHERE server = ? AND state = 'error'",
+                (server,)
+            )
+            self._conn.commit()
+
+    def store_listing(self, server, path, items, etag, modified):
+        """保存目录列表，并把新增或变化的子目录标记为待抓取"""
+        path = _norm(path)
+        with self._lock:
+            conn = self._conn
+            known = {
+                row[0]: (row[1], row[2], row[3])
+                for row in conn.execute(
+                    "SELECT d.path, d.etag, d.modified, d.state FROM entries e "
+                    "JOIN dirs d ON d.server = e.server AND d.path = e.path "
+                    "WHERE e.server = ? AND e.parent = ? AND e.is_dir = 1",
+                    (server, path)
+                )
+            }
+            conn.execute("DELETE FROM entries WHERE server = ? AND parent = ?", (server, path))
+
+            child_dirs = set()
+            for item in items:
+                child = _norm(item["name"])
+                is_dir = item.get("type") == "directory"
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (server, path, parent, is_dir, size, modified) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (server, child, path, int(is_dir), item.get("content_length"), item.get("modified"))
+                )
+                if not is_dir:
+                    continue
+                child_dirs.add(child)
+                c_etag, c_modified = item.get("etag"), item.get("modified")
+                old = known.get(child)
+                # 校验信息未变化且上次已抓取完成的子目录无需重新列出
+                if old is not None and old[2] == "done" and (c_etag or c_modified) \
+                        and (old[0], old[1]) == (c_etag, c_modified):
+                    continue
+                conn.execute(
+                    "INSERT INTO dirs (server, path, etag, modified, state) VALUES (?, ?, ?, ?, 'pending') "
+                    "ON CONFLICT (server, path) DO UPDATE SET etag = excluded.etag, "
+                    "modified = excluded.modified, state = 'pending', attempts = 0",
+                    (server, child, c_etag, c_modified)
+                )
+
+            # 已被删除的子目录连同其子树一起移除
+            for gone in set(known) - child_dirs:
+                like = gone.replace("%", r"\%").replace("_", r"\_") + "/%"
+                conn.execute("DELETE FROM dirs WHERE server = ? AND (path = ? OR path LIKE ? ESCAPE '\\')",
+                             (server, gone, like))
+                conn.execute("DELETE FROM entries WHERE server = ? AND path LIKE ? ESCAPE '\\'",
+                             (server, like))
+
+            conn.execute(
+                "UPDATE dirs SET state = 'done', attempts = 0, listed_at = ?, "
+                "etag = COALESCE(?, etag), modified = COALESCE(?, modified) WHERE server = ? AND path = ?",
+                (time.time(), etag, modified, server, path)
+            )
+            conn.commit()
+
+    def mark_failed(self, server, path, max_attempts):
+        """记录一次失败，超过重试次数后标记为 error"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE dirs SET attempts = attempts + 1, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'error' ELSE 'pending' END "
+                "WHERE server = ? AND path = ?",
+                (max_attempts, server, _norm(path))
+            )
+            self._conn.commit()
+
+    def list_dir(self, server, path):
+        """从索引读取目录内容
+
+        Returns:
+            (条目列表, 列出时间)，条目格式与 WebDAVClient.list_files 一致；目录尚未被列出过时返回 None
+        """
+        path = _norm(path)
+        with self._lock:
+            listed = self._conn.execute(
+                "SELECT listed_at FROM dirs WHERE server = ? AND path = ? AND listed_at IS NOT NULL",
+                (server, path)
+            ).fetchone()
+            if listed is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT path, is_dir, size, modified FROM entries WHERE server = ? AND parent = ?",
+                (server, path)
+            ).fetchall()
+        items = [
+            {
+                "name": p.lstrip("/"),
+                "type": "directory" if is_dir else "file",
+                "content_length": size,
+                "modified": modified,
+            }
+            for p, is_dir, size, modified in rows
+        ]
+        return items, listed[0]
+
+    def iter_paths(self, server):
+        """遍历索引中的所有路径，产出 (path, is_dir)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, is_dir FROM entries WHERE server = ?", (server,)
+            ).fetchall()
+        for path, is_dir in rows:
+            yield path, bool(is_dir)
+
+    def stats(self, server):
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM dirs WHERE server = ? GROUP BY state", (server,)
+            ).fetchall())
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE server = ?", (server,)
+            ).fetchone()[0]
+        counts["entries"] = entries
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IndexedClient:
+    """浏览用的目录来源：索引中 ttl 秒内列出过的目录直接从本地读取，
+    其余目录（未索引或已过期）交给 WebDAVClient（经 DirCache 按 TTL/ETag 重新验证）"""
+    def __init__(self, index, client, ttl=600):
+        self.index = index
+        self.client = client
+        self.ttl = ttl
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def iter_files(self, path):
+        listing = self.index.list_dir(self.client.base_url, path)
+        if listing is None or time.time() - listing[1] >= self.ttl:
+            yield from self.client.iter_files(path)
+        else:
+            yield from listing[0]
+
+
+class Crawler:
+    """后台全库爬虫
+
+    以可配置的并发与速率遍历整个 WebDAV 挂载，把结果写入 LibraryIndex。
+    待抓取目录持久化在索引中，中断后再次 start() 会从断点继续；
+    重新同步时只列出 ETag/修改时间发生变化的目录。
+    """
+    def __init__(self, index, concurrency=4, rate=5.0, max_attempts=3):
+        """
+        Args:
+            index: LibraryIndex 实例
+            concurrency: 并发请求数
+            rate: 每秒最多请求数，0 表示不限速
+            max_attempts: 单个目录的最大重试次数
+        """
+        self.index = index
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._limiter = _RateLimiter(rate)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        # 当前一轮结束后接着同步的客户端（切换服务器时设置）
+        self._next_client = None
+        # 一轮同步完成后在同步线程中调用 on_finished(服务器地址)
+        self.on_finished = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, client):
+        """开始（或继续）同步
+
+        正在同步时（例如切换了服务器）结束当前一轮，由同步线程在退出前接着同步 client，
+        不必等待可能长时间阻塞的请求返回。
+        """
+        with self._lock:
+            if self.is_running():
+                self._next_client = client
+                self._stop.set()
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, args=(client,), daemon=True, name="crawler")
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """请求停止；未完成的目录保留为 pending，下次继续
+
+        Args:
+            timeout: 等待同步线程结束的秒数，None 表示一直等待，0 表示不等待
+        """
+        with self._lock:
+            self._next_client = None
+            self._stop.set()
+            thread = self._thread
+        if thread is not None and timeout != 0:
+            thread.join(timeout)
+
+    def _loop(self, client):
+        while True:
+            try:
+                self._run(client)
+            except Exception as e:
+                print(f"索引同步出错: {e}")
+            with self._lock:
+                client, self._next_client = self._next_client, None
+                if client is None:
+                    self._thread = None
+                    return
+                self._stop.clear()
+
+    def _run(self, client):
+        server = client.base_url
+        # 没有断点时开始新一轮增量同步
+        if not self.index.has_pending(server):
+            self.index.begin_sync(server)
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl") as executor:
+            while not self._stop.is_set():
+                free = self.concurrency - len(in_flight)
+                if free > 0:
+                    for path in self.index.pending(server, free, exclude=set(in_flight.values())):
+                        future = executor.submit(self._crawl_dir, client, server, path)
+                        in_flight[future] = path
+                if not in_flight:
+                    break
+                done, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+
+        if not self._stop.is_set():
+            print(f"索引同步完成: {self.index.stats(server)}")
+            if self.on_finished is not None:
+                self.on_finished(server)
+
+    def _crawl_dir(self, client, server, path):
+        self._limiter.acquire(self._stop)
+        if self._stop.is_set():
+            return
+        try:
+            items, etag, modified = client.fetch_files(path)
+        except Exception as e:
+            print(f"索引目录失败 {path}: {e}")
+            self.index.mark_failed(server, path, self.max_attempts)
+            return
+        self.index.store_listing(server, path, items, etag, modified)
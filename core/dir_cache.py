@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# 缓存条目：items 为目录列表，etag/modified 为目录自身的校验信息
+CacheEntry = namedtuple("CacheEntry", ["items", "etag", "modified", "fetched_at"])
+
+
+class DirCache:
+    """目录列表持久化缓存（SQLite）
+
+    以 服务器地址 + 路径 为键保存 PROPFIND 结果，
+    超过 TTL 的条目仍可返回，但需要调用方通过 ETag/getlastmodified 重新校验。
+    """
+    def __init__(self, db_file="dir_cache.db", ttl=600):
+        """
+        Args:
+            db_file: SQLite 数据库文件路径
+            ttl: 条目有效期（秒），超过后视为过期
+        """
+        self.db_file = db_file
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    items TEXT NOT NULL,
+                    etag TEXT,
+                    modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (server, path)
+                )
+            """)
+            self._conn.commit()
+
+    @staticmethod
+    def _key_path(path):
+        """统一路径格式，避免 /a/b 与 a/b/ 被当作不同的键"""
+        return "/" + path.strip("/")
+
+    def get(self, server, path):
+        """读取缓存条目，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT items, etag, modified, fetched_at FROM listings WHERE server = ? AND path = ?",
+                (server, self._key_path(path))
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            items = json.loads(row[0])
+        except ValueError:
+            return None
+        return CacheEntry(items, row[1], row[2], row[3])
+
+    def put(self, server, path, items, etag=None, modified=None):
+        """写入（覆盖）缓存条目"""
+        payload = json.dumps(items, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (server, path, items, etag, modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (server, self._key_path(path), payload, etag, modified, time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, server, path):
+        """校验通过后刷新条目时间戳"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE listings SET fetched_at = ? WHERE server = ? AND path = ?",
+                (time.time(), server, self._key_path(path))
+            )
+            self._conn.commit()
+
+    def is_fresh(self, entry):
+        """条目是否仍在 TTL 内"""
+        return time.time() - entry.fetched_at < self.ttl
+
+    def invalidate(self, server, path=None):
+        """删除指定路径（或整个服务器）的缓存"""
+        with self._lock:
+            if path is None:
+                self._conn.execute("DELETE FROM listings WHERE server = ?", (server,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM listings WHERE server = ? AND path = ?",
+                    (server, self._key_path(path))
+                )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
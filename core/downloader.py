@@ -0,0 +1,415 @@
+import base64
+import binascii
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+
+import httpx
+
+from core.http_transport import get_default_transport
+from core.stream_resolver import open_range
+
+# 下载记录：downloaded/size 为字节数，status 为 queued/downloading/done/failed/cancelled/interrupted
+# （interrupted：网络错误重试用尽，下次连接服务器时继续）
+DownloadEntry = namedtuple("DownloadEntry", ["path", "local_path", "size", "downloaded", "status", "etag", "sha256"])
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-\d+/(\d+)')
+_SHA256_HEX_RE = re.compile(r'^(?:W/)?"?([0-9a-fA-F]{64})"?$')
+# Windows 文件名中不允许的字符
+_INVALID_CHARS_RE = re.compile(r'[<>:"|?*\x00-\x1f]')
+
+
+def _preallocate(f, size):
+    """为文件预先分配空间（不支持 fallocate 的平台上退化为扩展文件长度）"""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+    f.truncate(size)
+
+
+def _expected_sha256(headers):
+    """服务器提供的文件 SHA-256（十六进制），没有时返回 None
+
+    支持 Repr-Digest（RFC 9530）、Digest（RFC 3230）以及值为 SHA-256 的 ETag。
+    """
+    for name in ("repr-digest", "digest"):
+        for item in headers.get(name, "").split(","):
+            algorithm, _, value = item.strip().partition("=")
+            if algorithm.lower() != "sha-256":
+                continue
+            try:
+                return base64.b64decode(value.strip(":")).hex()
+            except (binascii.Error, ValueError):
+                pass
+    match = _SHA256_HEX_RE.match(headers.get("etag", ""))
+    return match.group(1).lower() if match else None
+
+
+class RateLimiter:
+    """全局限速（令牌桶），所有下载线程共享；rate 为 0 表示不限速"""
+    def __init__(self, rate=0):
+        self.rate = rate
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """取用 amount 字节的额度，额度不足时阻塞到足够为止"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # 最多积攒 1 秒的额度
+            self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _RestartDownload(Exception):
+    """本地部分与服务器内容不一致，需要从头下载"""
+
+
+class DownloadManager:
+    """后台下载管理器
+
+    下载队列由多个工作线程处理，全局限速；文件先写入预分配的 .part 文件，
+    按块写入并定期把进度写入 SQLite，中断后用 HTTP Range 从断点继续。
+    续传时校验断点前的一段数据和 ETag（If-Range），内容不一致则重新下载；
+    网络错误时按退避间隔自动重试，重试用尽后标记为 interrupted，下次连接时继续。
+    完成后校验文件大小并计算 SHA-256：服务器提供了 SHA-256 时比对，否则只记录，
+    供 verify() 之后检查本地文件是否损坏。
+    """
+    # 续传时重新下载并比对的断点前字节数
+    VERIFY_BYTES = 64 * 1024
+    # 进度写入数据库的间隔（字节）
+    PROGRESS_INTERVAL = 8 * 1024 * 1024
+    # 网络错误时连续重试的次数，以及首次重试前的等待（秒，之后每次翻倍）
+    MAX_RETRIES = 5
+    RETRY_DELAY = 2.0
+
+    def __init__(self, download_dir="downloads", db_file="downloads.db", workers=2, rate_limit=0,
+                 transport=None, resolver=None, chunk_size=1024 * 1024):
+        """
+        Args:
+            download_dir: 下载目录
+            db_file: 下载记录数据库
+            workers: 同时下载的文件数
+            rate_limit: 全局限速（字节/秒），0 表示不限速
+            transport: 共享的 HttpTransport，默认使用进程级连接池
+            resolver: 可选的 StreamResolver，用于获取直链
+            chunk_size: 每次写入磁盘的块大小（字节）
+        """
+        self.download_dir = download_dir
+        self.resolver = resolver
+        self.chunk_size = chunk_size
+        self.limiter = RateLimiter(rate_limit)
+        self.http = (transport or get_default_transport()).create_client(follow_redirects=True)
+        # 状态变化回调：on_event(服务器地址, 路径, 状态, 已下载字节, 总字节)，在下载线程中调用
+        self.on_event = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._entries = {}
+        # 排队或下载中的任务 (服务器地址, 路径) -> WebDAVClient
+        self._jobs = {}
+        self._cancelled = set()
+        # 任务连续失败（未取得进展）的次数
+        self._retries = {}
+        self._stop = threading.Event()
+        # 数据库已关闭（shutdown 后仍在收尾的下载线程不再写入）
+        self._closed = False
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS downloads (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    local_path TEXT NOT NULL,
+                    size INTEGER,
+                    downloaded INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    etag TEXT,
+                    sha256 TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (server, path)
+                )
+            """)
+            self._conn.commit()
+            for row in self._conn.execute(
+                    "SELECT server, path, local_path, size, downloaded, status, etag, sha256 FROM downloads"):
+                self._entries[(row[0], row[1])] = DownloadEntry(*row[1:])
+
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"download-{i}")
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _local_path(self, server, path):
+        """文件的本地保存路径：下载目录/服务器/原路径"""
+        host = _INVALID_CHARS_RE.sub("_", urllib.parse.urlsplit(server).netloc)
+        parts = [_INVALID_CHARS_RE.sub("_", p) for p in path.strip("/").split("/") if p not in ("", ".", "..")]
+        return os.path.join(self.download_dir, host, *parts)
+
+    def _save(self, server, entry):
+        with self._lock:
+            self._entries[(server, entry.path)] = entry
+            if self._closed:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads "
+                "(server, path, local_path, size, downloaded, status, etag, sha256, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (server, *entry, time.time())
+            )
+            self._conn.commit()
+        if self.on_event is not None:
+            self.on_event(server, entry.path, entry.status, entry.downloaded, entry.size)
+
+    def enqueue(self, client, files):
+        """把文件加入下载队列（已下载或已在队列中的跳过），返回新加入的数量
+
+        Args:
+            client: WebDAVClient
+            files: 文件条目（含 name、content_length）
+        """
+        server = client.base_url
+        count = 0
+        for f in files:
+            key = (server, f['name'])
+            if self.local_path(server, f['name']) is not None:
+                continue
+            with self._lock:
+                if key in self._jobs:
+                    continue
+                self._jobs[key] = client
+                self._cancelled.discard(key)
+                self._retries.pop(key, None)
+                old = self._entries.get(key)
+            self._save(server, DownloadEntry(
+                f['name'], self._local_path(server, f['name']),
+                f.get('content_length') or (old.size if old else None),
+                old.downloaded if old else 0, "queued",
+                old.etag if old else None, None
+            ))
+            self._queue.put(key)
+            count += 1
+        return count
+
+    def resume_pending(self, client):
+        """重新排队该服务器上未完成或因网络错误中断的下载（连接服务器后调用）"""
+        server = client.base_url
+        with self._lock:
+            pending = [e for (s, _), e in self._entries.items()
+                       if s == server and e.status in ("queued", "downloading", "interrupted")]
+        return self.enqueue(client, [{'name': e.path, 'content_length': e.size} for e in pending])
+
+    def cancel(self, server, path):
+        """取消下载（保留已下载部分，之后重新加入时继续）"""
+        with self._lock:
+            self._cancelled.add((server, path))
+
+    def get(self, server, path):
+        return self._entries.get((server, path))
+
+    def local_path(self, server, path):
+        """已下载完成且大小正确的本地文件路径，否则返回 None"""
+        entry = self._entries.get((server, path))
+        if entry is None or entry.status != "done":
+            return None
+        try:
+            if os.path.getsize(entry.local_path) != entry.size:
+                return None
+        except OSError:
+            return None
+        return entry.local_path
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                key = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                client = self._jobs.get(key)
+                cancelled = key in self._cancelled
+            retrying = False
+            before = self._entries[key].downloaded
+            try:
+                if client is not None and not cancelled:
+                    self._download(client, key[1])
+            except httpx.TransportError as e:
+                retrying = self._retry_later(key, before, e)
+            except Exception as e:
+                print(f"下载失败 {key[1]}: {e}")
+                entry = self._entries[key]
+                self._save(key[0], entry._replace(status="failed"))
+            finally:
+                if not retrying:
+                    with self._lock:
+                        self._jobs.pop(key, None)
+                        self._retries.pop(key, None)
+
+    def _retry_later(self, key, before, error):
+        """网络错误：保持排队状态并在退避间隔后重新排队，返回是否会重试"""
+        entry = self._entries[key]
+        with self._lock:
+            # 本次有进展时重新计数
+            attempts = 1 if entry.downloaded > before else self._retries.get(key, 0) + 1
+            self._retries[key] = attempts
+        if attempts > self.MAX_RETRIES or self._stop.is_set():
+            print(f"下载中断 {key[1]}: {error}")
+            self._save(key[0], entry._replace(status="interrupted"))
+            return False
+        delay = self.RETRY_DELAY * 2 ** (attempts - 1)
+        print(f"下载出错，{delay:.0f} 秒后重试 {key[1]}: {error}")
+        self._save(key[0], entry._replace(status="queued"))
+        timer = threading.Timer(delay, self._queue.put, (key,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _download(self, client, path):
+        server = client.base_url
+        key = (server, path)
+        entry = self._entries[key]
+        part_path = entry.local_path + ".part"
+        offset = entry.downloaded if os.path.exists(part_path) else 0
+        try:
+            self._transfer(client, entry, part_path, offset)
+        except _RestartDownload:
+            print(f"本地部分与服务器不一致，重新下载: {path}")
+            self._transfer(client, self._entries[key]._replace(downloaded=0, etag=None), part_path, 0)
+
+    def _transfer(self, client, entry, part_path, offset):
+        """从 offset 继续下载到 .part 文件，完成后校验并改名"""
+        server = client.base_url
+        key = (server, entry.path)
+        # 续传：从断点前 VERIFY_BYTES 开始请求，比对这一段以确认服务器上的文件没有变化
+        verify_from = max(0, offset - self.VERIFY_BYTES)
+        expected = b""
+        if offset > 0:
+            with open(part_path, 'rb') as f:
+                f.seek(verify_from)
+                expected = f.read(offset - verify_from)
+        headers = {"If-Range": entry.etag} if offset > 0 and entry.etag else None
+        response = open_range(self.http, client, entry.path, verify_from, resolver=self.resolver, headers=headers)
+        try:
+            match = _CONTENT_RANGE_RE.match(response.headers.get("content-range", ""))
+            if response.status_code == 206 and match:
+                total = int(match.group(2))
+            elif response.status_code == 200:
+                # 不支持 Range 或文件已变化（If-Range 不匹配）：从头下载
+                if offset > 0:
+                    response.close()
+                    raise _RestartDownload()
+                total = int(response.headers.get("content-length", 0)) or entry.size
+            else:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            if not total:
+                raise RuntimeError("无法获取文件大小")
+            if offset > 0 and entry.size and total != entry.size:
+                response.close()
+                raise _RestartDownload()
+            etag = response.headers.get("etag") or response.headers.get("last-modified")
+            expected_sha256 = _expected_sha256(response.headers)
+            entry = entry._replace(size=total, etag=etag, status="downloading", downloaded=offset)
+            self._save(server, entry)
+
+            os.makedirs(os.path.dirname(part_path) or ".", exist_ok=True)
+            mode = 'r+b' if offset > 0 else 'wb'
+            with open(part_path, mode) as f:
+                if offset == 0:
+                    _preallocate(f, total)
+                f.seek(offset)
+                position = verify_from
+                buffer = bytearray()
+                saved = offset
+                for data in response.iter_bytes():
+                    if self._stop.is_set() or key in self._cancelled:
+                        break
+                    self.limiter.consume(len(data))
+                    if position < offset:
+                        # 断点前的比对段
+                        overlap = min(len(data), offset - position)
+                        if data[:overlap] != expected[position - verify_from:position - verify_from + overlap]:
+                            raise _RestartDownload()
+                        data = data[overlap:]
+                        position += overlap
+                    buffer += data
+                    position += len(data)
+                    if len(buffer) >= self.chunk_size:
+                        f.write(buffer)
+                        buffer.clear()
+                        if position - saved >= self.PROGRESS_INTERVAL:
+                            f.flush()
+                            saved = position
+                            entry = entry._replace(downloaded=position)
+                            self._save(server, entry)
+                f.write(buffer)
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            response.close()
+
+        if position < total:
+            status = "cancelled" if key in self._cancelled else "queued"
+            self._save(server, entry._replace(downloaded=position, status=status))
+            return
+        # 完成：校验大小并计算 SHA-256
+        if os.path.getsize(part_path) != total:
+            raise RuntimeError("文件大小校验失败")
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                digest.update(block)
+        if expected_sha256 is not None and digest.hexdigest() != expected_sha256:
+            # 内容损坏：丢弃本地文件，下次从头下载
+            os.remove(part_path)
+            self._save(server, entry._replace(downloaded=0, etag=None))
+            raise RuntimeError("SHA-256 校验失败")
+        os.replace(part_path, entry.local_path)
+        self._save(server, entry._replace(downloaded=total, status="done", sha256=digest.hexdigest()))
+        print(f"下载完成: {entry.path}")
+
+    def verify(self, server, path):
+        """重新计算本地文件的 SHA-256 并与下载完成时的记录比对（检查本地文件是否损坏）"""
+        entry = self._entries.get((server, path))
+        if entry is None or entry.status != "done" or not entry.sha256:
+            return False
+        digest = hashlib.sha256()
+        try:
+            with open(entry.local_path, 'rb') as f:
+                for block in iter(lambda: f.read(self.chunk_size), b""):
+                    digest.update(block)
+        except OSError:
+            return False
+        return digest.hexdigest() == entry.sha256
+
+    def shutdown(self):
+        """停止下载（进度已保存，下次启动后可继续）
+
+        等待下载线程保存进度后关闭数据库；超时仍未结束的线程（如卡在网络读取）
+        之后的进度不再写入，下次启动时从最后保存的位置续传。
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+        self.http.close()
@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# 播放记录：position/duration 为毫秒，updated_at 为时间戳
+HistoryEntry = namedtuple("HistoryEntry", ["path", "position", "duration", "updated_at"])
+
+
+def _series(path):
+    """剧集所在目录，用作"剧集"分组"""
+    return path.strip("/").rpartition("/")[0]
+
+
+class PlaybackHistory:
+    """逐文件的播放进度记录（SQLite WAL）
+
+    所有记录常驻内存，按 服务器地址 + 路径 O(1) 查询；record() 只更新内存，
+    后台线程每隔 flush_interval 秒把变化的记录在一个事务中批量写入。
+    """
+    # 播放到距结尾这么近（毫秒）时视为已看完，不再续播
+    FINISHED_MARGIN = 10000
+
+    def __init__(self, db_file="history.db", flush_interval=5.0):
+        """
+        Args:
+            db_file: SQLite 数据库文件路径
+            flush_interval: 批量写入间隔（秒）
+        """
+        self.db_file = db_file
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._entries = {}
+        self._dirty = {}
+        # 每个服务器最近播放的记录
+        self._last = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._write_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    duration INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (server, path)
+                )
+            """)
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT server, path, position, duration, updated_at FROM history ORDER BY updated_at"
+            ).fetchall()
+        for server, path, position, duration, updated_at in rows:
+            self._entries[(server, path)] = HistoryEntry(path, position, duration, updated_at)
+            self._last[server] = (server, path)
+
+    def record(self, server, path, position, duration=0):
+        """记录播放进度（只更新内存，由后台线程批量写入）"""
+        key = (server, path)
+        entry = HistoryEntry(path, int(position), int(duration or 0), time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty[key] = entry
+            self._last[server] = key
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="history-writer")
+                self._thread.start()
+
+    def get(self, server, path):
+        """读取文件的播放记录，没有时返回 None"""
+        return self._entries.get((server, path))
+
+    def resume_position(self, server, path):
+        """可续播的位置（毫秒）；没有记录或已看完时返回 0"""
+        entry = self._entries.get((server, path))
+        if entry is None:
+            return 0
+        if entry.duration and entry.duration - entry.position < self.FINISHED_MARGIN:
+            return 0
+        return entry.position
+
+    def last(self, server):
+        """该服务器上最近播放的记录"""
+        key = self._last.get(server)
+        return None if key is None else self._entries.get(key)
+
+    def recent_series(self, server, limit=10):
+        """最近观看的剧集：每个目录取最近播放的一集，按时间从新到旧排列"""
+        with self._lock:
+            entries = [e for (s, _), e in self._entries.items() if s == server]
+        latest = {}
+        for entry in entries:
+            series = _series(entry.path)
+            old = latest.get(series)
+            if old is None or entry.updated_at > old.updated_at:
+                latest[series] = entry
+        return sorted(latest.values(), key=lambda e: e.updated_at, reverse=True)[:limit]
+
+    def flush(self):
+        """立即写入尚未保存的记录"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                dirty, self._dirty = self._dirty, {}
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO history (server, path, position, duration, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(server, e.path, e.position, e.duration, e.updated_at)
+                     for (server, _), e in dirty.items()]
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"保存播放记录失败: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._write_lock:
+            self._conn.close()
@@ -0,0 +1,289 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+# HTTP/2 需要额外安装 h2（pip install httpx[http2]）
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@contextmanager
+def _map_httpcore_errors():
+    """把 httpcore 的异常转换为同名的 httpx 异常（调用方只需处理 httpx 异常）"""
+    import httpcore
+    try:
+        yield
+    except (httpcore.TimeoutException, httpcore.NetworkError, httpcore.ProtocolError,
+            httpcore.ProxyError, httpcore.UnsupportedProtocol) as e:
+        for cls in type(e).__mro__:
+            mapped = getattr(httpx, cls.__name__, None)
+            if isinstance(mapped, type) and issubclass(mapped, httpx.TransportError):
+                raise mapped(str(e)) from e
+        raise
+
+
+class _DNSCachingBackend:
+    """连接池的网络后端（实现 httpcore.NetworkBackend 接口）：按 TTL 缓存域名解析结果
+
+    只作用于本传输层建立的连接，不修改全局的 socket.getaddrinfo。
+    """
+    def __init__(self, ttl, backend=None):
+        import httpcore
+        self.ttl = ttl
+        self._backend = backend or httpcore.SyncBackend()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, host, port):
+        """返回主机的 IP 地址列表（去重、保持解析顺序）"""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            import httpcore
+            raise httpcore.ConnectError(str(e)) from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        import httpcore
+        error = None
+        for address in self._resolve(host, port):
+            try:
+                return self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # 缓存的地址都连不上（可能已变更），下次重新解析
+        self.forget(host, port)
+        raise error or httpcore.ConnectError(f"无法解析主机: {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+class _PoolStream(httpx.SyncByteStream):
+    """httpcore 响应体，读取时转换异常"""
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self):
+        with _map_httpcore_errors():
+            yield from self._stream
+
+    def close(self):
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class _PoolTransport(httpx.BaseTransport):
+    """直接基于 httpcore.ConnectionPool 的传输层（可指定网络后端，不依赖 httpx 的内部属性）"""
+    def __init__(self, limits, http2=False, network_backend=None):
+        import httpcore
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=network_backend,
+        )
+
+    def handle_request(self, request):
+        import httpcore
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_httpcore_errors():
+            response = self._pool.handle_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PoolStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self._pool.close()
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """响应体关闭时释放主机连接配额"""
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class _HostLimitedTransport(httpx.BaseTransport):
+    """在 httpx 连接池之上限制每个主机的并发连接数
+
+    连接池在首次请求时才由 create_pool 创建（加载 httpcore 和 SSL 证书较慢，不占用启动时间）。
+    """
+    def __init__(self, create_pool, max_per_host, acquire_timeout):
+        self._create_pool = create_pool
+        self._transport = None
+        self._max_per_host = max_per_host
+        self._acquire_timeout = acquire_timeout
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, url):
+        key = (url.scheme, url.host, url.port)
+        with self._lock:
+            sem = self._semaphores.get(key)
+            if sem is None:
+                sem = self._semaphores[key] = threading.BoundedSemaphore(self._max_per_host)
+        return sem
+
+    def _pool(self):
+        with self._lock:
+            if self._transport is None:
+                self._transport = self._create_pool()
+            return self._transport
+
+    def handle_request(self, request):
+        sem = self._semaphore(request.url)
+        if not sem.acquire(timeout=self._acquire_timeout):
+            raise httpx.PoolTimeout(f"主机连接数已达上限: {request.url.host}", request=request)
+        try:
+            response = self._pool().handle_request(request)
+        except BaseException:
+            sem.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, sem.release),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        with self._lock:
+            transport, self._transport = self._transport, None
+        if transport is not None:
+            transport.close()
+
+
+class _SharedTransport(httpx.BaseTransport):
+    """交给各个客户端使用的共享连接池视图：关闭客户端不会关闭连接池（由 HttpTransport.close() 关闭）"""
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        return self._transport.handle_request(request)
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """共享 HTTP 传输层
+
+    WebDAV 与搜索客户端共用同一个连接池（keep-alive、可选 HTTP/2），
+    并提供 DNS 缓存、每主机连接数限制和统一的超时配置。
+    """
+    def __init__(self, max_connections=20, max_keepalive=10, keepalive_expiry=30.0,
+                 max_per_host=6, http2=False, connect_timeout=5.0, read_timeout=30.0,
+                 dns_ttl=300):
+        """
+        Args:
+            max_connections: 连接池总连接数上限
+            max_keepalive: 保持空闲的 keep-alive 连接数上限
+            keepalive_expiry: 空闲连接保留时间（秒）
+            max_per_host: 每个主机的并发连接数上限
+            http2: 是否启用 HTTP/2（需要安装 h2，未安装时自动回退）
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取/写入超时（秒），可在单个请求中覆盖
+            dns_ttl: DNS 缓存时间（秒），0 表示不缓存
+        """
+        self.http2 = bool(http2) and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            print("未安装 h2，HTTP/2 已禁用")
+
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.dns_ttl = dns_ttl
+        self.transport = _HostLimitedTransport(
+            lambda: self._create_pool(limits),
+            max_per_host, acquire_timeout=connect_timeout + read_timeout
+        )
+        self._shared = _SharedTransport(self.transport)
+
+    def _create_pool(self, limits):
+        """首次请求时创建连接池（此时才加载 httpcore）"""
+        backend = _DNSCachingBackend(self.dns_ttl) if self.dns_ttl > 0 else None
+        return _PoolTransport(limits, http2=self.http2, network_backend=backend)
+
+    def client_options(self, timeout=None):
+        """供 httpx.Client（及其子类）构造使用的参数"""
+        return {
+            "transport": self._shared,
+            "timeout": self.timeout if timeout is None else timeout,
+        }
+
+    def create_client(self, **kwargs):
+        """创建共享连接池的 httpx.Client"""
+        options = self.client_options(kwargs.pop("timeout", None))
+        options.update(kwargs)
+        return httpx.Client(**options)
+
+    def close(self):
+        """关闭连接池（关闭单个客户端不会关闭共享的连接池）"""
+        self.transport.close()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport():
+    """返回进程级默认传输层（首次调用时创建）"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,379 @@
+import base64
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.stream_resolver import StreamResolver, strip_credentials
+
+# 片头片尾检测需要可选依赖 numpy（pip install numpy）和 ffmpeg 可执行文件
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLE_RATE = 8000
+FRAME = 2048
+HOP = 800
+HOP_SECONDS = HOP / SAMPLE_RATE
+# 16 个对数分布的频带，相邻频带能量差的时间变化构成 15 位指纹
+BAND_EDGES_HZ = (300, 3000)
+BANDS = 16
+FP_BITS = BANDS - 1
+# 静音帧的指纹值，匹配时忽略
+SILENT = 0xFFFFFFFF
+
+# 两帧指纹的汉明距离不超过该值视为相同
+MAX_BIT_ERRORS = 5
+# 以 2 秒窗口平滑匹配结果，窗口内匹配比例超过阈值的帧视为共同片段
+SMOOTH_FRAMES = 20
+SMOOTH_RATIO = 0.5
+# 共同片段的最短/最长时长（秒）
+MIN_SEGMENT = 15
+MAX_SEGMENT = 180
+# 片头需从开头附近开始，才能用"开头跳到片头结束"的方式跳过
+MAX_INTRO_START = 20
+
+_popcount = None
+
+
+def _popcount_table():
+    global _popcount
+    if _popcount is None:
+        values = np.arange(1 << FP_BITS, dtype=np.uint32)
+        counts = np.zeros(1 << FP_BITS, dtype=np.uint8)
+        for bit in range(FP_BITS):
+            counts += ((values >> bit) & 1).astype(np.uint8)
+        _popcount = counts
+    return _popcount
+
+
+def decode_audio(url, seconds, from_end=False, ffmpeg="ffmpeg", headers=None):
+    """用 ffmpeg 解码开头（或结尾）若干秒音频，返回 8kHz 单声道 int16 数组
+
+    Args:
+        headers: 附加的 HTTP 请求头（如 Authorization），通过 -headers 传给 ffmpeg，
+            URL 本身不含用户名密码
+    """
+    seek = ["-sseof", f"-{seconds}"] if from_end else []
+    header_args = ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())] if headers else []
+    cmd = [ffmpeg, "-nostdin", "-v", "error", *seek, *header_args, "-i", url, "-t", str(seconds),
+           "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+    result = subprocess.run(cmd, capture_output=True, timeout=seconds + 120)
+    if result.returncode != 0 and not result.stdout:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg 解码失败")
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def fingerprint(samples):
+    """计算音频指纹：每 0.1 秒一个 15 位整数（静音帧为 SILENT）"""
+    samples = np.asarray(samples, dtype=np.float32)
+    count = (len(samples) - FRAME) // HOP + 1
+    if count < 2:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP][:count]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME).astype(np.float32), axis=1)) ** 2
+
+    freqs = np.geomspace(BAND_EDGES_HZ[0], BAND_EDGES_HZ[1], BANDS + 1)
+    bins = np.round(freqs * FRAME / SAMPLE_RATE).astype(int)
+    energies = np.add.reduceat(spectrum[:, bins[0]:bins[-1]], bins[:-1] - bins[0], axis=1)
+    energies = np.log(energies + 1e-6)
+
+    diff = energies[:, :-1] - energies[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    values = (bits.astype(np.uint32) << np.arange(FP_BITS, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+    # 低能量帧（静音、黑场）在不同剧集间必然"相同"，不能参与匹配
+    power = spectrum.sum(axis=1)
+    quiet = power < max(float(np.median(power)) * 1e-3, 1e-3)
+    values[quiet[1:]] = SILENT
+    return values
+
+
+def _candidate_offsets(a, b, top=5, max_repeat=20):
+    """按完全相同的指纹值统计对齐偏移（b 的帧号 - a 的帧号），返回出现最多的几个"""
+    valid_b = np.flatnonzero(b != SILENT)
+    if len(valid_b) == 0:
+        return []
+    order = valid_b[np.argsort(b[valid_b], kind="stable")]
+    sorted_b = b[order]
+    lo = np.searchsorted(sorted_b, a, "left")
+    hi = np.searchsorted(sorted_b, a, "right")
+    counts = hi - lo
+    # 出现次数过多的值（持续音、噪声）没有区分度
+    keep = (a != SILENT) & (counts > 0) & (counts <= max_repeat)
+    ia = np.flatnonzero(keep)
+    if len(ia) == 0:
+        return []
+    counts = counts[ia]
+    starts = np.repeat(lo[ia], counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ib = order[starts + within]
+    deltas = ib - np.repeat(ia, counts)
+    hist = np.bincount(deltas + len(a))
+    best = np.argsort(hist)[::-1][:top]
+    return [int(d) - len(a) for d in best if hist[d] > 0]
+
+
+def _longest_run(mask):
+    """布尔数组中最长的连续 True 区间 [start, end)"""
+    if not mask.any():
+        return 0, 0
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    i = int(np.argmax(ends - starts))
+    return int(starts[i]), int(ends[i])
+
+
+def match_segment(a, b):
+    """找出两段指纹中最长的共同片段
+
+    Returns:
+        (a 中起始帧, a 中结束帧, b 中起始帧) 或 None
+    """
+    table = _popcount_table()
+    best = None
+    for delta in _candidate_offsets(a, b):
+        a_start = max(0, -delta)
+        a_end = min(len(a), len(b) - delta)
+        if a_end - a_start < SMOOTH_FRAMES:
+            continue
+        seg_a = a[a_start:a_end]
+        seg_b = b[a_start + delta:a_end + delta]
+        valid = (seg_a != SILENT) & (seg_b != SILENT)
+        errors = table[(seg_a ^ seg_b) & ((1 << FP_BITS) - 1)]
+        matched = valid & (errors <= MAX_BIT_ERRORS)
+        smooth = np.convolve(matched.astype(np.float32), np.ones(SMOOTH_FRAMES) / SMOOTH_FRAMES, "same")
+        start, end = _longest_run(smooth >= SMOOTH_RATIO)
+        if best is None or end - start > best[1] - best[0]:
+            best = (a_start + start, a_start + end, a_start + start + delta)
+    if best is None or (best[1] - best[0]) * HOP_SECONDS < MIN_SEGMENT:
+        return None
+    return best
+
+
+def _frame_time(index):
+    """指纹帧号对应的时间（秒）"""
+    return (index + 1) * HOP_SECONDS
+
+
+def detect_intro(heads):
+    """根据各集开头的指纹检测片头，返回片头结束时间（秒），检测不到时返回 None"""
+    ends = {}
+    for i in range(len(heads) - 1):
+        found = match_segment(heads[i], heads[i + 1])
+        if found is None:
+            continue
+        a_start, a_end, b_start = found
+        length = a_end - a_start
+        for index, start in ((i, a_start), (i + 1, b_start)):
+            if _frame_time(start) <= MAX_INTRO_START and length * HOP_SECONDS <= MAX_SEGMENT:
+                ends.setdefault(index, []).append(_frame_time(start + length))
+    if len(ends) < 2:
+        return None
+    return int(np.median([max(v) for v in ends.values()]))
+
+
+def detect_outro(tails):
+    """根据各集结尾的指纹检测片尾，返回片尾开始处距结尾的秒数，检测不到时返回 None
+
+    Args:
+        tails: [(指纹, 该段音频时长秒数)]
+    """
+    remaining = {}
+    for i in range(len(tails) - 1):
+        (a, a_seconds), (b, b_seconds) = tails[i], tails[i + 1]
+        found = match_segment(a, b)
+        if found is None:
+            continue
+        a_start, a_end, b_start = found
+        if (a_end - a_start) * HOP_SECONDS > MAX_SEGMENT:
+            continue
+        remaining.setdefault(i, []).append(a_seconds - _frame_time(a_start))
+        remaining.setdefault(i + 1, []).append(b_seconds - _frame_time(b_start))
+    if len(remaining) < 2:
+        return None
+    return int(np.median([max(v) for v in remaining.values()]))
+
+
+def _fingerprint_file(url, seconds, from_end, ffmpeg, headers=None):
+    """进程池任务：解码并计算指纹，返回 (指纹字节, 音频时长秒数)"""
+    samples = decode_audio(url, seconds, from_end, ffmpeg, headers)
+    return fingerprint(samples).tobytes(), len(samples) / SAMPLE_RATE
+
+
+class FingerprintCache:
+    """音频指纹缓存（SQLite），文件大小变化时失效"""
+    def __init__(self, db_file="fingerprints.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    server TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    part TEXT NOT NULL,
+                    size INTEGER,
+                    seconds REAL NOT NULL,
+                    data BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (server, path, part)
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, server, path, part, size):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, seconds, data FROM fingerprints WHERE server = ? AND path = ? AND part = ?",
+                (server, path, part)
+            ).fetchone()
+        if row is None or (size is not None and row[0] is not None and row[0] != size):
+            return None
+        return np.frombuffer(row[2], dtype=np.uint32), row[1]
+
+    def put(self, server, path, part, size, data, seconds):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (server, path, part, size, seconds, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (server, path, part, size, seconds, data, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IntroDetector:
+    """片头片尾自动检测
+
+    对同一目录下的各集解码开头/结尾若干分钟的音频，计算指纹（进程池并行），
+    在相邻剧集之间寻找共同片段。指纹按文件缓存，目录新增剧集时只需处理新文件。
+    """
+    def __init__(self, db_file="fingerprints.db", workers=2, seconds=180, resolver=None):
+        """
+        Args:
+            db_file: 指纹缓存数据库路径
+            workers: 解码与指纹计算的进程数
+            seconds: 每集分析开头/结尾的时长（秒）
+            resolver: 用于获取直链的 StreamResolver，未提供时自行创建
+        """
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.resolver = resolver
+        self._owns_resolver = False
+        self.seconds = seconds
+        self.workers = workers
+        self.cache = None
+        self._pool = None
+        self._executor = None
+        # 目录 -> 上次分析时的文件集合，未变化时不重复分析
+        self._analyzed = {}
+        self._lock = threading.Lock()
+        if not self.available:
+            print("未安装 numpy 或 ffmpeg，片头片尾自动检测不可用")
+            return
+        self.cache = FingerprintCache(db_file)
+        if self.resolver is None:
+            self.resolver = StreamResolver()
+            self._owns_resolver = True
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intro-detect")
+
+    @property
+    def available(self):
+        return np is not None and self.ffmpeg is not None
+
+    def analyze(self, client, directory, files, on_result):
+        """在后台分析目录下的剧集
+
+        Args:
+            client: WebDAVClient
+            directory: 剧集所在目录
+            files: 按播放顺序排列的文件条目（SmartSorter 排序后的播放列表）
+            on_result: 完成后在后台线程中调用 on_result(directory, 片头秒数或None, 片尾秒数或None)
+        """
+        if not self.available or len(files) < 2:
+            return
+        signature = frozenset(f['name'] for f in files)
+        with self._lock:
+            if self._analyzed.get((client.base_url, directory)) == signature:
+                return
+            self._analyzed[(client.base_url, directory)] = signature
+        self._executor.submit(self._run, client, directory, list(files), on_result)
+
+    def _fingerprints(self, client, files, part):
+        """读取或计算一组文件的指纹，返回与 files 对应的 [(指纹, 时长)]，失败项为 None"""
+        server = client.base_url
+        results = [None] * len(files)
+        missing = []
+        for i, f in enumerate(files):
+            cached = self.cache.get(server, f['name'], part, f.get('content_length'))
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.append(i)
+        if not missing:
+            return results
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures = {}
+        for i in missing:
+            try:
+                url, headers = self._source(client, files[i]['name'])
+            except Exception as e:
+                print(f"解析直链失败 {files[i]['name']}: {e}")
+                continue
+            futures[i] = self._pool.submit(_fingerprint_file, url, self.seconds, part == "tail", self.ffmpeg, headers)
+        for i, future in futures.items():
+            try:
+                data, seconds = future.result()
+            except Exception as e:
+                print(f"音频指纹计算失败 {files[i]['name']}: {e}")
+                continue
+            self.cache.put(server, files[i]['name'], part, files[i].get('content_length'), data, seconds)
+            results[i] = (np.frombuffer(data, dtype=np.uint32), seconds)
+        return results
+
+    def _source(self, client, path):
+        """ffmpeg 读取的地址和请求头
+
+        先解析出直链再交给 ffmpeg：ffmpeg 跟随重定向时会把自定义请求头原样发给新地址，
+        认证信息只在地址与 WebDAV 服务器同源时放在请求头中（不出现在命令行的 URL 里）。
+        """
+        url = self.resolver.cached_url(client, path) or self.resolver.resolve(client, path)
+        url = strip_credentials(url)
+        target = urllib.parse.urlsplit(url)
+        origin = urllib.parse.urlsplit(strip_credentials(client.base_url))
+        if (target.scheme, target.netloc) != (origin.scheme, origin.netloc):
+            return url, None
+        token = base64.b64encode(f"{client.username}:{client.password}".encode("utf-8")).decode("ascii")
+        return url, {"Authorization": f"Basic {token}"}
+
+    def _run(self, client, directory, files, on_result):
+        try:
+            heads = [r[0] for r in self._fingerprints(client, files, "head") if r is not None]
+            tails = [r for r in self._fingerprints(client, files, "tail") if r is not None]
+            intro = detect_intro(heads)
+            outro = detect_outro(tails)
+        except Exception as e:
+            print(f"片头片尾检测失败 {directory}: {e}")
+            return
+        print(f"片头片尾检测 {directory}: 片头 {intro}s, 片尾 {outro}s")
+        on_result(directory, intro, outro)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+        if self._owns_resolver:
+            self.resolver.shutdown()
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """子目录预取器
+
+    展开目录后，在后台预先列出前 N 个子目录，结果写入 WebDAVClient 的目录缓存，
+    之后再展开这些子目录时即可直接命中缓存。
+    """
+    def __init__(self, max_dirs=5, max_workers=2, max_entries=2000):
+        """
+        Args:
+            max_dirs: 每次展开最多预取的子目录数
+            max_workers: 并发预取请求数
+            max_entries: 每次展开预取的条目总数上限，超出后停止继续预取
+        """
+        self.max_dirs = max_dirs
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._futures = []
+
+    def prefetch(self, client, paths):
+        """预取给定子目录（取前 max_dirs 个），会取消上一次尚未开始的预取"""
+        if client is None or client.cache is None:
+            return
+
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            for future in self._futures:
+                future.cancel()
+            budget = {"entries": 0}
+            self._futures = [
+                self.executor.submit(self._fetch_one, client, path, generation, budget)
+                for path in paths[:self.max_dirs]
+                if client.cached_files(path) is None
+            ]
+
+    def _fetch_one(self, client, path, generation, budget):
+        with self._lock:
+            # 已被新的展开取代，或本轮预算已用完
+            if generation != self._generation or budget["entries"] >= self.max_entries:
+                return
+        items = client.list_files(path)
+        with self._lock:
+            budget["entries"] += len(items)
+
+    def shutdown(self):
+        with self._lock:
+            self._generation += 1
+            for future in self._futures:
+                future.cancel()
+            self._futures = []
+        self.executor.shutdown(wait=False)
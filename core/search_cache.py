@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_keyword(keyword):
+    """统一关键词形式：全角转半角、忽略大小写、合并空白"""
+    keyword = unicodedata.normalize("NFKC", keyword or "")
+    return _SPACE_RE.sub(" ", keyword).strip().lower()
+
+
+class SearchCache:
+    """搜索结果缓存（LRU + TTL）
+
+    以 服务器地址 + 规范化关键词 为键，超过容量时淘汰最久未使用的条目，
+    超过 TTL 的条目视为未命中。指定 cache_file 时，save() 把未过期条目写入磁盘，
+    下次启动时自动载入。
+    """
+    def __init__(self, max_entries=200, ttl=1800, cache_file=None):
+        """
+        Args:
+            max_entries: 最多缓存的查询数
+            ttl: 条目有效期（秒）
+            cache_file: 持久化文件路径，None 表示只在内存中缓存
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(server, keyword):
+        return f"{server}\n{normalize_keyword(keyword)}"
+
+    def get(self, server, keyword):
+        """读取缓存结果，未命中或已过期时返回 None"""
+        key = self._key(server, keyword)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, server, keyword, results):
+        """写入（覆盖）缓存结果"""
+        key = self._key(server, keyword)
+        with self._lock:
+            self._entries[key] = (time.time(), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """从持久化文件载入未过期的条目"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except Exception as e:
+            print(f"加载搜索缓存失败: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            # 文件中按从旧到新的使用顺序保存
+            for key, fetched_at, results in stored:
+                if now - fetched_at <= self.ttl:
+                    self._entries[key] = (fetched_at, results)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """把未过期的条目写入持久化文件"""
+        if not self.cache_file:
+            return
+        now = time.time()
+        with self._lock:
+            stored = [
+                [key, fetched_at, results]
+                for key, (fetched_at, results) in self._entries.items()
+                if now - fetched_at <= self.ttl
+            ]
+        tmp_file = self.cache_file + ".tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"保存搜索缓存失败: {e}")
@@ -1,21 +1,114 @@
-import httpx
+import html as html_lib
 import re
 from urllib.parse import urlparse
+from core.http_transport import get_default_transport
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_HREF_RE = re.compile(r'href=["\']?([^"\'>\s]+)')
+_PERCENT_RE = re.compile(r'(?:%[0-9A-Fa-f]{2})+')
+
+
+def _unquote(text):
+    """URL 解码（结果与 urllib.parse.unquote 相同，连续的 %XX 一次性按 UTF-8 解码）"""
+    return _PERCENT_RE.sub(lambda m: bytes.fromhex(m.group().replace("%", "")).decode("utf-8", "replace"), text)
+
+
+class ResultParser:
+    """搜索结果页的增量解析器
+
+    逐块 feed() HTML，线性扫描其中的 <a href=...>文本</a>，每次返回新解析出的结果路径：
+    去掉高亮等内部标签，解码 HTML 实体与 URL 编码，并去除重复结果。
+    未闭合的链接保留到下一块继续解析，每个字符只扫描常数次。
+    """
+    def __init__(self):
+        self._buffer = ""
+        self._seen = set()
+
+    def feed(self, chunk):
+        """解析一块 HTML，返回其中新出现的结果"""
+        buf = self._buffer + chunk if self._buffer else chunk
+        results = []
+        pos = 0
+        while True:
+            start = buf.find("<a", pos)
+            if start < 0:
+                # 保留末尾可能是 "<a" 前半部分的一个字符
+                pos = max(pos, len(buf) - 1)
+                break
+            after = buf[start + 2:start + 3]
+            if not after:
+                pos = start
+                break
+            if not after.isspace() and after != ">":
+                # <abbr>、<area> 等其他标签
+                pos = start + 2
+                continue
+            tag_end = buf.find(">", start)
+            if tag_end < 0:
+                pos = start
+                break
+            close = buf.find("</a>", tag_end)
+            if close < 0:
+                pos = start
+                break
+            pos = close + 4
+            if _HREF_RE.search(buf, start, tag_end) is None:
+                continue
+            text = self._clean(buf[tag_end + 1:close])
+            if text is not None and text not in self._seen:
+                self._seen.add(text)
+                results.append(text)
+        self._buffer = buf[pos:]
+        return results
+
+    def close(self):
+        """输入结束；未闭合的链接被丢弃"""
+        self._buffer = ""
+        return []
+
+    @staticmethod
+    def _clean(text):
+        """提取链接文本中的路径，不是有效结果时返回 None"""
+        # 移除可能的HTML标签（如高亮）
+        if "<" in text:
+            text = _TAG_RE.sub("", text)
+        if "&" in text:
+            text = html_lib.unescape(text)
+        # 解码URL编码（如果有）
+        if "%" in text:
+            text = _unquote(text)
+        text = text.strip()
+        
+        # 过滤无效链接
+        if not text or "返回" in text or "关注" in text:
+            return None
+        # 过滤非路径内容（路径通常包含 /）
+        if "/" not in text:
+            return None
+        return text
+
 
 class SearchClient:
     """小雅搜索客户端"""
     
-    def __init__(self, webdav_url):
+    def __init__(self, webdav_url, transport=None, cache=None):
         """
         初始化搜索客户端
         
         Args:
             webdav_url: WebDAV服务器地址 (e.g. http://1.2.3.4:5678/dav)
+            transport: 共享的 HttpTransport，默认使用进程级连接池
+            cache: 可选的 SearchCache，重复搜索直接返回缓存结果
         """
         # 从 WebDAV URL 提取 Base URL (去掉 /dav)
         parsed = urlparse(webdav_url)
         self.base_url = f"{parsed.scheme}://{parsed.netloc}"
         
+        # 与 WebDAV 客户端共用连接池，避免每次搜索重新建立 TCP 连接
+        self.transport = transport or get_default_transport()
+        self.http = self.transport.create_client()
+        self.cache = cache
+        
     def search(self, keyword):
         """
         搜索视频文件
@@ -26,6 +119,40 @@ class SearchClient:
         Returns:
             List[str]: 包含搜索结果路径的列表
         """
+        try:
+            return list(self.iter_search(keyword))
+        except Exception as e:
+            print(f"[ERROR] Search failed: {e}")
+            return []
+
+    def iter_search(self, keyword, cancelled=None):
+        """
+        流式搜索：边下载结果页边解析，逐条产出结果路径
+        
+        Args:
+            keyword: 搜索关键词
+            cancelled: 可选的无参函数，返回 True 时停止读取并关闭连接
+            
+        Yields:
+            str: 搜索结果路径
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.base_url, keyword)
+            if cached is not None:
+                yield from cached
+                return
+        
+        results = []
+        for path in self._stream_results(keyword, cancelled):
+            results.append(path)
+            yield path
+        
+        # 只缓存完整读取的结果
+        if self.cache is not None and not (cancelled is not None and cancelled()):
+            self.cache.put(self.base_url, keyword, results)
+
+    def _stream_results(self, keyword, cancelled):
+        """请求搜索页并边接收边解析"""
         url = f"{self.base_url}/search"
         params = {
             "box": keyword,
@@ -35,47 +162,16 @@ class SearchClient:
         
         print(f"[DEBUG] Searching: {url} with params {params}")
         
-        try:
-            response = httpx.get(url, params=params, timeout=10)
+        with self.http.stream("GET", url, params=params, timeout=10) as response:
             response.raise_for_status()
-            return self._parse_results(response.text)
-        except Exception as e:
-            print(f"[ERROR] Search failed: {e}")
-            return []
+            parser = ResultParser()
+            for chunk in response.iter_text():
+                if cancelled is not None and cancelled():
+                    return
+                yield from parser.feed(chunk)
+            yield from parser.close()
 
     def _parse_results(self, html):
-        """解析HTML搜索结果"""
-        results = []
-        # 正则匹配链接：<a ... href="/path" ...>text</a>
-        # 注意：href可能包含URL编码，text可能包含HTML实体
-        # 我们主要关心text部分，因为它通常是完整路径
-        
-        # 匹配 href 和 text
-        # 兼容 href="/path" 和 href=/path (无引号)
-        pattern = r'<a[^>]*href=["\']?([^"\'>\s]+)["\']?[^>]*>(.*?)</a>'
-        matches = re.findall(pattern, html, re.DOTALL)
-        
-        for href, text in matches:
-            text = text.strip()
-            
-            # 过滤无效链接
-            if not text or "返回" in text or "关注" in text:
-                continue
-                
-            # 过滤非路径内容（路径通常包含 /）
-            if '/' not in text:
-                continue
-                
-            # 移除可能的HTML标签（如高亮）
-            text = re.sub(r'<[^>]+>', '', text)
-            
-            # 解码URL编码（如果有）
-            try:
-                from urllib.parse import unquote
-                text = unquote(text)
-            except:
-                pass
-            
-            results.append(text)
-            
-        return results
+        """解析HTML搜索结果（完整页面）"""
+        parser = ResultParser()
+        return parser.feed(html) + parser.close()
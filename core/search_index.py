@@ -0,0 +1,222 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+# 拼音首字母匹配需要可选依赖 pypinyin（pip install pypinyin）
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+_CJK_RE = re.compile(r'[一-鿿]')
+_ASCII_QUERY_RE = re.compile(r'^[a-z0-9]+$')
+
+
+def _initials(name):
+    """中文名称的拼音首字母（非中文部分保持原样），没有中文时返回空串"""
+    if lazy_pinyin is None or not _CJK_RE.search(name):
+        return ""
+    return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors="default")).lower()
+
+
+class _Snapshot:
+    """一次构建的只读索引数据，构建完成后整体替换，查询无需加锁"""
+    def __init__(self, server, paths, is_dir, names, sorted_names, sorted_ids, postings,
+                 blob, offsets, py_blob, py_offsets):
+        # 索引所属的服务器地址
+        self.server = server
+        self.paths = paths
+        self.is_dir = is_dir
+        self.names = names
+        self.sorted_names = sorted_names
+        self.sorted_ids = sorted_ids
+        self.postings = postings
+        self.blob = blob
+        self.offsets = offsets
+        self.py_blob = py_blob
+        self.py_offsets = py_offsets
+
+
+class LocalSearchIndex:
+    """本地搜索引擎
+
+    对索引路径的文件名建立三元组倒排索引，支持子串匹配、拼音首字母匹配和结果排序。
+    与 SearchClient 相同的 search(keyword) -> list[str] 接口，
+    返回目录路径（文件命中时返回其所在目录）。
+    """
+    # 每类匹配最多参与排序的条目数，保证宽泛关键词的查询时间有上限
+    MAX_HITS = 2000
+
+    def __init__(self, limit=200):
+        """
+        Args:
+            limit: 单次查询返回的最大结果数
+        """
+        self.limit = limit
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._snapshot is not None and len(self._snapshot.paths) > 0
+
+    @property
+    def server(self):
+        """当前索引所属的服务器地址"""
+        snap = self._snapshot
+        return None if snap is None else snap.server
+
+    def ready_for(self, server):
+        """索引已就绪且属于该服务器（切换服务器后旧索引不再使用）"""
+        snap = self._snapshot
+        return snap is not None and snap.server == server and len(snap.paths) > 0
+
+    def reset(self):
+        """丢弃当前索引"""
+        with self._lock:
+            self._snapshot = None
+
+    def __len__(self):
+        return 0 if self._snapshot is None else len(self._snapshot.paths)
+
+    def build(self, entries, server=None):
+        """从 (path, is_dir) 序列构建索引，server 为索引所属的服务器地址"""
+        # 目录排在前面：候选集按ID截断时优先保留目录
+        entries = sorted(entries, key=lambda e: not e[1])
+
+        paths = []
+        is_dir = bytearray()
+        names = []
+        initials = []
+        postings = {}
+
+        for path, directory in entries:
+            i = len(paths)
+            name = path.rstrip("/").rsplit("/", 1)[-1].lower()
+            paths.append(path)
+            is_dir.append(1 if directory else 0)
+            names.append(name)
+            initials.append(_initials(name))
+            for gram in {name[j:j + 3] for j in range(len(name) - 2)}:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(i)
+
+        # 按名称排序的ID表，用于二分查找前缀匹配
+        sorted_ids = array('I', sorted(range(len(names)), key=names.__getitem__))
+        sorted_names = [names[i] for i in sorted_ids]
+
+        blob, offsets = self._join(names)
+        py_blob, py_offsets = self._join(initials)
+        snapshot = _Snapshot(server, paths, is_dir, names, sorted_names, sorted_ids, postings,
+                             blob, offsets, py_blob, py_offsets)
+        with self._lock:
+            self._snapshot = snapshot
+
+    def build_from(self, library_index, server):
+        """从 LibraryIndex 构建"""
+        self.build(library_index.iter_paths(server), server)
+
+    @staticmethod
+    def _join(strings):
+        """把字符串拼成一个以换行分隔的大串，并记录每段的起始偏移，用于 C 级别的子串扫描"""
+        offsets = array('I')
+        pos = 0
+        for s in strings:
+            offsets.append(pos)
+            pos += len(s) + 1
+        return "\n".join(strings), offsets
+
+    @staticmethod
+    def _scan(blob, offsets, keyword, max_hits):
+        """在拼接串中扫描子串，按ID顺序返回命中的条目ID"""
+        hits = []
+        last = -1
+        for match in re.finditer(re.escape(keyword), blob):
+            i = bisect_right(offsets, match.start()) - 1
+            if i != last:
+                hits.append(i)
+                last = i
+                if len(hits) >= max_hits:
+                    break
+        return hits
+
+    def _prefix_hits(self, snap, keyword):
+        """名称以关键词开头的条目（二分查找）"""
+        names = snap.sorted_names
+        start = bisect_left(names, keyword)
+        end = start
+        limit = min(len(names), start + self.MAX_HITS)
+        while end < limit and names[end].startswith(keyword):
+            end += 1
+        return snap.sorted_ids[start:end]
+
+    def _contains_hits(self, snap, keyword):
+        """名称包含关键词的条目；查询短于 3 个字符时退化为全文扫描
+
+        取关键词各三元组中最短的倒排表（已按ID升序）逐个校验子串，
+        其余倒排表只用于判断是否存在，无需求交集。
+        """
+        if len(keyword) < 3:
+            return self._scan(snap.blob, snap.offsets, keyword, self.MAX_HITS)
+
+        shortest = None
+        for gram in {keyword[j:j + 3] for j in range(len(keyword) - 2)}:
+            posting = snap.postings.get(gram)
+            if posting is None:
+                return []
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+
+        names = snap.names
+        hits = []
+        for i in shortest:
+            if keyword in names[i]:
+                hits.append(i)
+                if len(hits) >= self.MAX_HITS:
+                    break
+        return hits
+
+    def search(self, keyword):
+        """
+        搜索本地索引
+
+        Args:
+            keyword: 搜索关键词
+
+        Returns:
+            List[str]: 按相关度排序的目录路径列表
+        """
+        snap = self._snapshot
+        keyword = keyword.strip().lower()
+        if snap is None or not keyword:
+            return []
+
+        ranked = {}
+
+        def add(i, rank):
+            name = snap.names[i]
+            # 搜索结果在界面上按目录打开，文件命中时返回所在目录
+            if snap.is_dir[i]:
+                path = snap.paths[i]
+            else:
+                path = snap.paths[i].rsplit("/", 1)[0] or "/"
+            key = (rank, 0 if snap.is_dir[i] else 1, path.count("/"), len(name), path)
+            old = ranked.get(path)
+            if old is None or key < old:
+                ranked[path] = key
+
+        for i in self._prefix_hits(snap, keyword):
+            add(i, 0 if snap.names[i] == keyword else 1)
+        for i in self._contains_hits(snap, keyword):
+            add(i, 2)
+
+        # 纯字母数字查询同时尝试拼音首字母匹配
+        if snap.py_blob and _ASCII_QUERY_RE.match(keyword):
+            for i in self._scan(snap.py_blob, snap.py_offsets, keyword, self.MAX_HITS):
+                add(i, 3)
+
+        results = sorted(ranked, key=ranked.get)
+        return results[:self.limit]
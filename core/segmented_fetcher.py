@@ -0,0 +1,164 @@
+import threading
+import time
+
+
+class _Segment:
+    """一个分段：[start, end] 区间；start 为尚未读取的位置，fetched 为下一个要下载的位置"""
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.fetched = start
+        self.data = bytearray()
+        self.done = False
+
+
+class SegmentedFetcher:
+    """多连接分段下载
+
+    许多存储后端限制单连接速度。把区间切成若干分段，用多个连接并行下载播放位置之后的分段，
+    按顺序重组后逐块产出；首个分段边下载边产出，不必等整段完成。
+    分段大小按实测的单连接速度自适应（每段约 segment_seconds 秒），
+    预读量不超过 max_ahead 字节，消费方停止读取（如播放器跳转）后调用 close() 结束下载。
+    """
+    # 单个分段下载失败时的重试次数（从已收到的位置继续）
+    RETRIES = 2
+
+    def __init__(self, open_range, start, end, connections=4, min_segment=512 * 1024,
+                 max_segment=8 * 1024 * 1024, max_ahead=64 * 1024 * 1024, segment_seconds=2.0):
+        """
+        Args:
+            open_range: open_range(start, end) 返回远程区间的流式 httpx 响应
+            start, end: 要下载的区间（包含 end）
+            connections: 并行连接数
+            min_segment, max_segment: 分段大小范围（字节）
+            max_ahead: 已下载（或已分配）但尚未被读取的最大字节数
+            segment_seconds: 按单连接速度计算分段大小时，每个分段的目标下载时长
+        """
+        self.open_range = open_range
+        self.end = end
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self.max_ahead = max_ahead
+        self.segment_seconds = segment_seconds
+        self.bytes_downloaded = 0
+        self._cond = threading.Condition()
+        self._segments = []
+        self._next = start
+        self._consumed = start
+        # 单连接速度（字节/秒）的指数滑动平均
+        self._rate = None
+        self._error = None
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"segment-{i}")
+            for i in range(max(1, connections))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _segment_size(self):
+        """按单连接速度计算下一个分段的大小（调用方持有锁）"""
+        if self._rate is None:
+            return self.min_segment
+        size = int(self._rate * self.segment_seconds)
+        return max(self.min_segment, min(self.max_segment, size))
+
+    def _assign(self):
+        """分配下一个分段，没有剩余区间或已关闭时返回 None（调用方持有锁）"""
+        while not self._closed and self._next <= self.end and self._next - self._consumed >= self.max_ahead:
+            self._cond.wait()
+        if self._closed or self._next > self.end:
+            return None
+        segment = _Segment(self._next, min(self._next + self._segment_size() - 1, self.end))
+        self._next = segment.end + 1
+        self._segments.append(segment)
+        return segment
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                segment = self._assign()
+            if segment is None:
+                return
+            try:
+                self._download(segment)
+            except Exception as e:
+                with self._cond:
+                    if self._error is None:
+                        self._error = e
+                    self._closed = True
+                    self._cond.notify_all()
+                return
+
+    def _download(self, segment):
+        """下载一个分段，中途断开时从已收到的位置重试"""
+        for attempt in range(self.RETRIES + 1):
+            began = time.monotonic()
+            received = 0
+            try:
+                response = self.open_range(segment.fetched, segment.end)
+                try:
+                    if response.status_code != 206:
+                        raise RuntimeError(f"服务器不支持分段请求（HTTP {response.status_code}）")
+                    for data in response.iter_bytes():
+                        with self._cond:
+                            if self._closed:
+                                return
+                            data = data[:segment.end - segment.fetched + 1]
+                            segment.data += data
+                            segment.fetched += len(data)
+                            received += len(data)
+                            self.bytes_downloaded += len(data)
+                            self._cond.notify_all()
+                        if segment.fetched > segment.end:
+                            break
+                finally:
+                    response.close()
+            except Exception:
+                if attempt == self.RETRIES:
+                    raise
+                continue
+            if segment.fetched <= segment.end:
+                if attempt == self.RETRIES:
+                    raise RuntimeError("远程响应提前结束")
+                continue
+            elapsed = time.monotonic() - began
+            with self._cond:
+                segment.done = True
+                if elapsed > 0 and received >= self.min_segment // 4:
+                    rate = received / elapsed
+                    self._rate = rate if self._rate is None else 0.7 * self._rate + 0.3 * rate
+                self._cond.notify_all()
+            return
+
+    def __iter__(self):
+        """按顺序产出数据"""
+        while True:
+            with self._cond:
+                while True:
+                    if self._error is not None:
+                        raise self._error
+                    if self._consumed > self.end:
+                        return
+                    segment = self._segments[0] if self._segments else None
+                    if segment is not None and segment.start == self._consumed and (
+                            segment.data or segment.done):
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                data = bytes(segment.data)
+                segment.data.clear()
+                segment.start += len(data)
+                if segment.done and segment.start > segment.end:
+                    self._segments.pop(0)
+                self._consumed += len(data)
+                self._cond.notify_all()
+            if data:
+                yield data
+
+    def close(self):
+        """停止下载（已开始的请求在收到下一块数据时断开）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# 解析结果：intro/outro 为秒数，*_source 为提供该值的目录（None 表示使用全局默认值），
+# *_auto 表示该值来自自动检测（而非用户手动设置）
+SkipSettings = namedtuple("SkipSettings", ["intro", "outro", "intro_source", "outro_source",
+                                           "intro_auto", "outro_auto"])
+
+
+def _norm_dir(path):
+    return "/" + path.strip("/")
+
+
+class SkipProfiles:
+    """按目录保存的片头/片尾跳过设置（SQLite）
+
+    每个目录可以单独设置片头或片尾，未设置的项继承上级目录；
+    每项记录来源（手动设置或自动检测），自动检测只能覆盖之前自动检测的值。
+    所有设置常驻内存，解析一个文件只需沿路径向上查找，O(目录深度)。
+    """
+    def __init__(self, db_file="skip_profiles.db"):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # (服务器地址, 目录) -> [片头, 片尾, 片头是否自动检测, 片尾是否自动检测]，None 表示继承
+        self._profiles = {}
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    server TEXT NOT NULL,
+                    dir TEXT NOT NULL,
+                    intro INTEGER,
+                    outro INTEGER,
+                    intro_auto INTEGER NOT NULL DEFAULT 0,
+                    outro_auto INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (server, dir)
+                )
+            """)
+            # 旧版本的数据库没有来源列，已有的值都视为手动设置
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(profiles)")}
+            for column in ("intro_auto", "outro_auto"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE profiles ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            self._conn.commit()
+            for server, directory, intro, outro, intro_auto, outro_auto in self._conn.execute(
+                    "SELECT server, dir, intro, outro, intro_auto, outro_auto FROM profiles"):
+                self._profiles[(server, directory)] = [intro, outro, bool(intro_auto), bool(outro_auto)]
+
+    def resolve(self, server, file_path, default_intro=0, default_outro=0):
+        """解析文件适用的片头/片尾设置：从所在目录向上逐级查找，找不到时使用默认值"""
+        intro = outro = None
+        intro_source = outro_source = None
+        intro_auto = outro_auto = False
+        directory = _norm_dir(file_path.strip("/").rpartition("/")[0])
+        while True:
+            profile = self._profiles.get((server, directory))
+            if profile is not None:
+                if intro is None and profile[0] is not None:
+                    intro, intro_source, intro_auto = profile[0], directory, profile[2]
+                if outro is None and profile[1] is not None:
+                    outro, outro_source, outro_auto = profile[1], directory, profile[3]
+                if intro is not None and outro is not None:
+                    break
+            if directory == "/":
+                break
+            directory = directory.rsplit("/", 1)[0] or "/"
+        return SkipSettings(
+            default_intro if intro is None else intro,
+            default_outro if outro is None else outro,
+            intro_source,
+            outro_source,
+            intro_auto,
+            outro_auto,
+        )
+
+    def set(self, server, directory, auto=False, **values):
+        """设置目录的片头/片尾（intro=秒数 / outro=秒数，None 表示改为继承上级）
+
+        Args:
+            auto: 设置的值是否来自自动检测
+        """
+        key = (server, _norm_dir(directory))
+        with self._lock:
+            self._store(key, values, auto)
+
+    def set_detected(self, server, directory, intro=None, outro=None):
+        """保存自动检测结果，返回是否有更新
+
+        覆盖本目录或上级目录中自动检测的值，不覆盖手动设置（包括从上级目录继承的手动设置）。
+        """
+        key = (server, _norm_dir(directory))
+        with self._lock:
+            settings = self.resolve(server, key[1].rstrip("/") + "/_")
+            values = {}
+            if intro is not None and (settings.intro_source is None or settings.intro_auto) \
+                    and settings.intro != intro:
+                values["intro"] = intro
+            if outro is not None and (settings.outro_source is None or settings.outro_auto) \
+                    and settings.outro != outro:
+                values["outro"] = outro
+            if values:
+                self._store(key, values, auto=True)
+        return bool(values)
+
+    def _store(self, key, values, auto):
+        """更新内存和数据库中的设置（调用方持有锁）"""
+        profile = list(self._profiles.get(key, [None, None, False, False]))
+        if "intro" in values:
+            profile[0] = values["intro"]
+            profile[2] = auto and values["intro"] is not None
+        if "outro" in values:
+            profile[1] = values["outro"]
+            profile[3] = auto and values["outro"] is not None
+        if profile[:2] == [None, None]:
+            self._profiles.pop(key, None)
+            self._conn.execute("DELETE FROM profiles WHERE server = ? AND dir = ?", key)
+        else:
+            self._profiles[key] = profile
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (server, dir, intro, outro, intro_auto, outro_auto, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], profile[0], profile[1], int(profile[2]), int(profile[3]), time.time())
+            )
+        self._conn.commit()
+
+    def get(self, server, directory):
+        """目录自身的设置 (片头, 片尾)，未设置的项为 None"""
+        profile = self._profiles.get((server, _norm_dir(directory)))
+        return (None, None) if profile is None else tuple(profile[:2])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
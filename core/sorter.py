@@ -1,11 +1,76 @@
 import re
+from functools import lru_cache
+
+# 各模式分别匹配（re 本身会缓存编译结果，预编译只省去查找缓存的开销）。
+# 合并为一次扫描的分词器在 CPython 中逐段处理的开销更大，实测比分别匹配更慢；
+# 重复排序的加速来自下面按文件名缓存的排序键。
+_SE_RE = re.compile(r'(?i)S(\d+)E(\d+)')
+_EP_RE = re.compile(r'第(\d+)集')
+_YEAR_RE = re.compile(r'(19|20)\d{2}')
+_RES_RE = re.compile(r'\d{3,4}p')
+# 贪婪匹配从末尾回退，一次匹配即取到最后一段完整的数字
+_LAST_NUM_RE = re.compile(r'.*(?<!\d)(\d+)', re.S)
+
+# 排序键缓存的最大条目数
+KEY_CACHE_SIZE = 131072
+
+
+def _compute_key(filename):
+    """按文件名计算排序键"""
+    # 优先级1: SxxExx 格式（如 S01E01）
+    s_e_match = _SE_RE.search(filename)
+    if s_e_match:
+        return (1, int(s_e_match.group(1)), int(s_e_match.group(2)))
+
+    # 优先级2: "第xx集" 格式
+    ep_match = _EP_RE.search(filename)
+    if ep_match:
+        return (2, 0, int(ep_match.group(1)))
+
+    # 优先级3: 文件名中的最后一个数字
+    base_name = filename.rsplit('.', 1)[0]
+    clean_name = _YEAR_RE.sub('', base_name)  # 移除年份
+    clean_name = _RES_RE.sub('', clean_name)  # 移除分辨率
+
+    num_match = _LAST_NUM_RE.match(clean_name)
+    if num_match:
+        return (3, 0, int(num_match.group(1)))
+
+    # 优先级4: 原始文件名
+    return (4, 0, filename)
+
+
+# 按文件名缓存排序键，重复列出同一目录时无需重新匹配
+_filename_key = lru_cache(maxsize=KEY_CACHE_SIZE)(_compute_key)
+
+
+def _sort_by_keys(items, keys):
+    """按预先计算的排序键稳定排序"""
+    order = sorted(range(len(items)), key=keys.__getitem__)
+    return [items[i] for i in order]
+
 
 class SmartSorter:
     """智能文件排序器"""
     @staticmethod
     def sort_files(files: list) -> list:
         """根据剧集编号排序文件"""
-        return sorted(files, key=SmartSorter._get_sort_key)
+        return _sort_by_keys(files, SmartSorter.sort_keys(files))
+
+    @staticmethod
+    def sort_names(names: list) -> list:
+        """批量排序文件名字符串，结果与 sort_files 一致"""
+        return _sort_by_keys(names, SmartSorter.sort_keys(names))
+
+    @staticmethod
+    def sort_keys(files: list) -> list:
+        """批量计算排序键（文件条目字典或文件名均可）"""
+        # 超过缓存容量的批量计算直接计算，避免逐出缓存中的常用条目
+        key = _compute_key if len(files) > KEY_CACHE_SIZE else _filename_key
+        return [
+            key(f.get('name', '') if isinstance(f, dict) else str(f))
+            for f in files
+        ]
 
     @staticmethod
     def _get_sort_key(file_item):
@@ -14,34 +79,12 @@ class SmartSorter:
             filename = file_item.get('name', '')
         else:
             filename = str(file_item)
-            
-        # 优先级1: SxxExx 格式（如 S01E01）
-        s_e_match = re.search(r'(?i)S(\d+)E(\d+)', filename)
-        if s_e_match:
-            season = int(s_e_match.group(1))
-            episode = int(s_e_match.group(2))
-            return (1, season, episode)
-            
-        # 优先级2: "第xx集" 格式
-        ep_match = re.search(r'第(\d+)集', filename)
-        if ep_match:
-            episode = int(ep_match.group(1))
-            return (2, 0, episode)
-            
-        # 优先级3: 文件名中的最后一个数字
-        base_name = filename.rsplit('.', 1)[0]
-        clean_name = re.sub(r'(19|20)\d{2}', '', base_name)  # 移除年份
-        clean_name = re.sub(r'\d{3,4}p', '', clean_name)      # 移除分辨率
-        
-        nums = re.findall(r'\d+', clean_name)
-        if nums:
-            try:
-                return (3, 0, int(nums[-1]))
-            except ValueError:
-                pass
-                
-        # 优先级4: 原始文件名
-        return (4, 0, filename)
+        return _filename_key(filename)
+
+    @staticmethod
+    def clear_cache():
+        """清空排序键缓存"""
+        _filename_key.cache_clear()
 
 if __name__ == "__main__":
     # Test cases
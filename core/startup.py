@@ -0,0 +1,71 @@
+import importlib
+import threading
+import time
+
+
+class StartupTimeline:
+    """启动时间线
+
+    记录各启动阶段相对起点（main.py 最先导入本模块时）的耗时，
+    窗口可交互且 libvlc 就绪后输出一次报告，便于发现拖慢冷启动的环节。
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.marks = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """记录一个阶段完成（可在任意线程调用）"""
+        with self._lock:
+            self.marks.append((name, time.perf_counter()))
+
+    def elapsed(self, name):
+        """阶段完成时相对起点的毫秒数，尚未记录时返回 None"""
+        with self._lock:
+            for mark, at in self.marks:
+                if mark == name:
+                    return (at - self.origin) * 1000
+        return None
+
+    def report(self):
+        """各阶段耗时：阶段 累计毫秒 (+本阶段毫秒)"""
+        with self._lock:
+            marks = sorted(self.marks, key=lambda m: m[1])
+        lines = []
+        previous = self.origin
+        for name, at in marks:
+            lines.append(f"  {name}: {(at - self.origin) * 1000:.1f}ms (+{(at - previous) * 1000:.1f}ms)")
+            previous = at
+        return "\n".join(lines)
+
+    def report_once(self, *required):
+        """required 中的阶段都已记录后输出一次报告"""
+        if self.reported or any(self.elapsed(name) is None for name in required):
+            return
+        self.reported = True
+        print("启动耗时:\n" + self.report())
+
+
+# 进程级时间线
+timeline = StartupTimeline()
+
+
+def preload_modules(names, on_done=None):
+    """在后台线程中预先导入模块，之后首次使用时不再阻塞界面线程
+
+    Args:
+        names: 模块名列表
+        on_done: 可选，全部导入完成后在后台线程中调用（通常传入信号的 emit）
+    """
+    def load():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"预加载模块失败 {name}: {e}")
+        if on_done is not None:
+            on_done()
+    thread = threading.Thread(target=load, daemon=True, name="preload")
+    thread.start()
+    return thread
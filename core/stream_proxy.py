@@ -0,0 +1,384 @@
+import hashlib
+import mimetypes
+import os
+import re
+import secrets
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.http_transport import get_default_transport
+from core.stream_resolver import open_range
+from core.segmented_fetcher import SegmentedFetcher
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+class ChunkCache:
+    """按固定大小分块的磁盘缓存，总字节数超过预算时淘汰最久未使用的块
+
+    每块一个文件（<文件键>-<块号>），启动时按修改时间重建 LRU 顺序。
+    """
+    def __init__(self, cache_dir="stream_cache", chunk_size=1024 * 1024, max_bytes=2 * 1024 ** 3):
+        """
+        Args:
+            cache_dir: 缓存目录
+            chunk_size: 块大小（字节）
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 块文件名 -> 字节数，按最近使用排序
+        self._chunks = OrderedDict()
+        self._total = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._chunks[name] = size
+            self._total += size
+        self._evict()
+
+    @staticmethod
+    def file_key(server, path, size):
+        """文件在缓存中的键：服务器地址 + 路径 + 文件大小（文件变化后旧块自然失效）"""
+        return hashlib.sha1(f"{server}\n{path}\n{size}".encode("utf-8")).hexdigest()
+
+    def get(self, key, index):
+        """读取一块，未缓存时返回 None"""
+        name = f"{key}-{index}"
+        with self._lock:
+            if name not in self._chunks:
+                self.misses += 1
+                return None
+            self._chunks.move_to_end(name)
+        try:
+            with open(os.path.join(self.cache_dir, name), 'rb') as f:
+                data = f.read()
+            os.utime(os.path.join(self.cache_dir, name))
+        except OSError:
+            with self._lock:
+                self._total -= self._chunks.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def contains(self, key, index):
+        return f"{key}-{index}" in self._chunks
+
+    def put(self, key, index, data):
+        """写入一块（先写临时文件再替换，不会留下不完整的块）"""
+        name = f"{key}-{index}"
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入播放缓存失败: {e}")
+            return
+        with self._lock:
+            self._total += len(data) - self._chunks.pop(name, 0)
+            self._chunks[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的块直到不超过预算（调用方持有锁或在初始化中）"""
+        while self._total > self.max_bytes and self._chunks:
+            name, size = self._chunks.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "chunks": len(self._chunks),
+                "bytes": self._total,
+            }
+
+
+class _Source:
+    """代理的一个远程文件"""
+    def __init__(self, client, path, size):
+        self.client = client
+        self.path = path
+        self.size = size
+        # 服务器是否支持 Range（None 表示尚未确认）
+        self.ranges = None
+        self.lock = threading.Lock()
+
+    @property
+    def key(self):
+        return ChunkCache.file_key(self.client.base_url, self.path, self.size)
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.server.proxy.handle(self, send_body=False)
+
+    def do_GET(self):
+        self.server.proxy.handle(self, send_body=True)
+
+
+class StreamProxy:
+    """本地流媒体缓存代理
+
+    在 127.0.0.1 上监听，播放器通过 /stream/<随机令牌>/<文件名> 访问，地址中不含认证信息。
+    代理按 Range 请求从分块磁盘缓存读取数据，缺失的部分一次请求从服务器（优先使用
+    StreamResolver 解析的直链）连续读取，边转发边按块写入缓存；
+    已下载过的区间再次跳转或重看时直接从本地读取。
+    """
+    # 最多保留的播放地址（令牌）数，超出时丢弃最久未使用的
+    MAX_SOURCES = 64
+
+    def __init__(self, transport=None, resolver=None, cache_dir="stream_cache",
+                 chunk_size=1024 * 1024, max_bytes=2 * 1024 ** 3, connections=1,
+                 min_segment=512 * 1024, max_segment=8 * 1024 * 1024, max_ahead=64 * 1024 * 1024):
+        """
+        Args:
+            transport: 共享的 HttpTransport，默认使用进程级连接池
+            resolver: 可选的 StreamResolver，用于获取直链
+            cache_dir: 缓存目录
+            chunk_size: 缓存块大小（字节）
+            max_bytes: 缓存总大小上限（字节）
+            connections: 每个请求并行下载的连接数，大于 1 时使用 SegmentedFetcher 分段下载
+            min_segment, max_segment: 分段大小范围（字节）
+            max_ahead: 分段下载时领先播放位置的最大字节数
+        """
+        self.resolver = resolver
+        self.connections = connections
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self.max_ahead = max_ahead
+        self.cache = ChunkCache(cache_dir, chunk_size, max_bytes)
+        self.http = (transport or get_default_transport()).create_client(follow_redirects=True)
+        self.bytes_from_cache = 0
+        self.bytes_from_network = 0
+        self._lock = threading.Lock()
+        # 令牌 -> _Source（按最近使用排序）；(服务器地址, 路径) -> 令牌
+        self._sources = OrderedDict()
+        self._tokens = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ProxyHandler)
+        self.server.daemon_threads = True
+        self.server.proxy = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="stream-proxy")
+        self._thread.start()
+
+    def url_for(self, client, path, size=None):
+        """播放器使用的本地地址
+
+        Args:
+            client: WebDAVClient
+            path: 文件路径
+            size: 文件大小（目录列表中的 content_length），未知时在首次请求时获取
+        """
+        with self._lock:
+            token = self._tokens.get((client.base_url, path))
+            if token is None:
+                token = secrets.token_urlsafe(16)
+                self._tokens[(client.base_url, path)] = token
+                self._sources[token] = _Source(client, path, size)
+                while len(self._sources) > self.MAX_SOURCES:
+                    _, old = self._sources.popitem(last=False)
+                    del self._tokens[(old.client.base_url, old.path)]
+            else:
+                self._sources.move_to_end(token)
+                if size and not self._sources[token].size:
+                    self._sources[token].size = size
+        name = urllib.parse.quote(os.path.basename(path))
+        return f"http://127.0.0.1:{self.port}/stream/{token}/{name}"
+
+    def _upstream(self, source, start, end):
+        """打开远程文件 [start, end] 区间的响应（流式）"""
+        return open_range(self.http, source.client, source.path, start, end, resolver=self.resolver)
+
+    def _ensure_size(self, source):
+        """获取文件总大小（首次请求时读取 1 字节的响应头，同时确认是否支持 Range）"""
+        with source.lock:
+            if source.size and (source.ranges is not None or self.connections <= 1):
+                return source.size
+            response = self._upstream(source, 0, 0)
+            try:
+                source.ranges = response.status_code == 206
+                match = _CONTENT_RANGE_RE.match(response.headers.get("content-range", ""))
+                if match:
+                    source.size = int(match.group(1))
+                elif response.status_code == 200 and "content-length" in response.headers:
+                    source.size = int(response.headers["content-length"])
+            finally:
+                response.close()
+            if not source.size:
+                raise RuntimeError("无法获取文件大小")
+            return source.size
+
+    def handle(self, handler, send_body):
+        """处理播放器的一个请求"""
+        # 只接受 url_for 给出的 /stream/<令牌>/<文件名>：其他地址（如播放列表中的相对分段地址）不属于该文件
+        parts = handler.path.split("?", 1)[0].split("/")
+        source = None
+        if len(parts) == 4 and parts[1] == "stream":
+            with self._lock:
+                source = self._sources.get(parts[2])
+                if source is not None and urllib.parse.unquote(parts[3]) != os.path.basename(source.path):
+                    source = None
+                if source is not None:
+                    self._sources.move_to_end(parts[2])
+        if source is None:
+            handler.send_error(404)
+            return
+        try:
+            size = self._ensure_size(source)
+        except Exception as e:
+            print(f"播放代理无法打开 {source.path}: {e}")
+            handler.send_error(502)
+            return
+
+        start, end = 0, size - 1
+        range_header = handler.headers.get("Range")
+        match = _RANGE_RE.match(range_header or "")
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            else:
+                # bytes=-N：最后 N 字节
+                start = max(0, size - int(match.group(2)))
+            if start >= size or start > end:
+                handler.send_response(416)
+                handler.send_header("Content-Range", f"bytes */{size}")
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            handler.send_response(206)
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            handler.send_response(200)
+        handler.send_header("Content-Type", mimetypes.guess_type(source.path)[0] or "application/octet-stream")
+        handler.send_header("Content-Length", str(end - start + 1))
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.end_headers()
+        if not send_body:
+            return
+        try:
+            self._send_range(handler.wfile, source, start, end)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            # 播放器跳转时会直接断开旧连接
+            handler.close_connection = True
+        except Exception as e:
+            print(f"播放代理读取失败 {source.path}: {e}")
+            handler.close_connection = True
+
+    def _send_range(self, out, source, start, end):
+        """发送 [start, end]：已缓存的块直接读取，连续缺失的块合并为一次远程请求"""
+        chunk_size = self.cache.chunk_size
+        key = source.key
+        last = end // chunk_size
+        index = start // chunk_size
+        while index <= last:
+            data = self.cache.get(key, index)
+            if data is not None:
+                base = index * chunk_size
+                piece = data[max(start - base, 0):end - base + 1]
+                out.write(piece)
+                with self._lock:
+                    self.bytes_from_cache += len(piece)
+                index += 1
+                continue
+            # 缺失区间：直到下一个已缓存的块
+            run_end = index + 1
+            while run_end <= last and not self.cache.contains(key, run_end):
+                run_end += 1
+            index = self._fetch_run(out, source, key, index, run_end, start, end)
+
+    def _fetch_run(self, out, source, key, first, stop, start, end):
+        """从远程读取块 [first, stop) 并写入缓存，同时转发请求范围内的数据，返回下一个块号"""
+        chunk_size = self.cache.chunk_size
+        run_start = first * chunk_size
+        run_end = min(stop * chunk_size, source.size) - 1
+        if self.connections > 1 and source.ranges and run_end - run_start + 1 > 2 * self.min_segment:
+            # 较长的区间用多个连接并行分段下载
+            fetcher = SegmentedFetcher(
+                lambda a, b: self._upstream(source, a, b), run_start, run_end,
+                connections=self.connections, min_segment=self.min_segment,
+                max_segment=self.max_segment, max_ahead=self.max_ahead
+            )
+            stream, skip, close = iter(fetcher), 0, fetcher.close
+        else:
+            response = self._upstream(source, run_start, run_end)
+            # 服务器不支持 Range 时返回完整内容，需跳过前面的字节
+            stream = response.iter_bytes()
+            skip = run_start if response.status_code == 200 else 0
+            close = response.close
+        try:
+            offset = run_start
+            index = first
+            buffer = bytearray()
+            for data in stream:
+                if skip:
+                    if len(data) <= skip:
+                        skip -= len(data)
+                        continue
+                    data, skip = data[skip:], 0
+                with self._lock:
+                    self.bytes_from_network += len(data)
+                lo = max(start - offset, 0)
+                hi = min(end - offset + 1, len(data))
+                if lo < hi:
+                    out.write(data[lo:hi])
+                offset += len(data)
+                buffer += data
+                while len(buffer) >= chunk_size:
+                    self.cache.put(key, index, bytes(buffer[:chunk_size]))
+                    del buffer[:chunk_size]
+                    index += 1
+                if offset > run_end:
+                    break
+            # 文件最后一块不足一整块
+            if buffer and offset >= source.size:
+                self.cache.put(key, index, bytes(buffer))
+        finally:
+            close()
+        if offset <= run_end:
+            raise RuntimeError("远程响应提前结束")
+        return stop
+
+    def stats(self):
+        """缓存命中统计（块命中率与按字节计算的命中率）"""
+        stats = self.cache.stats()
+        with self._lock:
+            total = self.bytes_from_cache + self.bytes_from_network
+            stats["bytes_from_cache"] = self.bytes_from_cache
+            stats["bytes_from_network"] = self.bytes_from_network
+            stats["byte_hit_ratio"] = self.bytes_from_cache / total if total else 0.0
+        return stats
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.http.close()
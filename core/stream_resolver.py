@@ -0,0 +1,211 @@
+import calendar
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.http_transport import get_default_transport
+
+# 直链中表示过期时间（Unix 时间戳）的查询参数
+_EXPIRES_PARAMS = ("expires", "x-oss-expires", "e", "deadline")
+
+
+def link_expiry(url, now=None):
+    """从直链的查询参数推算过期时间（Unix 时间戳），无法判断时返回 None"""
+    now = time.time() if now is None else now
+    query = {k.lower(): v for k, v in urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query)}
+    # AWS S3 签名：X-Amz-Date（20240101T000000Z）+ X-Amz-Expires（秒）
+    if "x-amz-date" in query and "x-amz-expires" in query:
+        try:
+            signed = time.strptime(query["x-amz-date"], "%Y%m%dT%H%M%SZ")
+            return calendar.timegm(signed) + int(query["x-amz-expires"])
+        except (ValueError, OverflowError):
+            pass
+    # Alist 签名：sign=<签名>:<过期时间戳>，0 表示永不过期
+    sign = query.get("sign", "")
+    if ":" in sign:
+        value = sign.rpartition(":")[2]
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+    for name in _EXPIRES_PARAMS:
+        value = query.get(name)
+        if value and value.isdigit():
+            expires = int(value)
+            # 只接受看起来像未来时间戳的值（排除其他含义的同名参数）
+            if now < expires < now + 30 * 86400:
+                return expires
+    return None
+
+
+class StreamResolver:
+    """流媒体直链解析器
+
+    Alist 的 /dav 地址每次打开（以及播放器的部分跳转请求）都会 302 到实际存储的直链。
+    解析器沿重定向链走一次，把最终地址及其过期时间缓存起来，之后直接交给播放器；
+    链接过期或播放出错时调用 invalidate() 重新解析。
+    """
+    # 解析请求最多跟随的重定向次数
+    MAX_REDIRECTS = 5
+
+    def __init__(self, transport=None, default_ttl=600, margin=60, max_entries=500, max_workers=2):
+        """
+        Args:
+            transport: 共享的 HttpTransport，默认使用进程级连接池
+            default_ttl: 直链未标明过期时间时的缓存时间（秒）
+            margin: 在标明的过期时间之前提前这么多秒视为过期
+            max_entries: 最多缓存的直链数
+            max_workers: 后台解析线程数
+        """
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self.max_entries = max_entries
+        self.http = (transport or get_default_transport()).create_client(follow_redirects=False)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolve")
+        self._entries = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def cached_url(self, client, path):
+        """读取未过期的直链，没有时返回 None"""
+        key = (client.base_url, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def stream_url(self, client, path):
+        """播放用地址：有未过期的直链时使用直链，否则使用 /dav 地址并在后台解析"""
+        url = self.cached_url(client, path)
+        if url is not None:
+            return url
+        self.prefetch(client, [path])
+        return client.get_stream_url(path)
+
+    def prefetch(self, client, paths):
+        """在后台解析尚未缓存的文件"""
+        for path in paths:
+            key = (client.base_url, path)
+            with self._lock:
+                if key in self._pending:
+                    continue
+            if self.cached_url(client, path) is not None:
+                continue
+            with self._lock:
+                if self._closed:
+                    return
+                self._pending.add(key)
+            self.executor.submit(self._resolve_in_background, client, path)
+
+    def _resolve_in_background(self, client, path):
+        try:
+            self.resolve(client, path)
+        except Exception as e:
+            print(f"解析直链失败 {path}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((client.base_url, path))
+
+    def resolve(self, client, path):
+        """沿重定向链解析文件的最终地址并缓存（阻塞），返回最终地址"""
+        url = client.get_stream_url(path)
+        origin = urllib.parse.urlsplit(client.base_url)
+        auth = (client.username, client.password)
+        request_url = strip_credentials(url)
+        redirected = False
+        for _ in range(self.MAX_REDIRECTS + 1):
+            target = urllib.parse.urlsplit(request_url)
+            same_origin = (target.scheme, target.netloc) == (origin.scheme, origin.netloc)
+            # 只读取 1 字节：只需要状态码和 Location，不下载内容
+            request = self.http.build_request("GET", request_url, headers={"Range": "bytes=0-0"})
+            response = self.http.send(request, auth=auth if same_origin else None, stream=True)
+            response.close()
+            if response.is_redirect:
+                location = response.headers.get("location")
+                if not location:
+                    break
+                request_url = urllib.parse.urljoin(request_url, location)
+                redirected = True
+                continue
+            response.raise_for_status()
+            break
+        else:
+            raise RuntimeError("重定向次数过多")
+
+        # 没有重定向（服务器直接代理内容）时仍使用带认证信息的 /dav 地址
+        final_url = request_url if redirected else url
+        now = time.time()
+        expires = link_expiry(final_url, now) if redirected else None
+        expires_at = now + self.default_ttl
+        if expires is not None:
+            expires_at = min(expires_at, expires - self.margin)
+        with self._lock:
+            self._entries[(client.base_url, path)] = (final_url, expires_at)
+            self._entries.move_to_end((client.base_url, path))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return final_url
+
+    def invalidate(self, client, path):
+        """丢弃缓存的直链（链接失效时调用），下次播放重新解析"""
+        with self._lock:
+            self._entries.pop((client.base_url, path), None)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.http.close()
+
+
+def strip_credentials(url):
+    """去掉 URL 中的 用户名:密码@（认证改用请求头发送）"""
+    parts = urllib.parse.urlsplit(url)
+    if "@" not in parts.netloc:
+        return url
+    return urllib.parse.urlunsplit(parts._replace(netloc=parts.netloc.rpartition("@")[2]))
+
+
+def open_range(http, client, path, start, end=None, resolver=None, headers=None, retry=True):
+    """打开远程文件 [start, end] 区间的流式响应
+
+    优先使用 resolver 中已解析的直链；尚无直链时经 /dav 地址访问（认证信息放在请求头中），
+    同时在后台解析直链。直链返回错误（通常是已过期）时丢弃直链并经 /dav 地址重试一次。
+
+    Args:
+        http: 允许跟随重定向的 httpx.Client
+        client: WebDAVClient
+        path: 文件路径
+        start, end: 字节区间（end 为 None 表示到文件末尾）
+        resolver: 可选的 StreamResolver
+        headers: 附加的请求头（如 If-Range）
+    """
+    url = None
+    if resolver is not None:
+        url = resolver.cached_url(client, path)
+        if url is not None and "@" in urllib.parse.urlsplit(url).netloc:
+            url = None
+    auth = None
+    if url is None:
+        url = strip_credentials(client.get_stream_url(path))
+        auth = (client.username, client.password)
+        if resolver is not None:
+            resolver.prefetch(client, [path])
+    end_text = "" if end is None else str(end)
+    request_headers = {"Range": f"bytes={start}-{end_text}"}
+    request_headers.update(headers or {})
+    request = http.build_request("GET", url, headers=request_headers)
+    response = http.send(request, auth=auth, stream=True)
+    if response.status_code >= 400:
+        response.close()
+        if retry and auth is None and resolver is not None:
+            resolver.invalidate(client, path)
+            return open_range(http, client, path, start, end, resolver, headers, retry=False)
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return response
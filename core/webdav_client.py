@@ -1,13 +1,33 @@
 from webdav4.client import Client
+from webdav4.multistatus import Response
+from xml.etree import ElementTree
+import httpx
+from core.http_transport import get_default_transport
+import datetime
+import threading
 import urllib.parse
 
 class WebDAVClient:
     """WebDAV客户端"""
-    def __init__(self, base_url, username, password):
+    def __init__(self, base_url, username, password, cache=None, transport=None):
+        """
+        Args:
+            base_url: WebDAV服务器地址
+            username: 用户名
+            password: 密码
+            cache: 可选的 DirCache，用于持久化目录列表
+            transport: 共享的 HttpTransport，默认使用进程级连接池
+        """
         self.base_url = base_url
         self.username = username
         self.password = password
-        self.client = Client(base_url, auth=(username, password))
+        self.transport = transport or get_default_transport()
+        self.client = Client(base_url, auth=(username, password), **self.transport.client_options())
+        self.cache = cache
+        
+        # 正在后台刷新的路径，避免重复刷新
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
         
         # 提取base_url的路径部分，用于后续路径处理
         parsed_base = urllib.parse.urlparse(base_url)
@@ -25,15 +45,168 @@ class WebDAVClient:
                 return path[len(self.base_path):]
         return path
 
+    @staticmethod
+    def _normalize_item(item):
+        """将条目中的 datetime 转为 ISO 字符串，使网络结果与缓存结果一致"""
+        return {
+            k: (v.isoformat() if isinstance(v, datetime.datetime) else v)
+            for k, v in item.items()
+        }
+
+    def _stream_listing(self, clean_path, meta):
+        """流式执行 Depth:1 PROPFIND，边接收边解析 multistatus，逐条产出条目
+
+        目录自身的 ETag/getlastmodified 写入 meta，用于之后的缓存校验。
+        连接池中的空闲连接可能已被服务器关闭，尚未产出任何条目时会重试一次。
+        """
+        url = self.client.join_url(clean_path)
+        
+        def drain(parser):
+            for _, elem in parser.read_events():
+                if elem.tag != "{DAV:}response":
+                    continue
+                resp = Response(elem)
+                if resp.path_norm == url.path:
+                    meta["etag"] = resp.properties.raw.get("etag")
+                    meta["modified"] = resp.properties.raw.get("modified")
+                else:
+                    yield self._normalize_item({
+                        "name": resp.path_relative_to(self.client.base_url),
+                        "href": resp.href,
+                        **resp.properties.as_dict(),
+                    })
+                # 已处理的节点立即释放，大目录下内存保持平稳
+                elem.clear()
+        
+        yielded = False
+        for attempt in range(2):
+            parser = ElementTree.XMLPullParser(events=("end",))
+            try:
+                with self.client.http.stream("PROPFIND", url, headers={"Depth": "1"},
+                                             follow_redirects=True) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes():
+                        parser.feed(chunk)
+                        for item in drain(parser):
+                            yielded = True
+                            yield item
+                break
+            except httpx.TransportError:
+                if yielded or attempt:
+                    raise
+        parser.close()
+        yield from drain(parser)
+
+    def _fetch_listing(self, clean_path):
+        """执行 Depth:1 PROPFIND，返回 (条目列表, etag, modified)"""
+        meta = {}
+        items = list(self._stream_listing(clean_path, meta))
+        return items, meta.get("etag"), meta.get("modified")
+
+    def _fetch_validators(self, clean_path):
+        """执行 Depth:0 PROPFIND，仅获取目录自身的 (etag, modified)"""
+        result = self.client.propfind(clean_path, headers={"Depth": "0"}, follow_redirects=True)
+        own = result.responses.get(self.client.join_url(clean_path).path)
+        if own is None:
+            return None, None
+        return own.properties.raw.get("etag"), own.properties.raw.get("modified")
+
+    def _revalidate(self, clean_path, entry):
+        """校验过期缓存：目录未变化则续期，否则重新列出"""
+        try:
+            etag, modified = self._fetch_validators(clean_path)
+            unchanged = (etag or modified) and etag == entry.etag and modified == entry.modified
+            if unchanged:
+                self.cache.touch(self.base_url, clean_path)
+            else:
+                items, etag, modified = self._fetch_listing(clean_path)
+                self.cache.put(self.base_url, clean_path, items, etag, modified)
+        except Exception as e:
+            print(f"WebDAV缓存刷新失败: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(clean_path)
+
+    def _refresh_in_background(self, clean_path, entry):
+        """在后台线程中刷新过期条目"""
+        with self._refresh_lock:
+            if clean_path in self._refreshing:
+                return
+            self._refreshing.add(clean_path)
+        threading.Thread(target=self._revalidate, args=(clean_path, entry), daemon=True).start()
+
+    def fetch_files(self, path):
+        """绕过缓存直接列出目录，返回 (条目列表, etag, modified)
+
+        结果同时写回缓存；请求失败时抛出异常，由调用方处理。
+        """
+        clean_path = self._sanitize_path(path)
+        items, etag, modified = self._fetch_listing(clean_path)
+        if self.cache is not None:
+            self.cache.put(self.base_url, clean_path, items, etag, modified)
+        return items, etag, modified
+
+    def cached_files(self, path):
+        """仅从缓存读取未过期的目录列表，没有时返回 None（不发起网络请求）"""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self.base_url, self._sanitize_path(path))
+        if entry is None or not self.cache.is_fresh(entry):
+            return None
+        return entry.items
+
+    def iter_files(self, path):
+        """逐条产出目录条目（流式版本的 list_files）
+
+        命中缓存时直接产出缓存内容；否则边下载边解析，完整读取后写入缓存。
+        请求失败时停止产出，已产出的条目保持有效。
+        """
+        clean_path = self._sanitize_path(path)
+        
+        if self.cache is not None:
+            entry = self.cache.get(self.base_url, clean_path)
+            if entry is not None:
+                if not self.cache.is_fresh(entry):
+                    self._refresh_in_background(clean_path, entry)
+                yield from entry.items
+                return
+        
+        meta = {}
+        items = []
+        try:
+            for item in self._stream_listing(clean_path, meta):
+                items.append(item)
+                yield item
+        except Exception as e:
+            print(f"WebDAV列表错误: {e}")
+            return
+        
+        if self.cache is not None:
+            self.cache.put(self.base_url, clean_path, items, meta.get("etag"), meta.get("modified"))
+
     def list_files(self, path):
-        """列出指定路径下的文件"""
+        """列出指定路径下的文件
+
+        启用缓存时优先返回缓存结果；过期条目照常返回，同时在后台重新校验。
+        """
+        clean_path = self._sanitize_path(path)
+        
+        if self.cache is not None:
+            entry = self.cache.get(self.base_url, clean_path)
+            if entry is not None:
+                if not self.cache.is_fresh(entry):
+                    self._refresh_in_background(clean_path, entry)
+                return entry.items
+        
         try:
-            clean_path = self._sanitize_path(path)
-            items = self.client.ls(clean_path, detail=True)
-            return items
+            items, etag, modified = self._fetch_listing(clean_path)
         except Exception as e:
             print(f"WebDAV列表错误: {e}")
             return []
+        
+        if self.cache is not None:
+            self.cache.put(self.base_url, clean_path, items, etag, modified)
+        return items
 
     def get_stream_url(self, path):
         """构造流媒体URL（包含认证信息）"""
@@ -0,0 +1,407 @@
+import os
+from array import array
+from bisect import bisect_right
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QPersistentModelIndex, pyqtSignal
+
+from core.sorter import SmartSorter
+
+# 条目类型
+KIND_DIR = 0
+KIND_FILE = 1
+KIND_SEARCH = 2
+
+PLACEHOLDER_TEXT = "加载中..."
+
+
+class DirNode:
+    """目录节点：子条目按列存储，避免为每一行创建对象
+
+    只有被展开过的子目录才会生成 DirNode（children 中按行号索引）。
+    """
+    __slots__ = ("parent", "row", "paths", "names", "kinds", "sizes", "mtimes",
+                 "keys", "children", "loaded", "loading", "placeholder", "unsorted")
+
+    def __init__(self, parent=None, row=0):
+        self.parent = parent
+        self.row = row
+        self.paths = []
+        self.names = []
+        self.kinds = bytearray()
+        self.sizes = array('q')
+        self.mtimes = []
+        # 已插入条目的排序键，用于流式插入时二分定位
+        self.keys = []
+        self.children = {}
+        self.loaded = False
+        self.loading = False
+        self.placeholder = False
+        # 加载期间条目改为追加在末尾，加载完成时再整体排序
+        self.unsorted = False
+
+    def __len__(self):
+        return len(self.paths)
+
+
+class BrowserModel(QAbstractItemModel):
+    """文件浏览器模型（QTreeView 使用）
+
+    条目以列式存储在 DirNode 中，目录通过 canFetchMore/fetchMore 按需加载：
+    视图展开未加载的目录时发出 fetch_requested，由窗口发起后台加载。
+    """
+    fetch_requested = pyqtSignal(object)
+    # 一批条目分散到超过这么多个插入位置时，改为追加在末尾、加载完成后整体排序
+    MAX_INSERT_GROUPS = 16
+
+    def __init__(self, video_extensions, parent=None, search_page_size=200, search_max_results=5000):
+        """
+        Args:
+            video_extensions: 显示的视频文件扩展名
+            search_page_size: 搜索结果每页显示的行数，滚动到底部时再显示下一页
+            search_max_results: 单次搜索最多保留的结果数
+        """
+        super().__init__(parent)
+        self.video_extensions = video_extensions
+        self.root = DirNode()
+        self.header_text = "文件列表"
+        # 所有搜索结果行共用的图标
+        self.search_icon = None
+        self.search_page_size = search_page_size
+        self.search_max_results = search_max_results
+        # 已收到但尚未显示的搜索结果
+        self.search_pending = []
+
+    # ---------- 节点与索引 ----------
+
+    def is_dir(self, index):
+        if not index.isValid():
+            return True
+        parent = index.internalPointer()
+        row = index.row()
+        return not parent.placeholder and row < len(parent) and parent.kinds[row] == KIND_DIR
+
+    def node_for(self, index, create=True):
+        """返回索引对应的目录节点；根索引返回根节点，非目录返回 None
+
+        create=False 时不为从未展开过的目录生成节点（视图查询时使用，避免滚动时大量建节点）。
+        """
+        if not index.isValid():
+            return self.root
+        if not self.is_dir(index):
+            return None
+        parent = index.internalPointer()
+        node = parent.children.get(index.row())
+        if node is None and create:
+            node = parent.children[index.row()] = DirNode(parent, index.row())
+        return node
+
+    def index_for(self, node):
+        """返回目录节点对应的索引"""
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node.parent)
+
+    def child_index(self, node, row):
+        return self.createIndex(row, 0, node)
+
+    def item_data(self, node, row):
+        """按行重建条目字典（与 WebDAVClient.list_files 的字段一致）"""
+        kind = node.kinds[row]
+        if kind == KIND_SEARCH:
+            return {"type": "search_result", "path": node.paths[row]}
+        size = node.sizes[row]
+        return {
+            "name": node.paths[row],
+            "type": "directory" if kind == KIND_DIR else "file",
+            "content_length": None if size < 0 else size,
+            "modified": node.mtimes[row],
+        }
+
+    def find_row(self, node, name):
+        """按显示名称查找行号，找不到返回 -1"""
+        try:
+            return node.names.index(name)
+        except ValueError:
+            return -1
+
+    def files_of(self, node):
+        """节点下所有视频文件的条目字典（按显示顺序）"""
+        return [self.item_data(node, row) for row in range(len(node)) if node.kinds[row] == KIND_FILE]
+
+    # ---------- QAbstractItemModel 接口 ----------
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node_for(parent, create=False)
+        if node is None or column != 0 or row < 0 or row >= self._row_count(node):
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_for(index.internalPointer())
+
+    def _row_count(self, node):
+        return 1 if node.placeholder else len(node)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self.node_for(parent, create=False)
+        return 0 if node is None else self._row_count(node)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self._row_count(self.root) > 0
+        if not self.is_dir(parent):
+            return False
+        node = self.node_for(parent, create=False)
+        # 未加载的目录也显示展开箭头
+        return node is None or not node.loaded or self._row_count(node) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return bool(self.search_pending)
+        if not self.is_dir(parent):
+            return False
+        node = self.node_for(parent, create=False)
+        return node is None or (not node.loaded and not node.loading)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            # 滚动到底部：显示下一页搜索结果
+            self._show_search_page()
+            return
+        node = self.node_for(parent)
+        if node is not None and not node.loaded and not node.loading:
+            self.fetch_requested.emit(node)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        row = index.row()
+        if node.placeholder:
+            return PLACEHOLDER_TEXT if role == Qt.ItemDataRole.DisplayRole else None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return node.names[row]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.item_data(node, row)
+        if role == Qt.ItemDataRole.DecorationRole and node.kinds[row] == KIND_SEARCH:
+            return self.search_icon
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.header_text
+        return None
+
+    def set_header(self, text):
+        self.header_text = text
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, 0)
+
+    # ---------- 加载流程 ----------
+
+    def clear(self):
+        """清空整个模型"""
+        self.beginResetModel()
+        self.root = DirNode()
+        self.search_pending = []
+        self.endResetModel()
+
+    def _remove_all(self, node):
+        count = self._row_count(node)
+        if count:
+            self.beginRemoveRows(self.index_for(node), 0, count - 1)
+        node.paths = []
+        node.names = []
+        node.kinds = bytearray()
+        node.sizes = array('q')
+        node.mtimes = []
+        node.keys = []
+        node.children = {}
+        node.placeholder = False
+        node.unsorted = False
+        if count:
+            self.endRemoveRows()
+
+    def begin_loading(self, node):
+        """开始加载：清空已有条目并显示占位行"""
+        self._remove_all(node)
+        node.loaded = False
+        node.loading = True
+        self.beginInsertRows(self.index_for(node), 0, 0)
+        node.placeholder = True
+        self.endInsertRows()
+
+    def finish_loading(self, node):
+        """加载完成：移除仍存在的占位行（空目录），对加载期间追加的条目整体排序"""
+        if node.placeholder:
+            self.beginRemoveRows(self.index_for(node), 0, 0)
+            node.placeholder = False
+            self.endRemoveRows()
+        if node.unsorted:
+            node.unsorted = False
+            self._sort_node(node)
+        node.loading = False
+        node.loaded = True
+
+    def unload(self, node):
+        """丢弃目录内容，下次展开时重新加载"""
+        self._remove_all(node)
+        node.loaded = False
+        node.loading = False
+
+    def insert_entries(self, node, items):
+        """把一批条目按排序位置插入节点
+
+        目录在前（按名称），视频文件在后（智能排序）。新条目按排序键二分查找插入位置，
+        连续落在同一位置的条目合并为一次 beginInsertRows，结果与整体排序后一次性插入一致。
+        条目乱序到达（一批分散到很多位置，逐段插入代价为 O(n) 每段）时改为追加在末尾，
+        加载完成时（不在加载中则立即）整体排序一次。
+        """
+        entries = []
+        for item in items:
+            name = item['name']
+            if item['type'] == 'directory':
+                key = (0, name)
+                kind = KIND_DIR
+                display_name = os.path.basename(name.rstrip('/'))
+            else:
+                # Filter video files
+                if os.path.splitext(name)[1].lower() not in self.video_extensions:
+                    continue
+                key = (1, SmartSorter._get_sort_key(item))
+                kind = KIND_FILE
+                display_name = os.path.basename(name)
+            size = item.get('content_length')
+            entries.append((key, name, display_name, kind, -1 if size is None else size, item.get('modified')))
+        if not entries:
+            return
+
+        # 第一批到达时移除占位行
+        if node.placeholder:
+            self.beginRemoveRows(self.index_for(node), 0, 0)
+            node.placeholder = False
+            self.endRemoveRows()
+
+        entries.sort(key=lambda e: e[0])
+        if node.unsorted:
+            self._insert_rows(node, len(node), entries)
+            return
+        positions = [bisect_right(node.keys, e[0]) for e in entries]
+        groups = 1 + sum(1 for a, b in zip(positions, positions[1:]) if a != b)
+        if groups > self.MAX_INSERT_GROUPS:
+            self._insert_rows(node, len(node), entries)
+            if node.loading:
+                node.unsorted = True
+            else:
+                self._sort_node(node)
+            return
+
+        i = 0
+        offset = 0
+        while i < len(entries):
+            j = i
+            while j < len(entries) and positions[j] == positions[i]:
+                j += 1
+            self._insert_rows(node, positions[i] + offset, entries[i:j])
+            offset += j - i
+            i = j
+
+    def _insert_rows(self, node, row, block):
+        count = len(block)
+        self.beginInsertRows(self.index_for(node), row, row + count - 1)
+        node.keys[row:row] = [e[0] for e in block]
+        node.paths[row:row] = [e[1] for e in block]
+        node.names[row:row] = [e[2] for e in block]
+        node.kinds[row:row] = bytes(e[3] for e in block)
+        node.sizes[row:row] = array('q', [e[4] for e in block])
+        node.mtimes[row:row] = [e[5] for e in block]
+        # 已生成的子目录节点行号后移
+        if node.children:
+            shifted = {}
+            for r, child in node.children.items():
+                if r >= row:
+                    r += count
+                    child.row = r
+                shifted[r] = child
+            node.children = shifted
+        self.endInsertRows()
+
+    def _sort_node(self, node):
+        """按排序键重排节点的条目（稳定排序，键相同时保持插入顺序），更新子节点与持久索引的行号"""
+        count = len(node)
+        order = sorted(range(count), key=node.keys.__getitem__)
+        if all(new == old for new, old in enumerate(order)):
+            return
+        parent = QPersistentModelIndex(self.index_for(node))
+        self.layoutAboutToBeChanged.emit([parent], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+        new_rows = [0] * count
+        for new, old in enumerate(order):
+            new_rows[old] = new
+        node.keys = [node.keys[i] for i in order]
+        node.paths = [node.paths[i] for i in order]
+        node.names = [node.names[i] for i in order]
+        node.kinds = bytearray(node.kinds[i] for i in order)
+        node.sizes = array('q', [node.sizes[i] for i in order])
+        node.mtimes = [node.mtimes[i] for i in order]
+        children = {}
+        for r, child in node.children.items():
+            child.row = new_rows[r]
+            children[child.row] = child
+        node.children = children
+        old_indexes = [i for i in self.persistentIndexList() if i.internalPointer() is node and i.row() < count]
+        self.changePersistentIndexList(
+            old_indexes, [self.createIndex(new_rows[i.row()], i.column(), node) for i in old_indexes]
+        )
+        self.layoutChanged.emit([parent], QAbstractItemModel.LayoutChangeHint.VerticalSortHint)
+
+    def set_search_results(self, paths, header):
+        """用搜索结果替换整个模型（只显示第一页，其余在滚动时分页显示）
+
+        Returns:
+            bool: 结果数未超过上限
+        """
+        self.beginResetModel()
+        root = DirNode()
+        root.loaded = True
+        self.root = root
+        self.search_pending = []
+        self.header_text = header
+        self.endResetModel()
+        return self.append_search_results(paths)
+
+    def append_search_results(self, paths):
+        """追加搜索结果（流式搜索的后续批次）：第一页未满时直接显示，否则排队等待翻页
+
+        Returns:
+            bool: 结果数未超过上限；返回 False 时超出部分已被丢弃
+        """
+        room = self.search_max_results - len(self.root) - len(self.search_pending)
+        accepted = room >= len(paths)
+        if not accepted:
+            paths = paths[:max(room, 0)]
+        if paths:
+            self.search_pending.extend(paths)
+            if len(self.root) < self.search_page_size:
+                self._show_search_page(self.search_page_size - len(self.root))
+        return accepted
+
+    def _show_search_page(self, count=None):
+        """把排队中的搜索结果显示出来（默认一页）"""
+        count = min(count or self.search_page_size, len(self.search_pending))
+        if count <= 0:
+            return
+        paths = self.search_pending[:count]
+        del self.search_pending[:count]
+        root = self.root
+        row = len(root)
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        root.paths.extend(paths)
+        root.names.extend(paths)
+        root.kinds.extend(bytes([KIND_SEARCH]) * count)
+        root.sizes.extend(array('q', [-1]) * count)
+        root.mtimes.extend([None] * count)
+        self.endInsertRows()
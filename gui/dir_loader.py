@@ -0,0 +1,103 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _LoadSignals(QObject):
+    """工作线程回传结果用的信号（跨线程自动排队到 GUI 线程）"""
+    batch = pyqtSignal(int, object)
+    finished = pyqtSignal(int, str, object)
+
+
+class _LoadTask(QRunnable):
+    """在线程池中执行一次目录列表，边解析边按批次回传"""
+    def __init__(self, client, request_id, path, batch_size):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.client = client
+        self.request_id = request_id
+        self.path = path
+        self.batch_size = batch_size
+        self.cancelled = False
+        self.signals = _LoadSignals()
+
+    def run(self):
+        items = []
+        batch = []
+        # 排队期间被取消的任务不再发起请求
+        if not self.cancelled:
+            try:
+                for item in self.client.iter_files(self.path):
+                    # 取消后立即停止读取，关闭底层连接
+                    if self.cancelled:
+                        break
+                    items.append(item)
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        self.signals.batch.emit(self.request_id, batch)
+                        batch = []
+            except Exception as e:
+                print(f"目录加载失败: {e}")
+        if batch and not self.cancelled:
+            self.signals.batch.emit(self.request_id, batch)
+        # 无论是否取消都回传，由 DirLoader 负责释放任务对象
+        self.signals.finished.emit(self.request_id, self.path, items)
+
+
+class DirLoader(QObject):
+    """后台目录加载器
+
+    在有界线程池中执行 WebDAV 列表请求。条目边解析边通过 batch 信号分批送回 GUI 线程，
+    全部完成后再发出 loaded 信号（携带完整列表）。
+    已取消的请求：尚未开始的直接从队列移除，已在执行的停止读取并丢弃结果。
+    """
+    batch = pyqtSignal(int, object)
+    loaded = pyqtSignal(int, str, object)
+
+    def __init__(self, max_workers=4, batch_size=200, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.batch_size = batch_size
+        self._tasks = {}
+        self._next_id = 0
+
+    def load(self, client, path):
+        """提交加载请求，返回请求ID"""
+        self._next_id += 1
+        task = _LoadTask(client, self._next_id, path, self.batch_size)
+        task.signals.batch.connect(self._on_batch)
+        task.signals.finished.connect(self._on_finished)
+        self._tasks[task.request_id] = task
+        self.pool.start(task)
+        return task.request_id
+
+    def is_pending(self, request_id):
+        task = self._tasks.get(request_id)
+        return task is not None and not task.cancelled
+
+    def cancel(self, request_id):
+        """取消指定请求"""
+        task = self._tasks.get(request_id)
+        if task is None:
+            return
+        task.cancelled = True
+        # 尚未开始执行的任务直接出队；正在执行的任务需保留引用直到其结束
+        if self.pool.tryTake(task):
+            del self._tasks[request_id]
+
+    def cancel_all(self):
+        """取消所有未完成的请求"""
+        for request_id in list(self._tasks):
+            self.cancel(request_id)
+
+    def _on_batch(self, request_id, items):
+        task = self._tasks.get(request_id)
+        if task is None or task.cancelled:
+            return
+        self.batch.emit(request_id, items)
+
+    def _on_finished(self, request_id, path, items):
+        task = self._tasks.pop(request_id, None)
+        # 已取消的请求不再回调
+        if task is None or task.cancelled:
+            return
+        self.loaded.emit(request_id, path, items)
@@ -1,3 +1,7 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QIcon, QPixmap, QPainter
+from PyQt6.QtSvg import QSvgRenderer
+
 # SVG 图标定义（Material Design）
 
 PLAY_ICON = """<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0 0 24 24" width="24px" fill="#FFFFFF"><path d="M0 0h24v24H0z" fill="none"/><path d="M8 5v14l11-7z"/></svg>"""
@@ -17,3 +21,33 @@ MUTE_ICON = """<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0
 FULLSCREEN_ICON = """<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0 0 24 24" width="24px" fill="#FFFFFF"><path d="M0 0h24v24H0z" fill="none"/><path d="M7 14H5v5h5v-2H7v-3zm-2-4h2V7h3V5H5v5zm12 7h-3v2h5v-5h-2v3zM14 5v2h3v3h2V5h-5z"/></svg>"""
 
 FULLSCREEN_EXIT_ICON = """<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0 0 24 24" width="24px" fill="#FFFFFF"><path d="M0 0h24v24H0z" fill="none"/><path d="M5 16h3v3h2v-5H5v2zm3-8H5v2h5V5H8v3zm6 11h2v-3h3v-2h-5v5zm2-11V5h-2v5h5V8h-3z"/></svg>"""
+
+
+# 渲染后的图标缓存：(SVG, 尺寸, 设备像素比) -> QIcon
+ICON_SIZE = 36
+_icon_cache = {}
+
+
+def get_icon(svg_data, ratio=1.0, size=ICON_SIZE):
+    """按设备像素比渲染图标（高分屏下保持清晰），同一图标只渲染一次"""
+    key = (svg_data, size, ratio)
+    icon = _icon_cache.get(key)
+    if icon is None:
+        renderer = QSvgRenderer(bytearray(svg_data, encoding='utf-8'))
+        pixels = round(size * ratio)
+        pixmap = QPixmap(pixels, pixels)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        renderer.render(painter)
+        painter.end()
+        pixmap.setDevicePixelRatio(ratio)
+        icon = QIcon(pixmap)
+        _icon_cache[key] = icon
+    return icon
+
+
+def prerender(ratio=1.0, size=ICON_SIZE):
+    """预先渲染全部图标（包括暂停、静音等切换后才显示的状态）"""
+    for svg_data in (PLAY_ICON, PAUSE_ICON, STOP_ICON, PREV_ICON, NEXT_ICON,
+                     VOLUME_ICON, MUTE_ICON, FULLSCREEN_ICON, FULLSCREEN_EXIT_ICON):
+        get_icon(svg_data, ratio, size)
@@ -1,33 +1,95 @@
 import sys
-import vlc
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel, 
+                             QHBoxLayout, QTreeView, QLabel, 
                              QLineEdit, QPushButton, QSplitter, QFrame, QSlider,
-                             QMessageBox, QInputDialog, QSizePolicy, QStackedLayout, QStyle)
-from PyQt6.QtCore import Qt, QTimer, QUrl, QSize, QEvent
-from PyQt6.QtGui import QAction, QIcon, QPixmap, QPainter, QColor, QDesktopServices
-from PyQt6.QtSvg import QSvgRenderer
+                             QMessageBox, QInputDialog, QSizePolicy, QStackedLayout, QStyle, QMenu)
+from PyQt6.QtCore import Qt, QTimer, QUrl, QSize, QEvent, pyqtSignal
+from PyQt6.QtGui import QAction, QIcon, QColor, QDesktopServices
 
-from core.webdav_client import WebDAVClient
+from core.startup import timeline, preload_modules
+from core.dir_cache import DirCache
+from core.http_transport import HttpTransport
+from core.prefetcher import Prefetcher
+from core.crawler import Crawler, IndexedClient, LibraryIndex
+from core.search_index import LocalSearchIndex
 from core.search_client import SearchClient
+from core.search_cache import SearchCache
+from core.history import PlaybackHistory
+from core.skip_profiles import SkipProfiles
+from core.stream_resolver import StreamResolver
+from core.stream_proxy import StreamProxy
+from core.downloader import DownloadManager
 from core.sorter import SmartSorter
 from core.config import Config
+from gui.dir_loader import DirLoader
+from gui.search_runner import SearchRunner
+from gui.browser_model import BrowserModel
+from gui.playback_events import PlaybackEvents
 import gui.icons as icons
 import os
+import threading
+import time
+from collections import deque
 
 # 支持的视频格式
 VIDEO_EXTENSIONS = {
     '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', 
     '.m4v', '.mpg', '.mpeg', '.rmvb', '.ts', '.m2ts', '.vob', '.m3u8'
 }
+# 播放列表格式：分段地址相对于播放列表解析，不能经缓存代理（代理只转发单个文件）
+PLAYLIST_EXTENSIONS = {'.m3u8'}
+
+# VLC 初始化参数：禁用硬件加速、禁用VLC鼠标键盘事件
+VLC_ARGS = [
+    "--avcodec-hw=none",
+    "--no-mouse-events",
+    "--no-keyboard-events",
+    "--no-osd",
+    "--no-video-title-show",
+]
+
+# 界面线程中不立即使用、导入较慢的模块，窗口可交互后在后台预先导入
+DEFERRED_MODULES = ["core.webdav_client"]
+
+def format_time(ms):
+    """毫秒转为 mm:ss 或 hh:mm:ss"""
+    s = ms // 1000
+    m = s // 60
+    s = s % 60
+    h = m // 60
+    m = m % 60
+    if h > 0:
+        return f"{h:02}:{m:02}:{s:02}"
+    return f"{m:02}:{s:02}"
 
 class MainWindow(QMainWindow):
+    # 后台检测到片头片尾后通知 GUI 线程（服务器地址, 目录）
+    skip_detected = pyqtSignal(str, str)
+    # 下载状态变化（服务器地址, 路径, 状态）
+    download_event = pyqtSignal(str, str, str)
+    # libvlc 在后台加载完成
+    vlc_loaded = pyqtSignal()
+    # 后台预先导入 DEFERRED_MODULES 完成
+    modules_preloaded = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("小雅 Alist 播放器")
         self.resize(1200, 800)
         
         self.config = Config()
+        timeline.mark("配置")
+
+        # libvlc 初始化（加载库、扫描插件）较慢，在后台线程进行，完成后再创建播放器
+        self.instance = None
+        self.vlc_error = None
+        self.player = None
+        self.standby_player = None
+        # libvlc 加载完成前请求的播放操作，加载完成后执行（只保留最近一次）
+        self.vlc_pending = None
+        self.vlc_loaded.connect(self.init_vlc)
+        self.vlc_thread = threading.Thread(target=self._load_vlc, daemon=True, name="vlc-init")
+        self.vlc_thread.start()
         
         # 加载配置
         self.webdav_url = self.config.get("webdav_url", "http://118.122.130.22:5678/dav")
@@ -40,13 +102,128 @@ class MainWindow(QMainWindow):
         self.skip_outro = self.config.get("skip_outro", 0)
         
         self.client = None
-        self.search_client = SearchClient(self.webdav_url)
+        # WebDAV 与搜索共用的连接池
+        self.transport = HttpTransport(
+            max_connections=self.config.get("http_max_connections", 20),
+            max_per_host=self.config.get("http_max_per_host", 6),
+            http2=self.config.get("http2", False),
+            connect_timeout=self.config.get("http_connect_timeout", 5),
+            read_timeout=self.config.get("http_read_timeout", 30),
+            dns_ttl=self.config.get("dns_cache_ttl", 300)
+        )
+        # Alist 302 直链解析缓存，播放和跳转不再经过 /dav 重定向
+        self.stream_resolver = None
+        if self.config.get("resolve_direct_links", True):
+            self.stream_resolver = StreamResolver(
+                transport=self.transport,
+                default_ttl=self.config.get("direct_link_ttl", 600)
+            )
+        self.stream_retry_path = None
+        # 本地缓存代理：播放器经 127.0.0.1 读取，已下载的区间重复跳转、重看时直接读本地缓存
+        self.stream_proxy = None
+        if self.config.get("stream_proxy_enabled", True):
+            try:
+                self.stream_proxy = StreamProxy(
+                    transport=self.transport,
+                    resolver=self.stream_resolver,
+                    cache_dir=self.config.get("stream_cache_dir", "stream_cache"),
+                    chunk_size=self.config.get("stream_chunk_kb", 1024) * 1024,
+                    max_bytes=self.config.get("stream_cache_mb", 2048) * 1024 * 1024,
+                    connections=self.config.get("stream_connections", 4),
+                    min_segment=self.config.get("stream_segment_min_kb", 512) * 1024,
+                    max_segment=self.config.get("stream_segment_max_kb", 8192) * 1024,
+                    max_ahead=self.config.get("stream_readahead_mb", 64) * 1024 * 1024
+                )
+            except OSError as e:
+                print(f"启动播放缓存代理失败: {e}")
+        # 后台下载：已下载的文件直接播放本地副本
+        self.downloads = DownloadManager(
+            download_dir=self.config.get("download_dir", "downloads"),
+            workers=self.config.get("download_workers", 2),
+            rate_limit=self.config.get("download_rate_kb", 0) * 1024,
+            transport=self.transport,
+            resolver=self.stream_resolver
+        )
+        self.downloads.on_event = lambda server, path, status, done, total: self.download_event.emit(server, path, status)
+        self.download_event.connect(self.on_download_event)
+        # 目录列表持久化缓存，重复浏览时直接从磁盘返回
+        self.dir_cache = DirCache(ttl=self.config.get("dir_cache_ttl", 600))
+        # 后台目录加载：请求ID -> (父节点, 完成回调)
+        self.dir_loader = DirLoader(max_workers=self.config.get("dir_load_workers", 4), parent=self)
+        self.dir_loader.batch.connect(self.on_dir_batch)
+        self.dir_loader.loaded.connect(self.on_dir_loaded)
+        self.pending_loads = {}
+        # 待插入树中的批次队列
+        self.fill_queue = deque()
+        self.fill_timer = QTimer(self)
+        self.fill_timer.setInterval(0)
+        self.fill_timer.timeout.connect(self.drain_fill_queue)
+        # 子目录预取（可选）
+        self.prefetcher = None
+        if self.config.get("prefetch_enabled", False):
+            self.prefetcher = Prefetcher(
+                max_dirs=self.config.get("prefetch_max_dirs", 5),
+                max_workers=self.config.get("prefetch_workers", 2),
+                max_entries=self.config.get("prefetch_max_entries", 2000)
+            )
+        # 后台全库索引（可选），索引就绪后搜索改为在本地进行
+        self.library_index = None
+        self.crawler = None
+        self.local_search = LocalSearchIndex()
+        if self.config.get("crawler_enabled", False):
+            self.library_index = LibraryIndex()
+            self.crawler = Crawler(
+                self.library_index,
+                concurrency=self.config.get("crawler_concurrency", 4),
+                rate=self.config.get("crawler_rate", 5)
+            )
+            # 本地搜索索引在连接服务器后从路径索引构建（见 connect_webdav）
+            self.crawler.on_finished = self.rebuild_search_index
+        # 搜索结果缓存（LRU + TTL），可选持久化到磁盘
+        self.search_cache = SearchCache(
+            max_entries=self.config.get("search_cache_size", 200),
+            ttl=self.config.get("search_cache_ttl", 1800),
+            cache_file="search_cache.json" if self.config.get("search_cache_persist", True) else None
+        )
+        self.search_client = SearchClient(self.webdav_url, transport=self.transport, cache=self.search_cache)
+        # 后台搜索：输入停顿后自动搜索，新关键词会取消进行中的搜索
+        self.search_runner = SearchRunner(parent=self)
+        self.search_runner.results.connect(self.on_search_results)
+        self.search_runner.finished.connect(self.on_search_finished)
+        self.search_keyword = None
+        self.search_shown = False
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.config.get("search_debounce_ms", 300))
+        self.search_timer.timeout.connect(self.perform_search)
+        # 逐文件播放进度（内存查询，后台批量写入 SQLite）
+        self.history = PlaybackHistory(flush_interval=self.config.get("history_flush_interval", 5))
+        # 按目录保存的片头片尾设置，未设置时继承上级目录，最后使用全局配置
+        self.skip_profiles = SkipProfiles()
+        # 片头片尾自动检测（跨剧集音频指纹比对，需要 numpy 和 ffmpeg）
+        self.intro_detector = None
+        if self.config.get("skip_detect_enabled", False):
+            # 检测依赖 numpy，只在启用时导入
+            from core.intro_detector import IntroDetector
+            self.intro_detector = IntroDetector(
+                workers=self.config.get("skip_detect_workers", 2),
+                seconds=self.config.get("skip_detect_seconds", 180),
+                resolver=self.stream_resolver
+            )
+        self.skip_detected.connect(self.on_skip_detected)
+        self.current_path = None
         self.current_playlist = []
         self.current_index = -1
         self.duration = 0
         self.is_muted = False
         self.saved_volume = 100
         self.pending_resume_time = None
+        # 后备播放器：播放接近结尾时提前打开下一集，切换时直接交换
+        self.standby_path = None
+        self.standby_start = 0
+        self.standby_ready = False
+        self.prebuffer_lead = self.config.get("prebuffer_seconds", 30) * 1000
+        timeline.mark("后台服务")
         
         # 片头片尾跳过标志
         self.intro_skipped = False
@@ -71,16 +248,16 @@ class MainWindow(QMainWindow):
         self.outro_btn_timer.setInterval(1000)
         self.outro_btn_timer.setSingleShot(True)
         
-        # 初始化UI和VLC
+        # 初始化UI（播放器在 libvlc 加载完成后创建）
         self.init_ui()
-        self.init_vlc()
+        timeline.mark("界面")
         
         # 连接计时器信号
         self.intro_btn_timer.timeout.connect(self.reset_intro)
         self.outro_btn_timer.timeout.connect(self.reset_outro)
         
-        # 启动时自动连接（但不自动恢复播放历史）
-        QTimer.singleShot(100, self.connect_webdav)
+        # 窗口首次显示后的启动步骤（自动连接等）见 on_startup_idle
+        self.startup_pending = True
         
         # 控制栏自动隐藏计时器
         self.hide_controls_timer = QTimer(self)
@@ -97,17 +274,44 @@ class MainWindow(QMainWindow):
         self.setMouseTracking(True)
         if self.centralWidget() is not None:
             self.centralWidget().setMouseTracking(True)
-        self.video_frame.setMouseTracking(True)
-        self.video_frame.installEventFilter(self)
+        for frame in (self.video_frame, self.standby_frame):
+            frame.setMouseTracking(True)
+            frame.installEventFilter(self)
 
     def _create_icon(self, svg_data, color="white"):
-        renderer = QSvgRenderer(bytearray(svg_data, encoding='utf-8'))
-        pixmap = QPixmap(36, 36)
-        pixmap.fill(Qt.GlobalColor.transparent)
-        painter = QPainter(pixmap)
-        renderer.render(painter)
-        painter.end()
-        return QIcon(pixmap)
+        """按窗口所在屏幕的设备像素比取缓存的图标"""
+        return icons.get_icon(svg_data, self.devicePixelRatioF())
+
+    def refresh_icons(self, *args):
+        """窗口移到设备像素比不同的屏幕后按新的像素比重新设置按钮图标"""
+        playing = self.player is not None and self.player.is_playing()
+        self.prev_btn.setIcon(self._create_icon(icons.PREV_ICON))
+        self.play_btn.setIcon(self._create_icon(icons.PAUSE_ICON if playing else icons.PLAY_ICON))
+        self.stop_btn.setIcon(self._create_icon(icons.STOP_ICON))
+        self.next_btn.setIcon(self._create_icon(icons.NEXT_ICON))
+        self.vol_btn.setIcon(self._create_icon(icons.MUTE_ICON if self.is_muted else icons.VOLUME_ICON))
+        self.fullscreen_btn.setIcon(self._create_icon(
+            icons.FULLSCREEN_EXIT_ICON if self.isFullScreen() else icons.FULLSCREEN_ICON))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.startup_pending:
+            self.startup_pending = False
+            timeline.mark("显示窗口")
+            # 事件循环空闲（首帧已绘制）后再做其余启动工作
+            QTimer.singleShot(0, self.on_startup_idle)
+
+    def on_startup_idle(self):
+        """窗口已可交互：预加载模块、预渲染图标，模块导入完成后自动连接（但不自动恢复播放历史）"""
+        timeline.mark("可交互")
+        window = self.windowHandle()
+        if window is not None:
+            window.screenChanged.connect(self.refresh_icons)
+        # 导入完成后再连接，避免界面线程等待导入锁
+        self.modules_preloaded.connect(self.connect_webdav)
+        preload_modules(DEFERRED_MODULES, on_done=self.modules_preloaded.emit)
+        icons.prerender(self.devicePixelRatioF())
+        timeline.report_once("可交互", "播放器")
 
     def init_ui(self):
         self.setStyleSheet("background-color: #000000;")
@@ -160,15 +364,15 @@ class MainWindow(QMainWindow):
         """
 
         bilibili_tree_style = """
-            QTreeWidget {
+            QTreeView {
                 background-color: #0f0f0f;
                 color: #bbbbbb;
                 border: none;
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 padding: 6px;
             }
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #00aeec;
                 color: black;
             }
@@ -232,6 +436,7 @@ class MainWindow(QMainWindow):
             }
         """)
         self.search_input.returnPressed.connect(self.perform_search)
+        self.search_input.textEdited.connect(self.on_search_text_edited)
         
         search_btn = QPushButton("搜索")
         search_btn.setStyleSheet(bilibili_btn_style)
@@ -243,13 +448,23 @@ class MainWindow(QMainWindow):
         search_layout.addWidget(search_btn)
         left_layout.addLayout(search_layout)
 
-        # Tree View
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabel("文件列表")
+        # Tree View（虚拟化模型，目录按需加载）
+        self.model = BrowserModel(
+            VIDEO_EXTENSIONS, self,
+            search_page_size=self.config.get("search_page_size", 200),
+            search_max_results=self.config.get("search_max_results", 5000)
+        )
+        self.model.search_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon)
+        self.model.fetch_requested.connect(self.on_fetch_requested)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
         self.tree.setHeaderHidden(True) # 隐藏表头
+        self.tree.setUniformRowHeights(True)
         self.tree.setStyleSheet(bilibili_tree_style)
-        self.tree.itemDoubleClicked.connect(self.on_item_double_clicked)
-        self.tree.itemExpanded.connect(self.on_item_expanded)
+        self.tree.doubleClicked.connect(self.on_item_double_clicked)
+        self.tree.collapsed.connect(self.on_item_collapsed)
+        self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tree.customContextMenuRequested.connect(self.on_tree_context_menu)
         left_layout.addWidget(self.tree)
 
         # GitHub链接按钮
@@ -294,11 +509,18 @@ class MainWindow(QMainWindow):
         top_layout.addWidget(self.title_label)
         right_layout.addWidget(self.top_bar)
 
-        # Video Frame
+        # Video Frame：两个画面叠放，后备播放器在隐藏的画面中预缓冲下一集
         self.video_frame = QFrame()
         self.video_frame.setStyleSheet("background-color: black;")
-        self.video_frame.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        right_layout.addWidget(self.video_frame, stretch=1)
+        self.standby_frame = QFrame()
+        self.standby_frame.setStyleSheet("background-color: black;")
+        self.video_stack = QStackedLayout()
+        self.video_stack.addWidget(self.video_frame)
+        self.video_stack.addWidget(self.standby_frame)
+        video_container = QWidget()
+        video_container.setLayout(self.video_stack)
+        video_container.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        right_layout.addWidget(video_container, stretch=1)
 
         # Controls Container
         self.controls_container = QWidget()
@@ -448,36 +670,186 @@ class MainWindow(QMainWindow):
         # 设置右侧拉伸因子
         self.splitter.setStretchFactor(1, 1)
 
-        # UI更新计时器
-        self.timer = QTimer(self)
-        self.timer.setInterval(100)
-        self.timer.timeout.connect(self.update_ui)
-        self.timer.start()
+        # 播放状态由 libvlc 事件驱动；进度条和时间最多每隔 ui_update_ms 刷新一次
+        self.ui_update_interval = self.config.get("ui_update_ms", 250) / 1000
+        self.last_ui_update = 0.0
+        # 上次安排定时器时的播放位置（毫秒）和时刻，用于发现跳转后重新安排
+        self.time_anchor = None
+        # 播放前 2 秒内（续播跳转尚未生效）不记录进度
+        self.resume_guard_until = 0.0
+        # 片尾跳过、预缓冲下一集的单次定时器，按当前播放位置计算触发时间
+        self.outro_timer = QTimer(self)
+        self.outro_timer.setSingleShot(True)
+        self.outro_timer.timeout.connect(self.on_outro_point)
+        self.prebuffer_timer = QTimer(self)
+        self.prebuffer_timer.setSingleShot(True)
+        self.prebuffer_timer.timeout.connect(self.prebuffer_next)
+
+    def _load_vlc(self):
+        """后台线程：加载 libvlc 并创建实例，完成后通知界面线程"""
+        try:
+            import vlc
+            self.instance = vlc.Instance(" ".join(VLC_ARGS))
+            if self.instance is None:
+                raise RuntimeError("无法创建 libvlc 实例")
+        except Exception as e:
+            self.vlc_error = e
+        timeline.mark("libvlc")
+        self.vlc_loaded.emit()
 
     def init_vlc(self):
-        # VLC 初始化参数：禁用硬件加速、禁用VLC鼠标键盘事件
-        vlc_args = [
-            "--avcodec-hw=none",
-            "--no-mouse-events",
-            "--no-keyboard-events",
-            "--no-osd",
-            "--no-video-title-show",
-        ]
-        
-        self.instance = vlc.Instance(" ".join(vlc_args))
-        self.player = self.instance.media_player_new()
+        """libvlc 加载完成后在界面线程中创建播放器（已创建时直接返回）"""
+        if self.player is not None:
+            return
+        if self.instance is None:
+            self.vlc_pending = None
+            print(f"VLC 初始化失败: {self.vlc_error}")
+            QMessageBox.critical(self, "VLC 初始化失败", f"请确认已安装 VLC 播放器\n{self.vlc_error}")
+            return
+        self.player = self._new_player(self.video_frame)
+        self.standby_player = self._new_player(self.standby_frame)
+        self.player_events = self._new_player_events(self.player)
+        self.standby_events = self._new_player_events(self.standby_player)
+        # 加载期间调整过的音量
+        self.player.audio_set_volume(0 if self.is_muted else self.vol_slider.value())
+        timeline.mark("播放器")
+        timeline.report_once("可交互", "播放器")
+        if self.vlc_pending is not None:
+            action, self.vlc_pending = self.vlc_pending, None
+            action()
+
+    def ensure_vlc(self, action=None):
+        """需要播放器时调用，返回播放器是否可用
+
+        libvlc 尚在加载时不等待（不阻塞界面线程）：把 action 排队，
+        加载完成后由 init_vlc 执行。
+        """
+        if self.player is None and action is not None and self.vlc_error is None:
+            self.vlc_pending = action
+            self.show_osd("播放器加载中…")
+        return self.player is not None
+
+    def _new_player(self, frame):
+        """创建绑定到指定画面的播放器"""
+        player = self.instance.media_player_new()
         
         # 禁用VLC鼠标键盘输入
-        self.player.video_set_mouse_input(False)
-        self.player.video_set_key_input(False)
+        player.video_set_mouse_input(False)
+        player.video_set_key_input(False)
         
         # 绑定到窗口
         if sys.platform.startswith('linux'):
-            self.player.set_xwindow(self.video_frame.winId())
+            player.set_xwindow(frame.winId())
         elif sys.platform == "win32":
-            self.player.set_hwnd(self.video_frame.winId())
+            player.set_hwnd(frame.winId())
         elif sys.platform == "darwin":
-            self.player.set_nsobject(int(self.video_frame.winId()))
+            player.set_nsobject(int(frame.winId()))
+        return player
+
+    def _new_player_events(self, player):
+        """订阅播放器事件；处理函数通过 sender() 区分当前播放器和后备播放器"""
+        events = PlaybackEvents(player, self)
+        events.time_changed.connect(self.on_time_changed)
+        events.length_changed.connect(self.on_length_changed)
+        events.playing.connect(self.on_player_playing)
+        events.paused.connect(self.on_player_paused)
+        events.stopped.connect(self.on_player_paused)
+        events.end_reached.connect(self.on_end_reached)
+        events.error.connect(self.on_player_error)
+        events.buffering.connect(self.on_player_buffering)
+        return events
+
+    def prebuffer_next(self):
+        """预缓冲下一集：在后备播放器中打开并预解析，静音播放到起始位置后暂停"""
+        next_index = self.current_index + 1
+        if not self.config.get("prebuffer_enabled", True) or next_index >= len(self.current_playlist):
+            return
+        path = self.current_playlist[next_index]['name']
+        if self.standby_path == path:
+            return
+        self._reset_standby()
+        media = self.instance.media_new(self.stream_url(path, self.current_playlist[next_index].get('content_length')))
+        # 在后台解析流信息（时长、轨道），切换后无需再次探测
+        import vlc
+        media.parse_with_options(vlc.MediaParseFlag.network, 10000)
+        self.standby_player.set_media(media)
+        self.standby_player.audio_set_volume(0)
+        self.standby_player.play()
+        # 起始位置：上次的进度，否则片头结束处
+        start = self.history.resume_position(self.client.base_url, path)
+        if start == 0:
+            settings = self.skip_profiles.resolve(
+                self.client.base_url, path,
+                self.config.get("skip_intro", 0), self.config.get("skip_outro", 0)
+            )
+            start = settings.intro * 1000
+        self.standby_path = path
+        self.standby_start = start
+        self.standby_ready = False
+
+    def _on_standby_playing(self):
+        """后备播放器开始输出后暂停并定位到起始位置，之后保持缓冲状态等待切换"""
+        if self.standby_path is None or self.standby_ready:
+            return
+        self.standby_player.set_pause(1)
+        self.standby_player.set_time(int(self.standby_start))
+        self.standby_ready = True
+
+    def stream_url(self, path, size=None):
+        """播放地址：已下载时为本地文件；启用缓存代理时为本地代理地址（播放列表除外）；
+        否则有已解析的直链时使用直链，再否则使用 /dav 地址"""
+        local_path = self.downloads.local_path(self.client.base_url, path)
+        if local_path is not None:
+            return os.path.abspath(local_path)
+        if self.stream_proxy is not None and os.path.splitext(path)[1].lower() not in PLAYLIST_EXTENSIONS:
+            return self.stream_proxy.url_for(self.client, path, size)
+        if self.stream_resolver is None:
+            return self.client.get_stream_url(path)
+        return self.stream_resolver.stream_url(self.client, path)
+
+    def on_player_error(self):
+        """打开失败（如直链已过期）时丢弃直链，从原位置重新打开（成功播放前只重试一次）"""
+        if self.sender() is self.standby_events:
+            self._reset_standby()
+            return
+        if self.stream_resolver is None or self.current_path is None:
+            return
+        if self.stream_retry_path == self.current_path:
+            return
+        self.stream_retry_path = self.current_path
+        self.stream_resolver.invalidate(self.client, self.current_path)
+        entry = self.history.get(self.client.base_url, self.current_path)
+        self.play_video({'name': self.current_path}, resume_time=entry.position if entry else None)
+
+    def _reset_standby(self):
+        """丢弃预缓冲的内容"""
+        if self.standby_path is None:
+            return
+        self.standby_player.stop()
+        self.standby_path = None
+        self.standby_ready = False
+
+    def _swap_to_standby(self, path):
+        """要播放的文件已在后备播放器中预缓冲时交换两个播放器
+
+        Returns:
+            已定位到的起始位置（毫秒，尚未定位时为 0），未预缓冲该文件时返回 None
+        """
+        if self.standby_path != path:
+            self._reset_standby()
+            return None
+        start = self.standby_start if self.standby_ready else 0
+        old_player = self.player
+        self.player, self.standby_player = self.standby_player, old_player
+        self.player_events, self.standby_events = self.standby_events, self.player_events
+        self.video_frame, self.standby_frame = self.standby_frame, self.video_frame
+        self.video_stack.setCurrentWidget(self.video_frame)
+        self.player.audio_set_volume(0 if self.is_muted else self.vol_slider.value())
+        self.player.set_pause(0)
+        old_player.stop()
+        self.standby_path = None
+        self.standby_ready = False
+        return start
 
     def on_intro_btn_pressed(self):
         """片头按钮按下"""
@@ -507,83 +879,207 @@ class MainWindow(QMainWindow):
         
         self.outro_btn_long_press_active = False
 
+    def _current_dir(self):
+        """当前播放文件所在目录"""
+        return "/" + self.current_path.strip("/").rpartition("/")[0]
+
+    def apply_skip_profile(self):
+        """按当前文件所在目录解析片头片尾设置"""
+        if self.current_path is None or not self.client:
+            return
+        settings = self.skip_profiles.resolve(
+            self.client.base_url, self.current_path,
+            self.config.get("skip_intro", 0), self.config.get("skip_outro", 0)
+        )
+        self.skip_intro = settings.intro
+        self.skip_outro = settings.outro
+        self.update_skip_buttons()
+        self.reschedule_transitions()
+
+    def detect_skip_segments(self):
+        """在后台分析当前播放列表的片头片尾（结果已缓存、列表未变化时不重复分析）"""
+        if self.intro_detector is None or self.current_path is None or len(self.current_playlist) < 2:
+            return
+        client = self.client
+        self.intro_detector.analyze(
+            client, self._current_dir(), self.current_playlist,
+            lambda directory, intro, outro: self._store_detected_skip(client.base_url, directory, intro, outro)
+        )
+
+    def _store_detected_skip(self, server, directory, intro, outro):
+        """保存检测结果（在检测线程中调用）
+
+        新的检测结果（如新增剧集后重新检测）覆盖之前自动检测的值，不覆盖用户手动设置的项。
+        """
+        if self.skip_profiles.set_detected(server, directory, intro=intro, outro=outro):
+            self.skip_detected.emit(server, directory)
+
+    def on_skip_detected(self, server, directory):
+        """检测结果属于正在播放的目录时立即生效"""
+        if self.current_path is None or not self.client or self.client.base_url != server:
+            return
+        if self._current_dir() != directory:
+            return
+        self.apply_skip_profile()
+        self.show_osd(f"已自动识别片头 {self.skip_intro} 秒 / 片尾 {self.skip_outro} 秒")
+
+    def update_skip_buttons(self):
+        """更新片头片尾按钮文本"""
+        self.set_intro_btn.setText(f"片头: {self.skip_intro}s" if self.skip_intro > 0 else "设为片头")
+        self.set_outro_btn.setText(f"片尾: {self.skip_outro}s" if self.skip_outro > 0 else "设为片尾")
+
     def set_intro(self):
-        """设置片头时间"""
+        """设置片头时间（保存到当前目录）"""
+        if not self.ensure_vlc():
+            return
         time = self.player.get_time()
-        if time > 0:
+        if time > 0 and self.current_path is not None:
             self.skip_intro = time // 1000
-            self.config.set("skip_intro", self.skip_intro)
-            self.config.save()
+            self.skip_profiles.set(self.client.base_url, self._current_dir(), intro=self.skip_intro)
             self.set_intro_btn.setText(f"片头: {self.skip_intro}s")
             self.show_osd(f"设置片头: {self.skip_intro}s")
             
     def reset_intro(self):
-        """长按片头按钮时重置"""
+        """长按片头按钮时重置（当前目录改为继承上级设置）"""
         self.intro_btn_long_press_active = True  # 标记为长按，阻止 released 中的设置操作
-        self.skip_intro = 0
-        self.config.set("skip_intro", 0)
-        self.config.save()
-        self.set_intro_btn.setText("设为片头")
+        if self.current_path is not None:
+            self.skip_profiles.set(self.client.base_url, self._current_dir(), intro=None)
+            self.apply_skip_profile()
+        else:
+            self.skip_intro = 0
+            self.set_intro_btn.setText("设为片头")
         self.show_osd("重置片头")
 
     def set_outro(self):
-        """设置片尾时间（短按触发）"""
+        """设置片尾时间（短按触发，保存到当前目录）"""
+        if not self.ensure_vlc():
+            return
         length = self.player.get_length()
         time = self.player.get_time()
-        if length > 0 and time > 0:
+        if length > 0 and time > 0 and self.current_path is not None:
             self.skip_outro = (length - time) // 1000
-            self.config.set("skip_outro", self.skip_outro)
-            self.config.save()
+            self.skip_profiles.set(self.client.base_url, self._current_dir(), outro=self.skip_outro)
             self.set_outro_btn.setText(f"片尾: {self.skip_outro}s")
             self.show_osd(f"设置片尾: {self.skip_outro}s")
+            self.reschedule_transitions()
 
     def reset_outro(self):
-        """长按片尾按钮时重置"""
+        """长按片尾按钮时重置（当前目录改为继承上级设置）"""
         self.outro_btn_long_press_active = True  # 标记为长按，阻止 released 中的设置操作
-        self.skip_outro = 0
-        self.config.set("skip_outro", 0)
-        self.config.save()
-        self.set_outro_btn.setText("设为片尾")
+        if self.current_path is not None:
+            self.skip_profiles.set(self.client.base_url, self._current_dir(), outro=None)
+            self.apply_skip_profile()
+        else:
+            self.skip_outro = 0
+            self.set_outro_btn.setText("设为片尾")
         self.show_osd("重置片尾")
     
-    def load_dir(self, path, parent_item=None):
-        """加载目录"""
+    def load_dir(self, path, parent_item=None, callback=None):
+        """加载目录（在后台线程中流式请求，条目分批插入模型）
+        
+        Args:
+            path: 目录路径
+            parent_item: 目标目录节点，为 None 时替换整棵树
+            callback: 加载完成后调用，参数为目录条目列表
+        """
         if not self.client:
             return
             
         if parent_item is None:
-            self.tree.clear()
-            parent_item = self.tree.invisibleRootItem()
+            # 整棵树被替换，所有未完成的加载都已失效（进行中的搜索由发起导航的调用方取消）
+            self.cancel_pending_loads()
+            self.model.clear()
+            self.model.set_header("文件列表")
+            parent_item = self.model.root
         else:
-            # Remove dummy item
-            parent_item.takeChildren()
-            
-        items = self.client.list_files(path)
-        
-        # Sort items: Directories first, then Files (Smart Sorted)
-        dirs = [i for i in items if i['type'] == 'directory']
-        files = [i for i in items if i['type'] != 'directory']
+            # 同一节点的旧请求已被取代
+            self.cancel_item_load(parent_item)
         
-        # Filter video files
-        files = [f for f in files if os.path.splitext(f['name'])[1].lower() in VIDEO_EXTENSIONS]
-        
-        # Sort directories alphabetically
-        dirs.sort(key=lambda x: x['name'])
-        
-        # Smart sort files
-        files = SmartSorter.sort_files(files)
+        # 加载期间显示占位行，收到第一批条目时移除
+        self.model.begin_loading(parent_item)
         
-        for item in dirs:
-            # Display only the directory name, not the full path
-            display_name = os.path.basename(item['name'].rstrip('/'))
-            tree_item = QTreeWidgetItem(parent_item, [display_name])
-            tree_item.setData(0, Qt.ItemDataRole.UserRole, item)
-            # Add dummy child to make it expandable
-            QTreeWidgetItem(tree_item, ["加载中..."])
-            
-        for item in files:
-            tree_item = QTreeWidgetItem(parent_item, [os.path.basename(item['name'])])
-            tree_item.setData(0, Qt.ItemDataRole.UserRole, item)
+        # 已建立索引且未过期的目录直接从本地索引读取
+        source = self.client
+        if self.library_index is not None:
+            source = IndexedClient(self.library_index, self.client, ttl=self.dir_cache.ttl)
+        request_id = self.dir_loader.load(source, path)
+        self.pending_loads[request_id] = (parent_item, callback)
+    
+    def on_fetch_requested(self, node):
+        """视图展开未加载的目录"""
+        # 已在加载中则不重复请求
+        if self.find_item_load(node) is not None:
+            return
+        path = node.parent.paths[node.row]
+        self.load_dir(path, node)
+    
+    def on_dir_batch(self, request_id, items):
+        """收到一批条目：排队，每个事件循环只插入一批，避免长时间阻塞界面"""
+        self.fill_queue.append((request_id, items, False))
+        if not self.fill_timer.isActive():
+            self.fill_timer.start()
+    
+    def on_dir_loaded(self, request_id, path, items):
+        """后台加载完成：排在该请求所有批次之后处理"""
+        self.fill_queue.append((request_id, items, True))
+        if not self.fill_timer.isActive():
+            self.fill_timer.start()
+    
+    def drain_fill_queue(self):
+        """处理队列中的下一批条目"""
+        while self.fill_queue:
+            request_id, items, done = self.fill_queue.popleft()
+            pending = self.pending_loads.get(request_id)
+            if pending is None:
+                # 已取消的请求直接跳过，继续处理下一项
+                continue
+            parent_item, callback = pending
+            if done:
+                del self.pending_loads[request_id]
+                if parent_item is not None:
+                    self.model.finish_loading(parent_item)
+                    # 预取前几个子目录，下次展开时直接命中缓存
+                    if self.prefetcher is not None:
+                        dirs = sorted(i['name'] for i in items if i['type'] == 'directory')
+                        self.prefetcher.prefetch(self.client, dirs)
+                if callback is not None:
+                    callback(items)
+            elif parent_item is not None:
+                self.model.insert_entries(parent_item, items)
+            break
+        if not self.fill_queue:
+            self.fill_timer.stop()
+    
+    def find_item_load(self, parent_item):
+        """返回节点上未完成的加载请求ID"""
+        for request_id, (item, _) in self.pending_loads.items():
+            if item is parent_item:
+                return request_id
+        return None
+    
+    def add_load_callback(self, request_id, callback):
+        """在已有回调之后追加一个加载完成回调"""
+        item, previous = self.pending_loads[request_id]
+        if previous is None:
+            chained = callback
+        else:
+            def chained(items):
+                previous(items)
+                callback(items)
+        self.pending_loads[request_id] = (item, chained)
+    
+    def cancel_item_load(self, parent_item):
+        """取消节点上未完成的加载"""
+        request_id = self.find_item_load(parent_item)
+        if request_id is not None:
+            self.dir_loader.cancel(request_id)
+            del self.pending_loads[request_id]
+    
+    def cancel_pending_loads(self):
+        """取消所有未完成的加载"""
+        self.dir_loader.cancel_all()
+        self.pending_loads.clear()
+        self.fill_queue.clear()
 
     def connect_webdav(self):
         """连接WebDAV服务器"""
@@ -595,49 +1091,38 @@ class MainWindow(QMainWindow):
         self.config.set("webdav_url", self.webdav_url)
         
         try:
-            self.client = WebDAVClient(self.webdav_url, self.username, self.password)
-            self.client.list_files("/")
-            self.load_dir("/")
+            # 启动时在后台预先导入，见 DEFERRED_MODULES
+            from core.webdav_client import WebDAVClient
+            self.client = WebDAVClient(self.webdav_url, self.username, self.password,
+                                       cache=self.dir_cache, transport=self.transport)
+            self.search_runner.cancel()
+            self.load_dir("/", callback=lambda items: self.show_osd("连接成功"))
             self.config.save()
-            self.show_osd("连接成功")
+            
+            # 切换服务器后重新开始索引同步（未完成的部分会从断点继续）；
+            # 旧的同步线程结束当前请求后自动接着同步新服务器
+            if self.crawler is not None:
+                # 本地搜索索引只对所属服务器有效：切换后先回退到服务器搜索，再从已有的路径索引重建
+                if self.local_search.server != self.client.base_url:
+                    self.local_search.reset()
+                    threading.Thread(target=self.rebuild_search_index, args=(self.client.base_url,),
+                                     daemon=True).start()
+                self.crawler.start(self.client)
+            
+            # 继续上次未完成的下载
+            self.downloads.resume_pending(self.client)
             
             # 连接成功，但不自动恢复播放历史（改为用户点击播放时才恢复）
         except Exception as e:
             QMessageBox.critical(self, "连接失败", str(e))
             self.show_osd("连接失败")
 
-    def on_item_expanded(self, item):
-        if item.childCount() == 1 and item.child(0).text(0) == "加载中...":
-            data = item.data(0, Qt.ItemDataRole.UserRole)
-            path = data['name']
-            self.load_dir(path, item)
-
-    def on_item_double_clicked(self, item, column):
-        data = item.data(0, Qt.ItemDataRole.UserRole)
-        if data['type'] == 'directory':
-            if item.isExpanded():
-                item.setExpanded(False)
-            else:
-                item.setExpanded(True)
-        else:
-            parent = item.parent()
-            if parent:
-                self.current_playlist = []
-                for i in range(parent.childCount()):
-                    child = parent.child(i)
-                    child_data = child.data(0, Qt.ItemDataRole.UserRole)
-                    if child_data['type'] != 'directory':
-                        self.current_playlist.append(child_data)
-            else:
-                self.current_playlist = [data]
-                
-            try:
-                self.current_index = self.current_playlist.index(data)
-            except ValueError:
-                self.current_index = 0
-                self.current_playlist = [data]
-                
-            self.play_video(data)
+    def on_item_collapsed(self, index):
+        """折叠时取消尚未完成的加载，并丢弃不完整的内容以便再次展开时重新加载"""
+        node = self.model.node_for(index, create=False)
+        if node is not None and self.find_item_load(node) is not None:
+            self.cancel_item_load(node)
+            self.model.unload(node)
 
     def play_video(self, file_data, resume_time=None):
         """播放视频
@@ -647,23 +1132,52 @@ class MainWindow(QMainWindow):
             resume_time: 恢复播放时间（毫秒）
         """
         path = file_data['name']
-        url = self.client.get_stream_url(path)
-        
-        media = self.instance.media_new(url)
-        self.player.set_media(media)
-        self.player.play()
+        if not self.ensure_vlc(lambda: self.play_video(file_data, resume_time)):
+            return
+        # 新文件的时长由 LengthChanged 事件更新，此前不安排片尾等定时器
+        self.duration = 0
+        self.outro_timer.stop()
+        self.prebuffer_timer.stop()
+        # 下一集已预缓冲时直接切换播放器，否则重新打开
+        prebuffered = self._swap_to_standby(path)
+        if prebuffered is None:
+            url = self.stream_url(path, file_data.get('content_length'))
+            
+            media = self.instance.media_new(url)
+            self.player.set_media(media)
+            self.player.play()
         
         self.title_label.setText(os.path.basename(path))
         self.play_btn.setIcon(self._create_icon(icons.PAUSE_ICON))
         
         self.config.set("last_played_path", path)
         self.config.save()
+        self.current_path = path
+        
+        # 提前解析下一集的直链
+        if self.stream_resolver is not None and self.current_index + 1 < len(self.current_playlist):
+            self.stream_resolver.prefetch(self.client, [self.current_playlist[self.current_index + 1]['name']])
+        
+        # 使用该目录（或上级目录）的片头片尾设置
+        self.apply_skip_profile()
+        self.detect_skip_segments()
+        
+        # 未指定恢复时间时，从播放记录中读取该文件上次的进度
+        if resume_time is None:
+            resume_time = self.history.resume_position(self.client.base_url, path)
         
         # 重置片头片尾跳过标志和视频结束标志
         self.intro_skipped = False
         self.outro_skipped = False
         self.video_ended = False
         
+        # 预缓冲时已定位到续播位置或片头结束处，无需再次跳转
+        if prebuffered:
+            if self.skip_intro > 0 and prebuffered >= self.skip_intro * 1000:
+                self.intro_skipped = True
+            if resume_time == prebuffered:
+                resume_time = None
+        
         # 设置恢复时间
         if resume_time is not None and resume_time > 0:
             self.pending_resume_time = resume_time
@@ -675,6 +1189,8 @@ class MainWindow(QMainWindow):
         self.show_controls()
 
     def toggle_play(self):
+        if not self.ensure_vlc(self.toggle_play):
+            return
         if self.player.is_playing():
             self.player.pause()
             self.play_btn.setIcon(self._create_icon(icons.PLAY_ICON))
@@ -691,7 +1207,10 @@ class MainWindow(QMainWindow):
             
     def stop_playback(self):
         """停止播放"""
+        if not self.ensure_vlc():
+            return
         self.player.stop()
+        self._reset_standby()
         self.play_btn.setIcon(self._create_icon(icons.PLAY_ICON))
         self.show_osd("停止")
             
@@ -712,6 +1231,8 @@ class MainWindow(QMainWindow):
         使用 audio_set_volume(0) 而不是 audio_set_mute，
         因为 audio_set_mute 会与硬件加速产生冲突。
         """
+        if not self.ensure_vlc():
+            return
         if self.is_muted:
             # 取消静音：恢复之前保存的音量
             self.player.audio_set_volume(self.saved_volume)
@@ -730,7 +1251,9 @@ class MainWindow(QMainWindow):
 
     def set_volume(self, volume):
         """设置音量，不显示 OSD（避免频繁调用导致解码器冲突）"""
-        self.player.audio_set_volume(volume)
+        # 播放器尚未创建时由 init_vlc 应用滑块的音量
+        if self.player is not None:
+            self.player.audio_set_volume(volume)
         # 如果正在静音状态下调整音量，自动取消静音
         if self.is_muted and volume > 0:
             self.is_muted = False
@@ -744,7 +1267,7 @@ class MainWindow(QMainWindow):
     
     def on_seek_slider_changed(self, position):
         """进度条值改变时调用（点击或拖动）"""
-        # 因为update_ui使用了blockSignals，所以这里只会在用户操作时触发
+        # 因为更新进度时使用了blockSignals，所以这里只会在用户操作时触发
         self.set_position(position)
             
     def play_prev(self):
@@ -767,68 +1290,123 @@ class MainWindow(QMainWindow):
         self.setCursor(Qt.CursorShape.ArrowCursor)
         
     def hide_controls(self):
-        if self.isFullScreen() and self.player.is_playing():
+        if self.isFullScreen() and self.player is not None and self.player.is_playing():
             self.controls_container.hide()
             self.top_bar.hide()
             self.setCursor(Qt.CursorShape.BlankCursor)
 
-    def update_ui(self):
-        if self.player.is_playing():
-            length = self.player.get_length()
-            time = self.player.get_time()
-            
-            if length > 0:
-                self.duration = length
-                # protect divide by zero
-                # 更新进度条时阻止信号，避免触发valueChanged
-                try:
-                    self.seek_slider.blockSignals(True)
-                    self.seek_slider.setValue(int(time / length * 1000))
-                    self.seek_slider.blockSignals(False)
-                except Exception:
-                    pass
-                
-                # 如果有待恢复的时间，且视频已加载，进行跳转
-                if self.pending_resume_time is not None:
-                    print(f"[DEBUG] Seeking to pending resume time: {self.pending_resume_time}ms, video length: {length}ms")
-                    self.player.set_time(int(self.pending_resume_time))
-                    self.show_osd(f"恢复播放: {int(self.pending_resume_time/1000)}s")
-                    self.pending_resume_time = None  # 清除，避免重复跳转
-                
-                def format_time(ms):
-                    s = ms // 1000
-                    m = s // 60
-                    s = s % 60
-                    h = m // 60
-                    m = m % 60
-                    if h > 0:
-                        return f"{h:02}:{m:02}:{s:02}"
-                    return f"{m:02}:{s:02}"
-                
-                self.current_time_label.setText(format_time(time))
-                self.total_time_label.setText(format_time(length))
-                
-                # 定期保存播放进度（每5秒保存一次，避免频繁写入）
-                if int(time / 1000) % 5 == 0:
-                    self.config.set("last_played_time", int(time))
-                
-                # 只在视频刚开始播放时跳过片头（前5秒内），确保用户手动拖回去不会被强制跳转
-                if self.skip_intro > 0 and not self.intro_skipped and time < 5000 and time < self.skip_intro * 1000:
-                    self.player.set_time(self.skip_intro * 1000)
-                    self.intro_skipped = True  # 标记已跳过
-                    self.show_osd(f"跳过片头 ({self.skip_intro}s)")
-                
-                # 只跳过片尾一次
-                if self.skip_outro > 0 and not self.outro_skipped and length - time < self.skip_outro * 1000:
-                    self.outro_skipped = True  # 先标记，避免重复
-                    self.play_next()
-                    self.show_osd(f"跳过片尾 ({self.skip_outro}s)")
-                
-                # 视频播放结束自动播放下一集（不依赖片尾设置）
-                if not self.video_ended and length - time < 1000:  # 剩余时间少于1秒
-                    self.video_ended = True
-                    if self.current_index < len(self.current_playlist) - 1:
-                        QTimer.singleShot(500, self.play_next)  # 延迟500ms播放下一集
+    def on_player_playing(self):
+        """开始（或继续）播放"""
+        if self.sender() is self.standby_events:
+            self._on_standby_playing()
+            return
+        self.stream_retry_path = None
+        self._seek_pending_resume()
+        self.reschedule_transitions()
+
+    def on_player_paused(self):
+        """暂停或停止时取消定时器，继续播放时重新安排"""
+        if self.sender() is self.standby_events:
+            return
+        self.outro_timer.stop()
+        self.prebuffer_timer.stop()
+        self.time_anchor = None
+
+    def on_player_buffering(self, percent):
+        """缓冲完成后按实际位置重新安排定时器（卡顿期间播放位置没有前进）"""
+        if self.sender() is self.standby_events or percent < 100:
+            return
+        self.reschedule_transitions()
+
+    def on_length_changed(self, length):
+        if self.sender() is self.standby_events or length <= 0:
+            return
+        self.duration = length
+        self.total_time_label.setText(format_time(length))
+        self._seek_pending_resume()
+        self.reschedule_transitions()
+
+    def _seek_pending_resume(self):
+        """视频已加载（时长已知且正在播放）后跳转到待恢复的位置"""
+        if self.pending_resume_time is None or self.duration <= 0 or not self.player.is_playing():
+            return
+        print(f"[DEBUG] Seeking to pending resume time: {self.pending_resume_time}ms, video length: {self.duration}ms")
+        self.player.set_time(int(self.pending_resume_time))
+        self.show_osd(f"恢复播放: {int(self.pending_resume_time/1000)}s")
+        # 跳转生效前收到的时间仍是旧位置，不记录进度
+        self.resume_guard_until = time.monotonic() + 2
+        self.schedule_transitions(self.pending_resume_time)
+        self.pending_resume_time = None  # 清除，避免重复跳转
+
+    def on_time_changed(self, ms):
+        """播放位置变化（libvlc 事件，播放中每秒多次）"""
+        if self.sender() is self.standby_events or self.duration <= 0:
+            return
+        # 只在视频刚开始播放时跳过片头（前5秒内），确保用户手动拖回去不会被强制跳转
+        if self.skip_intro > 0 and not self.intro_skipped and ms < 5000 and ms < self.skip_intro * 1000:
+            self.player.set_time(self.skip_intro * 1000)
+            self.intro_skipped = True  # 标记已跳过
+            self.show_osd(f"跳过片头 ({self.skip_intro}s)")
+            self.schedule_transitions(self.skip_intro * 1000)
+            return
+
+        # 位置与预期相差较大（跳转、卡顿）时重新安排定时器
+        now = time.monotonic()
+        if self.time_anchor is not None:
+            expected = self.time_anchor[0] + (now - self.time_anchor[1]) * 1000
+            if abs(expected - ms) > 1000:
+                self.schedule_transitions(ms)
+
+        # 记录播放进度（只更新内存，由后台批量写入）
+        if self.current_path is not None and now >= self.resume_guard_until:
+            self.history.record(self.client.base_url, self.current_path, ms, self.duration)
+
+        if now - self.last_ui_update < self.ui_update_interval:
+            return
+        self.last_ui_update = now
+        # 更新进度条时阻止信号，避免触发valueChanged
+        self.seek_slider.blockSignals(True)
+        self.seek_slider.setValue(int(ms / self.duration * 1000))
+        self.seek_slider.blockSignals(False)
+        self.current_time_label.setText(format_time(ms))
+
+    def reschedule_transitions(self):
+        """按当前位置重新安排定时器（暂停时不安排，继续播放时会重新安排）"""
+        if self.duration > 0 and self.player.is_playing():
+            self.schedule_transitions(self.player.get_time())
+
+    def schedule_transitions(self, position):
+        """按播放位置安排片尾跳过和预缓冲下一集的单次定时器"""
+        self.time_anchor = (position, time.monotonic())
+        self.outro_timer.stop()
+        self.prebuffer_timer.stop()
+        if self.duration <= 0:
+            return
+        # 切换点：片尾开始处，未设置片尾时为结尾
+        switch_at = self.duration - max(self.skip_outro, 0) * 1000
+        if self.skip_outro > 0 and not self.outro_skipped:
+            self.outro_timer.start(int(max(0, switch_at - position)))
+        if self.standby_path is None:
+            self.prebuffer_timer.start(int(max(0, switch_at - self.prebuffer_lead - position)))
+
+    def on_outro_point(self):
+        """到达片尾：跳到下一集（只跳过一次）"""
+        position = self.player.get_time()
+        if self.duration - position > self.skip_outro * 1000 + 200:
+            # 缓冲等原因尚未到达，按实际位置重新安排
+            self.schedule_transitions(position)
+            return
+        self.outro_skipped = True
+        self.play_next()
+        self.show_osd(f"跳过片尾 ({self.skip_outro}s)")
+
+    def on_end_reached(self):
+        """视频播放结束自动播放下一集（不依赖片尾设置）"""
+        if self.sender() is self.standby_events or self.video_ended:
+            return
+        self.video_ended = True
+        if self.current_index < len(self.current_playlist) - 1:
+            self.play_next()
 
     def eventFilter(self, source, event):
         """处理视频区域的鼠标事件"""
@@ -851,6 +1429,9 @@ class MainWindow(QMainWindow):
     def keyPressEvent(self, event):
         self.show_controls() # Wake up controls on key press
         key = event.key()
+        # 音量、快进快退需要播放器
+        if key in (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_Left, Qt.Key.Key_Right) and not self.ensure_vlc():
+            return
         
         if key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter:
             self.toggle_fullscreen()
@@ -881,11 +1462,16 @@ class MainWindow(QMainWindow):
                 self.play_prev()
             elif key == Qt.Key.Key_X:
                 self.play_next()
+            elif key == Qt.Key.Key_D:
+                self.download_playlist()
         else:
             super().keyPressEvent(event)
         
     def show_osd(self, text):
         # VLC Marquee
+        if self.player is None:
+            return
+        import vlc
         try:
             self.player.video_set_marquee_int(vlc.VideoMarqueeOption.Enable, 1)
             self.player.video_set_marquee_string(vlc.VideoMarqueeOption.Text, text)
@@ -899,6 +1485,9 @@ class MainWindow(QMainWindow):
         self.osd_timer.start()
 
     def clear_osd(self):
+        if self.player is None:
+            return
+        import vlc
         try:
             self.player.video_set_marquee_int(vlc.VideoMarqueeOption.Enable, 0)
         except Exception:
@@ -915,39 +1504,43 @@ class MainWindow(QMainWindow):
         if not parts:
             return
         
+        # 导航期间不再让搜索结果替换文件树
+        self.search_runner.cancel()
         # 从根开始遍历
-        current_item = None
-        root = self.tree.invisibleRootItem()
+        self._navigate_from(self.model.root, parts)
+    
+    def _navigate_from(self, root, parts):
+        """从指定节点开始逐级导航，遇到未加载的目录时等待其加载完成后继续"""
+        # 节点仍在加载中，等加载完成后再继续
+        request_id = self.find_item_load(root)
+        if request_id is not None:
+            self.add_load_callback(request_id, lambda items: self._navigate_from(root, parts))
+            return
         
+        node = root
         for i, part in enumerate(parts):
-            found = False
-            parent = current_item if current_item else root
-            
-            # 遍历当前层级的所有子项
-            for j in range(parent.childCount()):
-                child = parent.child(j)
-                child_data = child.data(0, Qt.ItemDataRole.UserRole)
-                
-                if child_data:
-                    child_name = os.path.basename(child_data['name'].rstrip('/'))
-                    if child_name == part:
-                        found = True
-                        current_item = child
-                        
-                        # 如果不是最后一个部分（即是目录），展开它
-                        if i < len(parts) - 1:
-                            if not child.isExpanded():
-                                child.setExpanded(True)
-                                # 触发加载子项
-                                self.on_item_expanded(child)
-                        else:
-                            # 是文件，选中它
-                            self.tree.setCurrentItem(child)
-                            self.tree.scrollToItem(child)
-                        break
-            
-            if not found:
+            row = self.model.find_row(node, part)
+            if row < 0:
                 break
+            index = self.model.child_index(node, row)
+            
+            # 如果不是最后一个部分（即是目录），展开它
+            if i < len(parts) - 1:
+                child = self.model.node_for(index)
+                if child is None:
+                    break
+                # 展开会触发 fetchMore 加载子项
+                self.tree.expand(index)
+                if self.model.canFetchMore(index):
+                    self.model.fetchMore(index)
+                if self.find_item_load(child) is not None:
+                    self._navigate_from(child, parts[i + 1:])
+                    return
+                node = child
+            else:
+                # 是文件，选中它
+                self.tree.setCurrentIndex(index)
+                self.tree.scrollTo(index)
     
     def restore_playback_history(self):
         """恢复上次播放的视频和进度"""
@@ -957,10 +1550,18 @@ class MainWindow(QMainWindow):
         
         self.history_restored = True
         
-        last_path = self.config.get("last_played_path")
-        last_time = self.config.get("last_played_time", 0)
+        if not self.client:
+            return
+        
+        # 优先使用播放记录，没有时沿用旧版配置中保存的进度
+        entry = self.history.last(self.client.base_url)
+        if entry is not None:
+            last_path, last_time = entry.path, self.history.resume_position(self.client.base_url, entry.path)
+        else:
+            last_path = self.config.get("last_played_path")
+            last_time = self.config.get("last_played_time", 0)
         
-        if not last_path or not self.client:
+        if not last_path:
             return
         
         try:
@@ -974,85 +1575,178 @@ class MainWindow(QMainWindow):
             else:
                 parent_path = '/'
             
-            # 加载播放列表（父目录的所有视频）
-            items = self.client.list_files(parent_path)
-            files = [f for f in items if f['type'] != 'directory' and 
-                    os.path.splitext(f['name'])[1].lower() in VIDEO_EXTENSIONS]
-            files = SmartSorter.sort_files(files)
-            
-            self.current_playlist = files
-            
-            # 找到当前文件在播放列表中的索引
-            for i, f in enumerate(files):
-                if f['name'] == last_path:
-                    self.current_index = i
-                    # 播放视频并恢复进度
-                    self.play_video(f, resume_time=last_time)
-                    self.show_osd("已恢复播放历史")
-                    break
+            # 加载播放列表（父目录的所有视频），在后台完成后开始播放
+            request_id = self.dir_loader.load(self.client, parent_path)
+            self.pending_loads[request_id] = (
+                None, lambda items: self._resume_from_listing(items, last_path, last_time))
         except Exception as e:
             print(f"Failed to restore playback history: {e}")
     
+    def _resume_from_listing(self, items, last_path, last_time):
+        """用父目录列表构建播放列表并恢复播放"""
+        files = [f for f in items if f['type'] != 'directory' and 
+                os.path.splitext(f['name'])[1].lower() in VIDEO_EXTENSIONS]
+        files = SmartSorter.sort_files(files)
+        
+        self.current_playlist = files
+        
+        # 找到当前文件在播放列表中的索引
+        for i, f in enumerate(files):
+            if f['name'] == last_path:
+                self.current_index = i
+                # 播放视频并恢复进度
+                self.play_video(f, resume_time=last_time)
+                self.show_osd("已恢复播放历史")
+                break
+    
     def closeEvent(self, event):
+        self.cancel_pending_loads()
+        self.search_runner.cancel()
+        self.search_cache.save()
+        print(f"搜索缓存统计: {self.search_cache.stats()}")
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        self.downloads.shutdown()
+        if self.stream_proxy is not None:
+            print(f"播放缓存统计: {self.stream_proxy.stats()}")
+            self.stream_proxy.shutdown()
+        if self.stream_resolver is not None:
+            self.stream_resolver.shutdown()
+        if self.crawler is not None:
+            # 不等待（请求可能阻塞很久），未完成的目录保留为 pending，下次启动继续
+            self.crawler.stop(timeout=0)
         # 保存最终播放进度
         try:
-            if self.player.is_playing():
+            if self.player.is_playing() and self.current_path is not None:
                 time = self.player.get_time()
                 self.config.set("last_played_time", int(time))
+                self.history.record(self.client.base_url, self.current_path, time, self.duration)
         except Exception:
             pass
-        self.config.save()
+        # 解除 libvlc 事件回调，避免退出过程中回调到已销毁的对象
+        if self.player is not None:
+            self.player_events.detach()
+            self.standby_events.detach()
+        self.history.close()
+        # 各客户端不持有共享连接池，最后统一关闭
+        self.transport.close()
+        if self.intro_detector is not None:
+            self.intro_detector.shutdown()
+        self.skip_profiles.close()
+        # 写入尚未保存的配置
+        self.config.close()
         super().closeEvent(event)
     
+    def rebuild_search_index(self, server):
+        """从本地路径索引重建该服务器的搜索索引（在后台线程中调用）"""
+        # 已切换到其他服务器（旧服务器的同步刚结束），不覆盖当前服务器的索引
+        if self.client is None or self.client.base_url != server:
+            return
+        try:
+            self.local_search.build_from(self.library_index, server)
+        except Exception as e:
+            print(f"构建本地搜索索引失败: {e}")
+    
     def open_github(self):
         """打开GitHub仓库"""
         QDesktopServices.openUrl(QUrl("https://github.com/ymh1146/xiaoyaplayer"))
 
+    def on_search_text_edited(self, text):
+        """输入变化：停顿一段时间后再搜索"""
+        if text.strip():
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
+            self.search_runner.cancel()
+
     def perform_search(self):
-        """执行搜索"""
+        """执行搜索（在后台进行，结果边接收边显示）"""
+        self.search_timer.stop()
         keyword = self.search_input.text().strip()
         if not keyword:
             return
+        # 相同关键词的搜索仍在进行中，不重复请求
+        if keyword == self.search_keyword and self.search_runner.is_running():
+            return
             
+        self.search_keyword = keyword
+        self.search_shown = False
         self.show_osd("正在搜索...")
-        # 禁用搜索按钮防止重复点击
-        self.search_input.setEnabled(False)
         
-        try:
-            # 执行搜索
-            results = self.search_client.search(keyword)
-            
-            if not results:
-                self.show_osd("未找到相关资源")
-                self.search_input.setEnabled(True)
-                self.search_input.setFocus()
-                return
-                
-            # 清空树并显示结果
-            self.tree.clear()
-            self.tree.setHeaderLabel(f"搜索结果: {keyword}")
-            
-            for path in results:
-                item = QTreeWidgetItem(self.tree)
-                item.setText(0, path)
-                # 使用文件夹图标，因为搜索结果通常是目录
-                item.setIcon(0, self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
-                # 标记为搜索结果
-                item.setData(0, Qt.ItemDataRole.UserRole, {"type": "search_result", "path": path})
-                
-            self.show_osd(f"找到 {len(results)} 个结果")
-            
-        except Exception as e:
-            self.show_osd(f"搜索出错: {str(e)}")
-            print(f"[ERROR] Search error: {e}")
-            
-        finally:
-            self.search_input.setEnabled(True)
-            self.search_input.setFocus()
+        # 执行搜索：本地索引就绪时直接查询本地，否则请求服务器
+        local_ready = self.client is not None and self.local_search.ready_for(self.client.base_url)
+        searcher = self.local_search if local_ready else self.search_client
+        self.search_runner.search(searcher, keyword)
+
+    def on_search_results(self, request_id, paths):
+        """收到一批搜索结果"""
+        if not self.search_shown:
+            # 第一批结果到达时清空树并显示结果（使用文件夹图标，因为搜索结果通常是目录）
+            self.cancel_pending_loads()
+            accepted = self.model.set_search_results(paths, f"搜索结果: {self.search_keyword}")
+            self.search_shown = True
+        else:
+            accepted = self.model.append_search_results(paths)
+        
+        # 达到结果数上限后停止接收
+        if not accepted:
+            self.search_runner.cancel()
+            self.show_osd(f"结果过多，仅显示前 {self.model.search_max_results} 个")
 
-    def on_item_double_clicked(self, item, column):
+    def on_search_finished(self, request_id, keyword, count, error):
+        """搜索结束"""
+        if error:
+            self.show_osd(f"搜索出错: {error}")
+        elif count == 0:
+            self.show_osd("未找到相关资源")
+        else:
+            self.show_osd(f"找到 {count} 个结果")
+
+    def on_tree_context_menu(self, pos):
+        """文件列表右键菜单：下载文件或目录"""
+        index = self.tree.indexAt(pos)
+        data = index.data(Qt.ItemDataRole.UserRole) if index.isValid() else None
+        if not self.client or not isinstance(data, dict) or data.get("type") not in ("file", "directory"):
+            return
+        menu = QMenu(self)
+        if data["type"] == "directory":
+            menu.addAction("下载目录中的视频", lambda: self.download_directory(data["name"]))
+        else:
+            files = self.model.files_of(index.internalPointer())
+            menu.addAction("下载", lambda: self.download_files([data]))
+            menu.addAction("下载本目录所有视频", lambda: self.download_files(files))
+        menu.exec(self.tree.viewport().mapToGlobal(pos))
+
+    def download_files(self, files):
+        """加入下载队列"""
+        count = self.downloads.enqueue(self.client, files)
+        self.show_osd(f"已加入下载队列: {count} 个文件" if count else "文件已下载或已在队列中")
+
+    def download_directory(self, path):
+        """下载目录中的所有视频（在后台列出目录后加入队列）"""
+        def enqueue(items):
+            files = [f for f in items if f['type'] != 'directory' and
+                     os.path.splitext(f['name'])[1].lower() in VIDEO_EXTENSIONS]
+            self.download_files(SmartSorter.sort_files(files))
+        request_id = self.dir_loader.load(self.client, path)
+        self.pending_loads[request_id] = (None, enqueue)
+
+    def download_playlist(self):
+        """下载当前播放列表（本季）"""
+        if self.client and self.current_playlist:
+            self.download_files(self.current_playlist)
+
+    def on_download_event(self, server, path, status):
+        if status == "done":
+            self.show_osd(f"下载完成: {os.path.basename(path)}")
+        elif status == "failed":
+            self.show_osd(f"下载失败: {os.path.basename(path)}")
+        elif status == "interrupted":
+            self.show_osd(f"下载中断，下次连接时继续: {os.path.basename(path)}")
+
+    def on_item_double_clicked(self, index):
         """双击列表项"""
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = index.data(Qt.ItemDataRole.UserRole)
         if not data:
             return
             
@@ -1060,29 +1754,21 @@ class MainWindow(QMainWindow):
         if isinstance(data, dict) and data.get("type") == "search_result":
             path = data["path"]
             print(f"[DEBUG] Loading search result path: {path}")
+            # 离开搜索结果，尚未结束的搜索不再显示
+            self.search_runner.cancel()
             self.load_dir(path)
-            # 恢复树标题
-            self.tree.setHeaderLabel("文件列表")
             return
             
         # 原有逻辑：处理文件或目录
         if data['type'] == 'directory':
-            self.load_dir(data['name'], item)
+            # 丢弃已加载内容，由视图的双击展开/折叠触发重新加载
+            node = self.model.node_for(index)
+            self.cancel_item_load(node)
+            self.model.unload(node)
         else:
-            # 播放视频
-            self.current_playlist = []
-            # 获取当前目录下的所有视频文件
-            parent = item.parent()
-            if parent:
-                for i in range(parent.childCount()):
-                    child = parent.child(i)
-                    child_data = child.data(0, Qt.ItemDataRole.UserRole)
-                    if child_data['type'] != 'directory' and \
-                       os.path.splitext(child_data['name'])[1].lower() in VIDEO_EXTENSIONS:
-                        self.current_playlist.append(child_data)
-            else:
-                # 根目录文件（不太可能，但为了健壮性）
-                self.current_playlist.append(data)
+            # 播放视频：获取当前目录下的所有视频文件
+            parent = index.internalPointer()
+            self.current_playlist = self.model.files_of(parent)
             
             # 找到当前文件的索引
             for i, f in enumerate(self.current_playlist):
@@ -1096,8 +1782,5 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     
-    # Connect expansion signal (safe to connect; method exists)
-    window.tree.itemExpanded.connect(window.on_item_expanded)
-    
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,42 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class PlaybackEvents(QObject):
+    """把 libvlc 播放器事件转为 Qt 信号
+
+    libvlc 在自己的线程中回调，回调里只发出信号，由 Qt 排队到 GUI 线程处理
+    （libvlc 不允许在事件回调中调用播放器接口）。
+    """
+    time_changed = pyqtSignal(int)
+    length_changed = pyqtSignal(int)
+    buffering = pyqtSignal(float)
+    playing = pyqtSignal()
+    paused = pyqtSignal()
+    stopped = pyqtSignal()
+    end_reached = pyqtSignal()
+    error = pyqtSignal()
+
+    def __init__(self, player, parent=None):
+        super().__init__(parent)
+        # 播放器创建时 libvlc 已加载（见 MainWindow._load_vlc），这里导入不会阻塞
+        import vlc
+        self.player = player
+        events = vlc.EventType
+        self._handlers = {
+            events.MediaPlayerTimeChanged: lambda e: self.time_changed.emit(e.u.new_time),
+            events.MediaPlayerLengthChanged: lambda e: self.length_changed.emit(e.u.new_length),
+            events.MediaPlayerBuffering: lambda e: self.buffering.emit(e.u.new_cache),
+            events.MediaPlayerPlaying: lambda e: self.playing.emit(),
+            events.MediaPlayerPaused: lambda e: self.paused.emit(),
+            events.MediaPlayerStopped: lambda e: self.stopped.emit(),
+            events.MediaPlayerEndReached: lambda e: self.end_reached.emit(),
+            events.MediaPlayerEncounteredError: lambda e: self.error.emit(),
+        }
+        self._manager = player.event_manager()
+        for event_type, handler in self._handlers.items():
+            self._manager.event_attach(event_type, handler)
+
+    def detach(self):
+        """解除与播放器的事件绑定"""
+        for event_type in self._handlers:
+            self._manager.event_detach(event_type)
@@ -0,0 +1,117 @@
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _SearchSignals(QObject):
+    """工作线程回传结果用的信号（跨线程自动排队到 GUI 线程）"""
+    results = pyqtSignal(int, object)
+    finished = pyqtSignal(int, str, int, str)
+
+
+class _SearchTask(QRunnable):
+    """在线程池中执行一次搜索，结果按批次回传
+
+    第一条结果立即回传，之后每隔 flush_interval 秒或攒够 batch_size 条回传一次。
+    """
+    def __init__(self, searcher, request_id, keyword, batch_size, flush_interval):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.searcher = searcher
+        self.request_id = request_id
+        self.keyword = keyword
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cancelled = False
+        self.signals = _SearchSignals()
+
+    def _results(self):
+        # 支持流式接口的搜索器边下载边产出，其余一次性返回
+        if hasattr(self.searcher, "iter_search"):
+            return self.searcher.iter_search(self.keyword, cancelled=lambda: self.cancelled)
+        return self.searcher.search(self.keyword)
+
+    def run(self):
+        count = 0
+        error = ""
+        batch = []
+        last_flush = 0.0
+        if not self.cancelled:
+            try:
+                for path in self._results():
+                    if self.cancelled:
+                        break
+                    batch.append(path)
+                    now = time.monotonic()
+                    if count == 0 or len(batch) >= self.batch_size or now - last_flush >= self.flush_interval:
+                        count += len(batch)
+                        self.signals.results.emit(self.request_id, batch)
+                        batch = []
+                        last_flush = now
+            except Exception as e:
+                error = str(e)
+                print(f"[ERROR] Search failed: {e}")
+        if batch and not self.cancelled:
+            count += len(batch)
+            self.signals.results.emit(self.request_id, batch)
+        # 无论是否取消都回传，由 SearchRunner 负责释放任务对象
+        self.signals.finished.emit(self.request_id, self.keyword, count, error)
+
+
+class SearchRunner(QObject):
+    """后台搜索执行器
+
+    同一时间只保留最新的一次搜索：发起新搜索时取消旧搜索，旧搜索的结果不再回传。
+    结果通过 results 信号分批送回 GUI 线程，结束后发出 finished（关键词、结果总数、错误信息）。
+    """
+    results = pyqtSignal(int, object)
+    finished = pyqtSignal(int, str, int, str)
+
+    def __init__(self, batch_size=50, flush_interval=0.1, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._tasks = {}
+        self._current = None
+        self._next_id = 0
+
+    def search(self, searcher, keyword):
+        """取消进行中的搜索并发起新搜索，返回请求ID"""
+        self.cancel()
+        self._next_id += 1
+        task = _SearchTask(searcher, self._next_id, keyword, self.batch_size, self.flush_interval)
+        task.signals.results.connect(self._on_results)
+        task.signals.finished.connect(self._on_finished)
+        self._tasks[task.request_id] = task
+        self._current = task.request_id
+        self.pool.start(task)
+        return task.request_id
+
+    def is_running(self):
+        return self._current is not None
+
+    def cancel(self):
+        """取消当前搜索（正在读取的响应会在下一块到达时关闭）"""
+        if self._current is None:
+            return
+        task = self._tasks.get(self._current)
+        self._current = None
+        if task is None:
+            return
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            del self._tasks[task.request_id]
+
+    def _on_results(self, request_id, paths):
+        if request_id != self._current:
+            return
+        self.results.emit(request_id, paths)
+
+    def _on_finished(self, request_id, keyword, count, error):
+        self._tasks.pop(request_id, None)
+        if request_id != self._current:
+            return
+        self._current = None
+        self.finished.emit(request_id, keyword, count, error)
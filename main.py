@@ -1,9 +1,16 @@
+# 最先导入：以此作为启动时间线的起点
+from core.startup import timeline
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from gui.main_window import MainWindow
+timeline.mark("导入模块")
 
 def main():
+    # 打包后的程序启动进程池（片头片尾检测）时需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    timeline.mark("QApplication")
     window = MainWindow()
     window.showMaximized()
     sys.exit(app.exec())
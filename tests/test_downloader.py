@@ -0,0 +1,216 @@
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.downloader import DownloadEntry, DownloadManager
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """支持 Range / If-Range 的文件服务
+
+    server.cuts 大于 0 时，接下来的这么多次响应只发送 server.cut_after 字节就断开连接；
+    server.digest 不为 None 时在 Repr-Digest 头中给出该 SHA-256。
+    """
+
+    def do_GET(self):
+        server = self.server
+        content, etag = server.content, server.etag
+        range_header = self.headers.get("Range")
+        requested = int(range_header.split("=")[1].split("-")[0]) if range_header else 0
+        if_range = self.headers.get("If-Range")
+        server.requests.append((requested, if_range))
+        start = requested if if_range is None or if_range == etag else 0
+        body = content[start:]
+        if start:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if server.digest is not None:
+            self.send_header("Repr-Digest", f"sha-256=:{base64.b64encode(server.digest).decode()}:")
+        self.end_headers()
+        if server.cuts > 0:
+            server.cuts -= 1
+            body = body[:server.cut_after]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Client:
+    """下载管理器用到的 WebDAVClient 接口"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.username = "guest"
+        self.password = "guest"
+
+    def get_stream_url(self, path):
+        return self.base_url + path
+
+
+class DownloadManagerTest(unittest.TestCase):
+    SIZE = 256 * 1024
+    PATH = "/movies/a.mkv"
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        self.server.daemon_threads = True
+        self.server.content = os.urandom(self.SIZE)
+        self.server.etag = '"v1"'
+        self.server.digest = None
+        self.server.cuts = 0
+        self.server.cut_after = self.SIZE // 2
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = _Client(f"http://127.0.0.1:{self.server.server_port}/dav")
+        self.manager = None
+
+    def tearDown(self):
+        if self.manager is not None:
+            self.manager.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _manager(self, retries=0):
+        self.manager = DownloadManager(
+            download_dir=os.path.join(self.tmp, "downloads"), db_file=os.path.join(self.tmp, "downloads.db"),
+            workers=1, chunk_size=4096
+        )
+        self.manager.PROGRESS_INTERVAL = 16 * 1024
+        self.manager.VERIFY_BYTES = 8 * 1024
+        self.manager.MAX_RETRIES = retries
+        self.manager.RETRY_DELAY = 0.05
+        self.statuses = []
+        return self.manager
+
+    def _download(self, manager, status, start=None):
+        """开始下载（默认加入下载队列）并等待进入 status 状态，返回下载记录"""
+        reached = threading.Event()
+
+        def on_event(server, path, new_status, downloaded, size):
+            self.statuses.append(new_status)
+            if new_status == status:
+                reached.set()
+        manager.on_event = on_event
+        if start is None:
+            manager.enqueue(self.client, [{'name': self.PATH, 'content_length': self.SIZE}])
+        else:
+            start()
+        self.assertTrue(reached.wait(10), f"下载未进入 {status} 状态")
+        return manager.get(self.client.base_url, self.PATH)
+
+    def _interrupt(self, manager):
+        """下载一半时断开连接（不重试），返回中断后的记录"""
+        self.server.cuts = 1
+        entry = self._download(manager, "interrupted")
+        self.assertGreater(entry.downloaded, manager.VERIFY_BYTES)
+        self.assertLess(entry.downloaded, self.SIZE)
+        return entry
+
+    def _resume(self, manager):
+        return self._download(manager, "done", start=lambda: manager.resume_pending(self.client))
+
+    def _assert_done(self, manager, content):
+        entry = manager.get(self.client.base_url, self.PATH)
+        with open(entry.local_path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(entry.sha256, hashlib.sha256(content).hexdigest())
+        self.assertTrue(manager.verify(self.client.base_url, self.PATH))
+
+    def test_retry_resumes_after_network_error(self):
+        manager = self._manager(retries=3)
+        self.server.cuts = 2
+        self._download(manager, "done")
+        self.assertNotIn("failed", self.statuses)
+        self.assertEqual(len(self.server.requests), 3)
+        # 重试从断点前的比对段开始续传，并带上 If-Range
+        self.assertGreater(self.server.requests[-1][0], 0)
+        self.assertEqual(self.server.requests[-1][1], '"v1"')
+        self._assert_done(manager, self.server.content)
+
+    def test_retries_exhausted_marks_interrupted(self):
+        manager = self._manager(retries=2)
+        self.server.cuts = 10
+        self.server.cut_after = 1024
+        self._download(manager, "interrupted")
+        # 首次请求 + 2 次重试
+        self.assertEqual(len(self.server.requests), 3)
+        self.server.cuts = 0
+        self._resume(manager)
+        self._assert_done(manager, self.server.content)
+
+    def test_resume_after_interruption(self):
+        manager = self._manager()
+        entry = self._interrupt(manager)
+        self._resume(manager)
+        self.assertEqual(self.server.requests[-1], (entry.downloaded - manager.VERIFY_BYTES, '"v1"'))
+        self._assert_done(manager, self.server.content)
+
+    def test_resume_across_restart(self):
+        entry = self._interrupt(self._manager())
+        self.manager.shutdown()
+        manager = self._manager()
+        self.assertEqual(manager.get(self.client.base_url, self.PATH).downloaded, entry.downloaded)
+        self._resume(manager)
+        self.assertEqual(self.server.requests[-1][0], entry.downloaded - manager.VERIFY_BYTES)
+        self._assert_done(manager, self.server.content)
+
+    def test_changed_file_restarts(self):
+        manager = self._manager()
+        entry = self._interrupt(manager)
+        self.server.content = os.urandom(self.SIZE)
+        self.server.etag = '"v2"'
+        self._resume(manager)
+        # If-Range 不匹配，服务器返回完整文件，丢弃旧的 ETag 从头下载
+        self.assertEqual(self.server.requests[-2], (entry.downloaded - manager.VERIFY_BYTES, '"v1"'))
+        self.assertEqual(self.server.requests[-1], (0, None))
+        self._assert_done(manager, self.server.content)
+
+    def test_changed_content_without_etag_restarts(self):
+        self.server.etag = None
+        manager = self._manager()
+        self._interrupt(manager)
+        self.server.content = os.urandom(self.SIZE)
+        self._resume(manager)
+        # 断点前的比对段不一致，重新请求整个文件
+        self.assertGreater(self.server.requests[-2][0], 0)
+        self.assertEqual(self.server.requests[-1], (0, None))
+        self._assert_done(manager, self.server.content)
+
+    def test_server_digest_is_checked(self):
+        manager = self._manager()
+        self.server.digest = hashlib.sha256(self.server.content).digest()
+        self._download(manager, "done")
+        self._assert_done(manager, self.server.content)
+
+    def test_server_digest_mismatch_fails(self):
+        manager = self._manager()
+        self.server.digest = hashlib.sha256(b"other").digest()
+        entry = self._download(manager, "failed")
+        self.assertIsNone(manager.local_path(self.client.base_url, self.PATH))
+        self.assertEqual(entry.downloaded, 0)
+        self.assertFalse(os.path.exists(entry.local_path + ".part"))
+
+    def test_save_after_shutdown_is_ignored(self):
+        # shutdown 超时后仍在收尾的下载线程会继续保存进度，不能因数据库已关闭而出错
+        manager = self._manager()
+        manager.shutdown()
+        self.manager = None
+        manager._save(self.client.base_url, DownloadEntry(self.PATH, "a.mkv", self.SIZE, 0, "failed", None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()